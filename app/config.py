@@ -1,7 +1,94 @@
+import os
 from datetime import timedelta
 
 # waktu simpan file upload
 UPLOAD_TTL = timedelta(minutes=30)
 
 # direktori upload
-UPLOAD_DIR = "temp/uploads"
\ No newline at end of file
+UPLOAD_DIR = "temp/uploads"
+
+# ukuran maksimal file gambar
+MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+
+# resolusi maksimal gambar (dicek dari header, mencegah decompression bomb)
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", 100_000_000))
+
+# maksimal jumlah file dalam satu request /api/batch (multipart)
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", 5000))
+
+# detik maksimal satu gambar batch menunggu antrian pipeline (lalu jadi baris error)
+BATCH_QUEUE_TIMEOUT = float(os.getenv("BATCH_QUEUE_TIMEOUT", 60))
+
+# jumlah hasil analisis yang disimpan di cache memori (LRU)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 256))
+
+# instrumentasi tahap pipeline & endpoint /metrics ("0" untuk mematikan)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# backend eksekusi pipeline: "process" atau "thread"
+PIPELINE_BACKEND = os.getenv("PIPELINE_BACKEND", "process")
+
+# jumlah worker pipeline (default: jumlah core)
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", os.cpu_count() or 1))
+
+# maksimal request yang menunggu worker (di luar yang sedang diproses)
+PIPELINE_MAX_QUEUE = int(os.getenv("PIPELINE_MAX_QUEUE", 16))
+
+# nilai header Retry-After (detik) saat antrian penuh
+PIPELINE_RETRY_AFTER = int(os.getenv("PIPELINE_RETRY_AFTER", 5))
+
+# riwayat analisis (SQLite) untuk memantau kesehatan daun per plot / pohon
+HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "1") == "1"
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "data/history.db")
+
+# penulisan batch: tiap N baris atau tiap N detik
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", 200))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", 1.0))
+
+# maksimal baris yang menunggu ditulis (di atas ini baris dibuang + warning)
+HISTORY_MAX_PENDING = int(os.getenv("HISTORY_MAX_PENDING", 10000))
+
+# format artifact foto (segmented, map, overlay): "png" (default, lossless),
+# "jpg" atau "webp" (opt-in, lossy); histogram selalu PNG
+ARTIFACT_IMAGE_FORMAT = os.getenv("ARTIFACT_IMAGE_FORMAT", "png")
+ARTIFACT_QUALITY = int(os.getenv("ARTIFACT_QUALITY", 90))
+
+# level kompresi PNG 0-9 (kosong = default OpenCV, paling cepat:
+# 15 ms vs 32-42 ms level 1-6 untuk overlay 512x512 di OpenCV 5)
+ARTIFACT_PNG_COMPRESSION = (
+    int(os.environ["ARTIFACT_PNG_COMPRESSION"])
+    if os.getenv("ARTIFACT_PNG_COMPRESSION") else None
+)
+
+# backend histogram artifact: "opencv" (default) atau "matplotlib" (opsional)
+HISTOGRAM_BACKEND = os.getenv("HISTOGRAM_BACKEND", "opencv")
+
+# lebar tepi lembut overlay (px di dalam tepi daun); 0 = tepi tegas
+ARTIFACT_OVERLAY_EDGE = int(os.getenv("ARTIFACT_OVERLAY_EDGE", 0))
+
+# encode & tulis artifact di background; URL dikembalikan sebelum file ada
+ARTIFACT_ASYNC_WRITE = os.getenv("ARTIFACT_ASYNC_WRITE", "1") == "1"
+
+# detik maksimal route /temp menunggu artifact yang belum selesai ditulis
+ARTIFACT_WAIT_TIMEOUT = float(os.getenv("ARTIFACT_WAIT_TIMEOUT", 10))
+
+# penyimpanan artifact: "file" (temp/uploads, disajikan /temp) atau
+# "memory" (di memori proses API, disajikan /artifacts, tanpa disk)
+ARTIFACT_STORE = os.getenv("ARTIFACT_STORE", "file")
+
+# batas total ukuran artifact untuk store "memory" (LRU dibuang di atas ini)
+ARTIFACT_MEMORY_MAX_BYTES = int(os.getenv("ARTIFACT_MEMORY_MAX_BYTES", 256 * 1024 * 1024))
+
+# interval sweeper artifact kedaluwarsa (detik)
+ARTIFACT_SWEEP_INTERVAL = float(os.getenv("ARTIFACT_SWEEP_INTERVAL", 60))
+
+# batas total ukuran folder artifact (store "file"); sample terlama dihapus dulu
+ARTIFACT_DISK_MAX_BYTES = int(os.getenv("ARTIFACT_DISK_MAX_BYTES", 1024 * 1024 * 1024))
+
+# metode segmentasi daun: "hsv" (default), "proxy", "proxy_refine", "components"
+# (lihat image_pipeline.segmentation & benchmarks/bench_segmentation.py)
+SEGMENTATION_METHOD = os.getenv("SEGMENTATION_METHOD", "hsv")
+
+# file JSON konfigurasi skor (bobot, rentang, batas label + versi);
+# kosong = bawaan image_pipeline.scoring.DEFAULT_SCORING
+SCORING_CONFIG = os.getenv("SCORING_CONFIG", "")
@@ -1,21 +1,50 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from app.routers import leaf
+from app.routers import leaf, api, metrics, history, artifacts
 from app.logger import setup_logger
+from app.utils.artifacts import ArtifactFiles
+from app.utils.artifact_store import artifact_sweeper
+from app.utils.executor import pipeline_executor
+from app.utils.history import history_store
+from app.config import SEGMENTATION_METHOD
+from image_pipeline.segmentation import check_segmentation
 
 setup_logger()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # konfigurasi salah gagal saat startup, bukan per request
+    check_segmentation(SEGMENTATION_METHOD)
+    # worker pipeline dihidupkan (dan di-warm up) sebelum menerima request
+    pipeline_executor.start()
+    history_store.start()
+    artifact_sweeper.start()
+    yield
+    pipeline_executor.shutdown()
+    history_store.shutdown()
+    artifact_sweeper.shutdown()
+
+
 app = FastAPI(
     title="Salak Leaf Analysis",
     description="Web-based image processing for salak leaf health",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 app.include_router(leaf.router)
+app.include_router(api.router)
+app.include_router(metrics.router)
+app.include_router(history.router)
+app.include_router(artifacts.router)
 
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
-app.mount("/temp", StaticFiles(directory="temp"), name="temp")
+# artifact bisa masih ditulis di background saat URL-nya diminta
+app.mount("/temp", ArtifactFiles(directory="temp"), name="temp")
 
 templates = Jinja2Templates(directory="app/templates")
@@ -0,0 +1,306 @@
+import asyncio
+import time
+import zipfile
+import logging
+from datetime import datetime
+
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import StreamingResponse
+
+from image_pipeline.batch import (
+    FORMATS,
+    analyze_image_bytes,
+    error_record,
+    format_header,
+    format_record,
+    is_image_name
+)
+from image_pipeline.pipeline import process_leaf_image
+from app.routers.leaf import validate_image
+from app.utils.artifacts import attach_artifact_urls, ARTIFACT_ENCODING
+from app.utils.artifact_store import artifact_store, store_result_files
+from app.utils.result_cache import result_cache, make_cache_key, SCORING
+from app.utils.ingest import (
+    ingest_image_upload,
+    iter_upload_files,
+    IMAGE_UPLOAD_OPENAPI,
+    UploadTooLarge
+)
+from app.utils.metrics import pipeline_metrics
+from app.utils.executor import pipeline_executor, QueueFullError
+from app.utils.history import history_store, to_epoch
+from app.config import (
+    BATCH_MAX_FILES,
+    BATCH_QUEUE_TIMEOUT,
+    MAX_FILE_SIZE,
+    PIPELINE_RETRY_AFTER,
+    SEGMENTATION_METHOD
+)
+
+logger = logging.getLogger("leaf-api")
+
+router = APIRouter(prefix="/api")
+
+MEDIA_TYPES = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+
+@router.post("/analyze", openapi_extra=IMAGE_UPLOAD_OPENAPI)
+async def analyze_leaf(
+    request: Request,
+    artifacts: str = "",
+    timings: bool = False,
+    mode: str = "standard",
+    plot_id: str | None = None,
+    tree_id: str | None = None,
+    captured_at: datetime | None = None
+):
+    """
+    Analyze one image and return the result as JSON.
+
+    `artifacts` is a comma-separated subset of
+    image_pipeline.pipeline.ARTIFACTS (e.g. "exg_overlay,hist_exg");
+    empty (default) returns numbers only and writes nothing to disk.
+    `timings=true` adds the per-stage timing breakdown of this request
+    (absent when the result came from cache).
+    `mode=highres` analyzes at native resolution in tiles,
+    `mode=multi` every leaflet of a frond photo
+    (see image_pipeline.pipeline.MODES).
+    The result is recorded in the analysis history with the optional
+    `plot_id` / `tree_id` (query or form fields) and `captured_at`
+    (photo time, default: now).
+    """
+    started = time.perf_counter()
+    breakdown = None
+    wanted = [a.strip() for a in artifacts.split(",") if a.strip()]
+
+    try:
+        image = await ingest_image_upload(request)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    content = image.buffer
+
+    # hasil disimpan per alamat konten; artifact store hanya jika diminta
+    sample_id = make_cache_key(content, artifacts=sorted(set(wanted)), mode=mode)
+
+    async def compute():
+        nonlocal breakdown
+        validate_image(content)
+        store_options = artifact_store.pipeline_options(sample_id) if wanted else {}
+        result = await pipeline_executor.run(
+            process_leaf_image,
+            image_bytes=content,
+            artifacts=wanted,
+            profile=pipeline_metrics.enabled or timings,
+            mode=mode,
+            encoding=ARTIFACT_ENCODING,
+            segmentation=SEGMENTATION_METHOD,
+            scoring=SCORING,
+            **store_options
+        )
+        breakdown = result.pop("timings", None)
+        pipeline_metrics.observe_timings(breakdown)
+        if wanted:
+            store_result_files(artifact_store, sample_id, result)
+            result["sample_id"] = sample_id
+            attach_artifact_urls(result, sample_id)
+        return result
+
+    try:
+        result, cached = await result_cache.get_or_compute(
+            sample_id, compute, with_artifacts=bool(wanted)
+        )
+    except QueueFullError:
+        raise HTTPException(
+            status_code=503,
+            detail="Server sedang sibuk. Silakan coba lagi beberapa saat.",
+            headers={"Retry-After": str(PIPELINE_RETRY_AFTER)}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    pipeline_metrics.observe_request(
+        "analyze", time.perf_counter() - started, cached
+    )
+    history_store.record(
+        result,
+        plot_id=plot_id or image.fields.get("plot_id") or None,
+        tree_id=tree_id or image.fields.get("tree_id") or None,
+        filename=image.filename,
+        observed_at=to_epoch(captured_at)
+    )
+    result["cached"] = cached
+    if timings and breakdown is not None:
+        result["timings"] = breakdown
+    return result
+
+
+def _is_zip(filename, content_type):
+    return (
+        content_type in ("application/zip", "application/x-zip-compressed")
+        or (filename or "").lower().endswith(".zip")
+    )
+
+
+def _batch_item(name, data):
+    # header & resolusi dicek sebelum masuk pool (batas MAX_IMAGE_PIXELS sama dengan /api/analyze)
+    try:
+        validate_image(data)
+    except ValueError as e:
+        return name, None, str(e)
+    return name, data, None
+
+
+async def _iter_batch_items(parts):
+    """
+    Yield (name, bytes | None, error | None) one image at a time
+    from uploaded files and zip archives. Images are validated
+    (header, MAX_IMAGE_PIXELS) without decoding.
+    """
+    async for part in parts:
+        try:
+            if part.error is not None:
+                yield part.filename, None, part.error
+                continue
+            if part.file is None:
+                yield _batch_item(part.filename, part.buffer)
+                continue
+
+            try:
+                archive = zipfile.ZipFile(part.file)
+            except zipfile.BadZipFile:
+                yield part.filename, None, "Arsip zip tidak valid."
+                continue
+
+            with archive:
+                for info in archive.infolist():
+                    if info.is_dir() or not is_image_name(info.filename):
+                        continue
+                    if info.file_size > MAX_FILE_SIZE:
+                        yield info.filename, None, "Ukuran file terlalu besar. Maksimal 5 MB."
+                        continue
+                    yield _batch_item(info.filename, archive.read(info))
+        finally:
+            part.close()
+
+
+async def _analyze(name, data, index):
+    # batch mengalah ke request interaktif saat antrian penuh,
+    # paling lama BATCH_QUEUE_TIMEOUT detik per gambar
+    deadline = time.monotonic() + BATCH_QUEUE_TIMEOUT
+    while True:
+        try:
+            return await pipeline_executor.run(
+                analyze_image_bytes, name, data, index, SEGMENTATION_METHOD, SCORING
+            )
+        except QueueFullError:
+            if time.monotonic() >= deadline:
+                return error_record(name, "Server sedang sibuk. Gambar dilewati.", index)
+            await asyncio.sleep(0.5)
+
+
+async def _stream_batch(parts, fmt, plot_id=None):
+    """
+    Stream one result line per image, with at most one in-flight
+    job per pipeline worker. The upload is read only as fast as
+    images are handed to the pool.
+    """
+    started = time.perf_counter()
+    items = _iter_batch_items(parts)
+    limit = pipeline_executor.max_workers
+    pending = set()
+    n_ok = n_error = 0
+
+    def emit(record):
+        nonlocal n_ok, n_error
+        if record["status"] == "ok":
+            n_ok += 1
+            history_store.record(record, plot_id=plot_id, filename=record["file"])
+        else:
+            n_error += 1
+        return format_record(record, fmt)
+
+    try:
+        yield format_header(fmt)
+
+        index = 0
+        async for name, data, error in items:
+            if error is not None:
+                yield emit(error_record(name, error, index))
+                index += 1
+                continue
+
+            if len(pending) >= limit:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield emit(task.result())
+
+            pending.add(asyncio.create_task(_analyze(name, data, index)))
+            index += 1
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield emit(task.result())
+
+        logger.info("Batch finished | ok=%d | error=%d", n_ok, n_error)
+        pipeline_metrics.observe_request("batch", time.perf_counter() - started, False)
+
+    finally:
+        for task in pending:
+            task.cancel()
+        await items.aclose()
+        await parts.aclose()
+
+
+class _UploadStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that still reads the request body while
+    streaming: client disconnects are only watched (receive) once
+    `body_done` is set, until then the body belongs to the parser.
+    """
+
+    def __init__(self, content, body_done, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_done = body_done
+
+    async def listen_for_disconnect(self, receive):
+        await self.body_done.wait()
+        await super().listen_for_disconnect(receive)
+
+
+@router.post("/batch")
+async def batch_analyze(request: Request, format: str = "jsonl", plot_id: str | None = None):
+    """
+    Analyze many images in one request.
+
+    Body: multipart/form-data with any number of image files and/or
+    zip archives of images. Response: JSONL (default) or CSV, streamed
+    one line per image as soon as it is processed. Successful images
+    are recorded in the analysis history under `plot_id`.
+    """
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format harus salah satu dari {FORMATS}.")
+
+    # body multipart dibaca bertahap selama streaming, tidak di-spool dulu
+    body_done = asyncio.Event()
+    try:
+        parts = iter_upload_files(
+            request, BATCH_MAX_FILES, MAX_FILE_SIZE, spool=_is_zip, body_done=body_done
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return _UploadStreamingResponse(
+        _stream_batch(parts, format, plot_id),
+        body_done,
+        media_type=MEDIA_TYPES[format]
+    )
@@ -0,0 +1,44 @@
+import re
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from image_pipeline.artifact_writer import FORMATS
+from image_pipeline.pipeline import ARTIFACTS
+from app.config import UPLOAD_TTL
+from app.utils.artifact_store import artifact_store
+from app.utils.result_cache import RESULT_FILENAME
+
+router = APIRouter(prefix="/artifacts")
+
+# URL artifact berbasis alamat konten -> isi tidak pernah berubah
+CACHE_CONTROL = f"public, max-age={int(UPLOAD_TTL.total_seconds())}, immutable"
+
+# sample_id = alamat konten (sha256 hex, lihat make_cache_key)
+SAMPLE_ID_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+# hanya nama file yang ditulis pipeline / result cache (tanpa path)
+ARTIFACT_FILENAMES = frozenset(
+    {stem + ext for stem, _, _ in ARTIFACTS.values() for ext in FORMATS.values()}
+    | {RESULT_FILENAME}
+)
+
+
+@router.get("/{sample_id}/{filename}")
+async def get_artifact(sample_id: str, filename: str, request: Request):
+    """
+    Serve an encoded artifact straight from the artifact store,
+    with ETag / If-None-Match revalidation.
+    """
+    # nama lain (mis. "..") tidak pernah sampai ke store: tidak bisa keluar dari folder sample
+    if not SAMPLE_ID_PATTERN.fullmatch(sample_id) or filename not in ARTIFACT_FILENAMES:
+        raise HTTPException(status_code=404, detail="Artifact tidak ditemukan.")
+
+    artifact = artifact_store.get(sample_id, filename)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Artifact tidak ditemukan.")
+
+    headers = {"ETag": artifact.etag, "Cache-Control": CACHE_CONTROL}
+    if artifact.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    return Response(artifact.data, media_type=artifact.media_type, headers=headers)
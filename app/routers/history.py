@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.utils.history import history_store, to_epoch, MAX_LIMIT
+
+router = APIRouter(prefix="/api/history")
+
+
+@router.get("")
+def list_history(
+    plot_id: str | None = None,
+    tree_id: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    offset: int = Query(0, ge=0)
+):
+    """
+    Recorded analyses, newest first, filtered by plot / tree and
+    observation time range [start, end) (ISO 8601, naive = UTC).
+    """
+    items = history_store.query(
+        plot_id=plot_id,
+        tree_id=tree_id,
+        start=to_epoch(start),
+        end=to_epoch(end),
+        limit=limit,
+        offset=offset
+    )
+    return {"items": items, "limit": limit, "offset": offset}
+
+
+@router.get("/aggregate")
+def aggregate_history(
+    plot_id: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    bucket: str | None = None
+):
+    """
+    Per-plot summary (count, mean / min / max score, mean ExG & GLI,
+    label counts), optionally split per `bucket` (day, week, month).
+    """
+    try:
+        groups = history_store.aggregate(
+            plot_id=plot_id,
+            start=to_epoch(start),
+            end=to_epoch(end),
+            bucket=bucket
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"groups": groups}
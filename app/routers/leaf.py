@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Request, UploadFile, File, HTTPException
+from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from fastapi import BackgroundTasks
 import shutil
-import uuid
+import time
 from pathlib import Path
-from image_pipeline.pipeline import process_leaf_image
-from app.utils.cleanup import cleanup_old_uploads
-import cv2
-import numpy as np
+from image_pipeline.pipeline import process_leaf_image, ARTIFACTS
+from image_pipeline.io import probe_image
+from app.utils.artifacts import attach_artifact_urls, ARTIFACT_ENCODING
+from app.utils.artifact_store import artifact_store, store_result_files
+from app.utils.result_cache import result_cache, make_cache_key, SCORING
+from app.utils.metrics import pipeline_metrics
+from app.utils.executor import pipeline_executor, QueueFullError
+from app.utils.history import history_store
+from app.utils.ingest import ingest_image_upload, IMAGE_UPLOAD_OPENAPI
+from app.config import PIPELINE_RETRY_AFTER, MAX_IMAGE_PIXELS, SEGMENTATION_METHOD
 import logging
 logger = logging.getLogger("leaf-api")
 
@@ -18,23 +23,20 @@ templates = Jinja2Templates(directory="app/templates")
 UPLOAD_DIR = Path("temp/uploads")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-ALLOWED_TYPES = {"image/jpeg", "image/png", "image/jpg"}
-MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+def validate_image(content):
+    """
+    Validate image header and resolution without decoding pixels.
+    Format & size are already checked while streaming the upload.
+    """
+    # cek header (format & dimensi); decode penuh hanya sekali di pipeline
+    _, width, height = probe_image(content)
 
-def validate_image(upload: UploadFile, content: bytes):
-    if upload.content_type not in ALLOWED_TYPES:
-        raise ValueError("Format file tidak didukung. Gunakan JPG atau PNG.")
-
-    if len(content) > MAX_FILE_SIZE:
-        raise ValueError("Ukuran file terlalu besar. Maksimal 5 MB.")
-
-    # cek apakah benar-benar image (OpenCV)
-    img_array = np.frombuffer(content, np.uint8)
-    img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-
-    if img is None:
+    if width == 0 or height == 0:
         raise ValueError("File tidak dapat dibaca sebagai gambar.")
 
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ValueError("Resolusi gambar terlalu besar.")
+
 
 @router.get("/", response_class=HTMLResponse)
 async def index(request: Request):
@@ -44,54 +46,63 @@ async def index(request: Request):
     )
 
 
-@router.post("/upload", response_class=HTMLResponse)
-async def upload_leaf(
-    request: Request,
-    background_tasks: BackgroundTasks,
-    image: UploadFile = File(...)
-):
-    background_tasks.add_task(cleanup_old_uploads)
+@router.post("/upload", response_class=HTMLResponse, openapi_extra=IMAGE_UPLOAD_OPENAPI)
+async def upload_leaf(request: Request):
+    started = time.perf_counter()
 
     try:
+        # READ ONCE (streaming, ditolak begitu melewati batas ukuran)
+        image = await ingest_image_upload(request)
+        content = image.buffer
+
         logger.info(
-            "Upload received | filename=%s | content_type=%s",
-            image.filename, image.content_type
+            "Upload received | filename=%s | format=%s | size=%d",
+            image.filename, image.fmt, image.size
         )
-        # READ ONCE
-        content = await image.read()
-        validate_image(image, content)
-
-        # prepare output dir (per sample)
-        sample_id = str(uuid.uuid4())
-        sample_dir = UPLOAD_DIR / sample_id
-
-        # PROCESS (IN-MEMORY)
-        result = process_leaf_image(
-            image_bytes=content,
-            output_dir=str(sample_dir)
+
+        # output dir per sample = alamat konten (gambar + parameter)
+        sample_id = make_cache_key(content, artifacts=sorted(ARTIFACTS))
+
+        async def compute():
+            validate_image(content)
+
+            # PROCESS (IN-MEMORY, di worker pool)
+            result = await pipeline_executor.run(
+                process_leaf_image,
+                image_bytes=content,
+                profile=pipeline_metrics.enabled,
+                encoding=ARTIFACT_ENCODING,
+                segmentation=SEGMENTATION_METHOD,
+                scoring=SCORING,
+                **artifact_store.pipeline_options(sample_id)
+            )
+            pipeline_metrics.observe_timings(result.pop("timings", None))
+            store_result_files(artifact_store, sample_id, result)
+
+            # build image url if exists
+            return attach_artifact_urls(result, sample_id)
+
+        result, cached = await result_cache.get_or_compute(
+            sample_id, compute, with_artifacts=True
         )
 
+        pipeline_metrics.observe_request(
+            "upload", time.perf_counter() - started, cached
+        )
+        # foto yang sama dikirim ulang (refresh / submit ganda) tidak dicatat lagi
+        if not cached:
+            history_store.record(
+                result,
+                plot_id=image.fields.get("plot_id") or None,
+                tree_id=image.fields.get("tree_id") or None,
+                filename=image.filename,
+                sample_id=sample_id
+            )
         logger.info(
-            "Processing success | score=%s | label=%s",
-            result["score"], result["label"]
+            "Processing success | score=%s | label=%s | cached=%s",
+            result["score"], result["label"], cached
         )
 
-        # build image url if exists
-        if "segmented_image" in result:
-            result["segmented_url"] = f"/temp/uploads/{sample_id}/{result['segmented_image']}"
-        if "exg_image" in result:
-            result["exg_url"] = f"/temp/uploads/{sample_id}/{result['exg_image']}"
-        if "gli_image" in result:
-            result["gli_url"] = f"/temp/uploads/{sample_id}/{result['gli_image']}"
-        if "hist_exg" in result:
-            result["hist_exg_url"] = f"/temp/uploads/{sample_id}/{result['hist_exg']}"
-        if "hist_gli" in result:
-            result["hist_gli_url"] = f"/temp/uploads/{sample_id}/{result['hist_gli']}"
-        if "exg_overlay" in result: 
-            result["exg_overlay_url"] = f"/temp/uploads/{sample_id}/{result['exg_overlay']}"
-        if "gli_overlay" in result:
-            result["gli_overlay_url"] = f"/temp/uploads/{sample_id}/{result['gli_overlay']}"
-
         return templates.TemplateResponse(
             "index.html",
             {
@@ -101,6 +112,22 @@ async def upload_leaf(
             }
         )
 
+    except QueueFullError:
+        logger.warning(
+            "Pipeline queue full | in_flight=%d", pipeline_executor.in_flight
+        )
+        return templates.TemplateResponse(
+            "index.html",
+            {
+                "request": request,
+                "error_message": (
+                    "Server sedang sibuk. Silakan coba lagi beberapa saat."
+                )
+            },
+            status_code=503,
+            headers={"Retry-After": str(PIPELINE_RETRY_AFTER)}
+        )
+
     except ValueError as e:
         logger.warning("Validation error: %s", str(e))
         return templates.TemplateResponse(
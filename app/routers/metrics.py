@@ -0,0 +1,40 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.utils.artifact_store import artifact_store
+from app.utils.executor import pipeline_executor
+from app.utils.metrics import pipeline_metrics
+
+router = APIRouter()
+
+pipeline_metrics.add_gauge(
+    "leaf_pipeline_queue_depth",
+    "Jobs waiting for a free pipeline worker.",
+    lambda: pipeline_executor.queue_depth
+)
+pipeline_metrics.add_gauge(
+    "leaf_pipeline_in_flight",
+    "Jobs running or waiting in the pipeline executor.",
+    lambda: pipeline_executor.in_flight
+)
+pipeline_metrics.add_gauge(
+    "leaf_artifact_store_bytes",
+    "Artifact bytes held by the artifact store (memory or disk).",
+    lambda: artifact_store.total_bytes
+)
+pipeline_metrics.add_gauge(
+    "leaf_artifact_store_samples",
+    "Samples held by the artifact store.",
+    lambda: len(artifact_store)
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus text exposition of pipeline metrics.
+    """
+    return PlainTextResponse(
+        pipeline_metrics.render(),
+        media_type="text/plain; version=0.0.4"
+    )
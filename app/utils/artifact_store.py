@@ -0,0 +1,416 @@
+"""
+Artifact stores: where encoded artifacts (and result.json) of a
+sample live and how they are served.
+
+- FileArtifactStore: `temp/uploads/<sample_id>/`, written by the
+  pipeline worker itself (optionally in background), served by the
+  /temp StaticFiles mount.
+- MemoryArtifactStore: bytes kept in this process, bounded by total
+  size and TTL, served by the /artifacts route. Nothing touches disk.
+
+Both expire samples by TTL and a size cap, oldest first, from a single
+periodic sweeper (ArtifactSweeper), not from the request path.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.config import (
+    UPLOAD_DIR,
+    UPLOAD_TTL,
+    ARTIFACT_STORE,
+    ARTIFACT_ASYNC_WRITE,
+    ARTIFACT_WAIT_TIMEOUT,
+    ARTIFACT_MEMORY_MAX_BYTES,
+    ARTIFACT_DISK_MAX_BYTES,
+    ARTIFACT_SWEEP_INTERVAL
+)
+
+logger = logging.getLogger("artifact-store")
+
+MEDIA_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".webp": "image/webp",
+    ".json": "application/json",
+}
+
+
+@dataclass
+class StoredArtifact:
+    data: bytes
+    etag: str
+    media_type: str
+
+
+def _artifact(filename, data):
+    return StoredArtifact(
+        data=data,
+        etag=f'"{hashlib.blake2b(data, digest_size=12).hexdigest()}"',
+        media_type=MEDIA_TYPES.get(Path(filename).suffix, "application/octet-stream")
+    )
+
+
+class FileArtifactStore:
+    """
+    One folder per sample under `base_dir`.
+
+    Expiry works from an in-memory index {sample_id: [touched, size,
+    created]} kept in touch order (oldest first), rebuilt once from the
+    folder mtimes by `load_index()`. Requests only update the index;
+    `sweep()` removes samples untouched for `ttl` seconds, then the
+    oldest while the total exceeds `max_bytes`.
+
+    A sample is indexed when its folder is created (pipeline_options,
+    before the worker writes), so folders left by a failed job are
+    still swept. New or rewritten samples are measured by the sweeper
+    once `settle` seconds have passed, when background writes have
+    landed; files added with `put` afterwards add their size directly.
+    """
+
+    def __init__(
+        self,
+        base_dir=UPLOAD_DIR,
+        background_write=ARTIFACT_ASYNC_WRITE,
+        ttl=UPLOAD_TTL.total_seconds(),
+        max_bytes=ARTIFACT_DISK_MAX_BYTES,
+        settle=ARTIFACT_WAIT_TIMEOUT
+    ):
+        self.base_dir = Path(base_dir)
+        self.background_write = background_write
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.settle = settle
+        self.total_bytes = 0
+        self._index = OrderedDict()
+        self._unmeasured = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._index)
+
+    def sample_dir(self, sample_id):
+        return self.base_dir / sample_id
+
+    def pipeline_options(self, sample_id):
+        """
+        process_leaf_image keyword arguments: the worker writes the files.
+        The folder is created and (re)indexed as unmeasured first.
+        """
+        self.sample_dir(sample_id).mkdir(parents=True, exist_ok=True)
+        now = time.time()
+        with self._lock:
+            entry = self._index.get(sample_id)
+            if entry is None:
+                self._index[sample_id] = [now, None, now]
+            else:
+                # worker menulis ulang file: ukuran lama tidak berlaku
+                self.total_bytes -= entry[1] or 0
+                entry[:] = [now, None, now]
+                self._index.move_to_end(sample_id)
+            self._unmeasured.add(sample_id)
+
+        return {
+            "output_dir": str(self.sample_dir(sample_id)),
+            "background_write": self.background_write
+        }
+
+    def url(self, sample_id, filename):
+        return f"/{self.base_dir.as_posix()}/{sample_id}/{filename}"
+
+    def load_index(self):
+        """
+        Rebuild the index from the sample folders (once, at startup).
+        """
+        entries = []
+        if self.base_dir.exists():
+            for entry in os.scandir(self.base_dir):
+                if entry.is_dir(follow_symlinks=False):
+                    entries.append((entry.stat().st_mtime, entry.name, _dir_size(entry.path)))
+        entries.sort()
+
+        with self._lock:
+            self._index = OrderedDict(
+                (name, [mtime, size, mtime]) for mtime, name, size in entries
+            )
+            self._unmeasured.clear()
+            self.total_bytes = sum(size for _, _, size in entries)
+
+        logger.info(
+            "Artifact index loaded | samples=%d | bytes=%d",
+            len(entries), self.total_bytes
+        )
+
+    def put(self, sample_id, filename, data):
+        folder = self.sample_dir(sample_id)
+        target = folder / filename
+
+        # file kecil (result.json): tulis & catat ukuran di bawah lock
+        # agar tidak bertabrakan dengan pengukuran sweeper
+        with self._lock:
+            folder.mkdir(parents=True, exist_ok=True)
+            try:
+                old_size = target.stat().st_size
+            except FileNotFoundError:
+                old_size = 0
+            tmp = folder / f".{filename}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            # atomic: file hanya muncul jika sudah lengkap
+            os.replace(tmp, target)
+
+            now = time.time()
+            entry = self._index.get(sample_id)
+            if entry is None:
+                # ukuran diukur sweeper setelah artifact background selesai
+                self._index[sample_id] = [now, None, now]
+                self._unmeasured.add(sample_id)
+            else:
+                entry[0] = now
+                self._index.move_to_end(sample_id)
+                if entry[1] is not None:
+                    entry[1] += len(data) - old_size
+                    self.total_bytes += len(data) - old_size
+
+    def get(self, sample_id, filename):
+        try:
+            data = (self.sample_dir(sample_id) / filename).read_bytes()
+        except OSError:
+            return None
+        return _artifact(filename, data)
+
+    def touch(self, sample_id):
+        """
+        True if the sample still exists; refreshes its expiry.
+        """
+        with self._lock:
+            if sample_id not in self._index:
+                return False
+        try:
+            # mtime ikut diperbarui: dipakai saat index dibangun ulang
+            os.utime(self.sample_dir(sample_id))
+        except OSError:
+            self._forget(sample_id)
+            return False
+
+        with self._lock:
+            entry = self._index.get(sample_id)
+            if entry is None:
+                return False
+            entry[0] = time.time()
+            self._index.move_to_end(sample_id)
+        return True
+
+    def sweep(self, now=None):
+        """
+        Measure new samples, then remove expired ones and the oldest
+        while over `max_bytes`. Returns the number of samples removed.
+        """
+        now = time.time() if now is None else now
+
+        with self._lock:
+            settled = [
+                sample_id for sample_id in self._unmeasured
+                if now - self._index[sample_id][2] >= self.settle
+            ]
+            # diukur di bawah lock: put berikutnya menambah ukurannya sendiri
+            for sample_id in settled:
+                size = _dir_size(self.sample_dir(sample_id))
+                self._index[sample_id][1] = size
+                self.total_bytes += size
+                self._unmeasured.discard(sample_id)
+
+        victims = []
+        with self._lock:
+            while self._index:
+                sample_id, (touched, size, _) = next(iter(self._index.items()))
+                if now - touched <= self.ttl and self.total_bytes <= self.max_bytes:
+                    break
+                self._pop(sample_id)
+                victims.append(sample_id)
+
+        # hapus folder di luar lock, request tetap bisa memakai index
+        for sample_id in victims:
+            shutil.rmtree(self.sample_dir(sample_id), ignore_errors=True)
+        return len(victims)
+
+    def _forget(self, sample_id):
+        with self._lock:
+            if sample_id in self._index:
+                self._pop(sample_id)
+
+    def _pop(self, sample_id):
+        _, size, _ = self._index.pop(sample_id)
+        self._unmeasured.discard(sample_id)
+        self.total_bytes -= size or 0
+
+
+class MemoryArtifactStore:
+    """
+    In-process store: {sample_id: {filename: bytes}} in LRU order.
+
+    Samples expire `ttl` seconds after their last touch and the least
+    recently used are evicted while the total exceeds `max_bytes`.
+    Per process: run a single API worker per container.
+    """
+
+    def __init__(self, max_bytes=ARTIFACT_MEMORY_MAX_BYTES, ttl=UPLOAD_TTL.total_seconds()):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self._samples = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def pipeline_options(self, sample_id):
+        """
+        process_leaf_image keyword arguments: encoded bytes come back
+        with the result (see store_result_files).
+        """
+        return {"return_artifacts": True}
+
+    def url(self, sample_id, filename):
+        return f"/artifacts/{sample_id}/{filename}"
+
+    def put(self, sample_id, filename, data):
+        with self._lock:
+            entry = self._samples.get(sample_id)
+            if entry is None:
+                entry = self._samples[sample_id] = {"files": {}, "touched": 0.0}
+            old = entry["files"].get(filename)
+            if old is not None:
+                self.total_bytes -= len(old.data)
+
+            entry["files"][filename] = _artifact(filename, data)
+            entry["touched"] = time.monotonic()
+            self.total_bytes += len(data)
+            self._samples.move_to_end(sample_id)
+            self._evict()
+
+    def get(self, sample_id, filename):
+        with self._lock:
+            entry = self._live(sample_id)
+            return None if entry is None else entry["files"].get(filename)
+
+    def touch(self, sample_id):
+        with self._lock:
+            entry = self._live(sample_id)
+            if entry is None:
+                return False
+            entry["touched"] = time.monotonic()
+            self._samples.move_to_end(sample_id)
+            return True
+
+    def load_index(self):
+        pass
+
+    def sweep(self, now=None):
+        with self._lock:
+            before = len(self._samples)
+            self._evict()
+            return before - len(self._samples)
+
+    def _live(self, sample_id):
+        entry = self._samples.get(sample_id)
+        if entry is not None and time.monotonic() - entry["touched"] > self.ttl:
+            self._drop(sample_id)
+            return None
+        return entry
+
+    def _drop(self, sample_id):
+        entry = self._samples.pop(sample_id)
+        self.total_bytes -= sum(len(a.data) for a in entry["files"].values())
+
+    def _evict(self):
+        # kedaluwarsa dulu (urutan LRU = urutan touch), lalu batas memori
+        now = time.monotonic()
+        while self._samples:
+            sample_id, entry = next(iter(self._samples.items()))
+            if now - entry["touched"] <= self.ttl and self.total_bytes <= self.max_bytes:
+                break
+            self._drop(sample_id)
+            logger.debug("Artifact evicted | sample=%s", sample_id[:12])
+
+
+def _dir_size(path):
+    try:
+        return sum(
+            entry.stat().st_size for entry in os.scandir(path)
+            if entry.is_file(follow_symlinks=False)
+        )
+    except OSError:
+        return 0
+
+
+class ArtifactSweeper:
+    """
+    Single background thread that calls `store.sweep()` every
+    `interval` seconds; the index is loaded once in `start()`.
+    """
+
+    def __init__(self, store, interval=ARTIFACT_SWEEP_INTERVAL):
+        self.store = store
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self.store.load_index()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="artifact-sweeper", daemon=True
+        )
+        self._thread.start()
+
+    def shutdown(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                removed = self.store.sweep()
+            except Exception:
+                logger.exception("Artifact sweep failed")
+                continue
+            if removed:
+                logger.info(
+                    "Artifact sweep | removed=%d | samples=%d | bytes=%d",
+                    removed, len(self.store), self.store.total_bytes
+                )
+
+
+def store_result_files(store, sample_id, result):
+    """
+    Move encoded artifacts returned by the pipeline (return_artifacts)
+    from the result into the store.
+    """
+    for filename, data in result.pop("artifact_files", {}).items():
+        store.put(sample_id, filename, data)
+    return result
+
+
+def make_artifact_store(backend=ARTIFACT_STORE):
+    if backend == "file":
+        return FileArtifactStore()
+    if backend == "memory":
+        return MemoryArtifactStore()
+    raise ValueError(f"Unknown artifact store: {backend}")
+
+
+artifact_store = make_artifact_store()
+artifact_sweeper = ArtifactSweeper(artifact_store)
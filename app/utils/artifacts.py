@@ -0,0 +1,91 @@
+import asyncio
+import time
+from pathlib import Path
+
+from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException
+
+from app.config import (
+    ARTIFACT_IMAGE_FORMAT,
+    ARTIFACT_QUALITY,
+    ARTIFACT_PNG_COMPRESSION,
+    ARTIFACT_OVERLAY_EDGE,
+    ARTIFACT_WAIT_TIMEOUT,
+    HISTOGRAM_BACKEND
+)
+from app.utils.artifact_store import artifact_store
+from image_pipeline.artifact_writer import ArtifactEncoding
+from image_pipeline.pipeline import ARTIFACTS
+
+# key file artifact pada result -> key url
+ARTIFACT_URL_KEYS = {
+    "segmented_image": "segmented_url",
+    "exg_image": "exg_url",
+    "gli_image": "gli_url",
+    "hist_exg": "hist_exg_url",
+    "hist_gli": "hist_gli_url",
+    "exg_overlay": "exg_overlay_url",
+    "gli_overlay": "gli_overlay_url",
+}
+
+# format / kualitas artifact semua endpoint (ikut cache key)
+ARTIFACT_ENCODING = ArtifactEncoding(
+    image_format=ARTIFACT_IMAGE_FORMAT,
+    quality=ARTIFACT_QUALITY,
+    png_compression=ARTIFACT_PNG_COMPRESSION,
+    overlay_edge=ARTIFACT_OVERLAY_EDGE,
+    histogram_backend=HISTOGRAM_BACKEND
+)
+
+# nama file artifact tanpa ekstensi
+ARTIFACT_STEMS = frozenset(stem for stem, _, _ in ARTIFACTS.values())
+
+# interval cek file artifact yang sedang ditulis (detik)
+POLL_INTERVAL = 0.05
+
+
+def attach_artifact_urls(result, sample_id, store=artifact_store):
+    """
+    Add public URLs for every artifact file present in result.
+    """
+    for file_key, url_key in ARTIFACT_URL_KEYS.items():
+        if file_key in result:
+            result[url_key] = store.url(sample_id, result[file_key])
+    return result
+
+
+class ArtifactFiles(StaticFiles):
+    """
+    StaticFiles that waits for artifacts still being written.
+
+    A missing artifact file inside an existing sample folder is
+    assumed to be queued on the background writer: the request waits
+    (up to `wait_timeout` seconds) until it lands instead of
+    returning 404 right away.
+    """
+
+    def __init__(self, *args, wait_timeout=ARTIFACT_WAIT_TIMEOUT, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_timeout = wait_timeout
+
+    def _maybe_pending(self, path):
+        file = Path(self.directory) / path
+        return Path(file.name).stem in ARTIFACT_STEMS and file.parent.is_dir()
+
+    async def get_response(self, path, scope):
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as e:
+            if e.status_code != 404 or not self._maybe_pending(path):
+                raise
+
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            try:
+                return await super().get_response(path, scope)
+            except HTTPException as e:
+                if e.status_code != 404:
+                    raise
+
+        raise HTTPException(status_code=404)
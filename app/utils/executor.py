@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from app.config import (
+    PIPELINE_BACKEND,
+    PIPELINE_WORKERS,
+    PIPELINE_MAX_QUEUE
+)
+
+logger = logging.getLogger("pipeline-executor")
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the pipeline queue has no room for another job.
+    """
+
+
+def _warmup_worker():
+    """
+    Worker initializer: import heavy modules once per worker
+    so the first request does not pay for it.
+    """
+    import cv2
+    import numpy  # noqa: F401
+    import image_pipeline.pipeline  # noqa: F401
+
+    # satu thread OpenCV per worker, paralelisme dari jumlah worker
+    cv2.setNumThreads(1)
+
+
+def _noop():
+    return None
+
+
+class PipelineExecutor:
+    """
+    Run CPU-bound pipeline jobs off the event loop in a bounded pool.
+
+    backend="process" uses a ProcessPoolExecutor (scales with cores),
+    backend="thread" uses a ThreadPoolExecutor (for comparison).
+    At most `max_workers + max_queue` jobs are in flight; beyond that
+    `run` raises QueueFullError.
+    """
+
+    def __init__(self, backend="process", max_workers=1, max_queue=16):
+        if backend not in ("process", "thread"):
+            raise ValueError(f"Unknown pipeline backend: {backend}")
+
+        self.backend = backend
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._pool = None
+        self._in_flight = 0
+
+    @property
+    def queue_depth(self):
+        """
+        Number of jobs waiting for a free worker.
+        """
+        return max(0, self._in_flight - self.max_workers)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def start(self):
+        if self._pool is not None:
+            return
+
+        if self.backend == "process":
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warmup_worker
+            )
+            # paksa semua worker hidup & warm sebelum request pertama
+            futures = [self._pool.submit(_noop) for _ in range(self.max_workers)]
+            for f in futures:
+                f.result()
+        else:
+            _warmup_worker()
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="pipeline"
+            )
+
+        logger.info(
+            "Pipeline executor started | backend=%s | workers=%d | max_queue=%d",
+            self.backend, self.max_workers, self.max_queue
+        )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run `fn(*args, **kwargs)` in the pool and await its result.
+        """
+        if self._in_flight >= self.max_workers + self.max_queue:
+            raise QueueFullError("Antrian pemrosesan penuh.")
+
+        if self._pool is None:
+            self.start()
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._pool, partial(fn, *args, **kwargs)
+            )
+        finally:
+            self._in_flight -= 1
+
+
+pipeline_executor = PipelineExecutor(
+    backend=PIPELINE_BACKEND,
+    max_workers=PIPELINE_WORKERS,
+    max_queue=PIPELINE_MAX_QUEUE
+)
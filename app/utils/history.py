@@ -0,0 +1,579 @@
+"""
+Persistent analysis history (SQLite, WAL mode).
+
+Results are queued from the request path and written by a single
+background thread in batched transactions; queries open their own
+read-only connections, so reads never wait for the writer.
+
+Stored features (exg, gli, g) allow re-scoring all rows with a new
+scoring config:
+
+    python -m app.utils.history rescore --config scoring.json
+"""
+import argparse
+import json
+import logging
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from app.config import (
+    HISTORY_DB_PATH,
+    HISTORY_ENABLED,
+    HISTORY_BATCH_SIZE,
+    HISTORY_FLUSH_INTERVAL,
+    HISTORY_MAX_PENDING
+)
+from image_pipeline.scoring import score_batch, load_scoring_config
+
+logger = logging.getLogger("history")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    observed_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    plot_id TEXT,
+    tree_id TEXT,
+    sample_id TEXT,
+    filename TEXT,
+    mode TEXT,
+    score REAL,
+    label TEXT,
+    exg REAL,
+    gli REAL,
+    zonal_stats TEXT,
+    g REAL,
+    scoring_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_observed
+    ON analyses (observed_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_plot
+    ON analyses (plot_id, observed_at, score, exg, gli, label);
+CREATE INDEX IF NOT EXISTS idx_analyses_tree
+    ON analyses (plot_id, tree_id, observed_at);
+CREATE TABLE IF NOT EXISTS analyses_daily (
+    plot_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    sum_score REAL NOT NULL,
+    min_score REAL,
+    max_score REAL,
+    sum_exg REAL NOT NULL,
+    sum_gli REAL NOT NULL,
+    first REAL NOT NULL,
+    last REAL NOT NULL,
+    PRIMARY KEY (day, plot_id, label)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_daily_plot
+    ON analyses_daily (plot_id, day);
+"""
+
+# rollup harian diperbarui di transaksi yang sama dengan insert mentah
+UPSERT_DAILY = """
+INSERT INTO analyses_daily
+    (day, plot_id, label, n, sum_score, min_score, max_score, sum_exg, sum_gli, first, last)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, plot_id, label) DO UPDATE SET
+    n = n + excluded.n,
+    sum_score = sum_score + excluded.sum_score,
+    min_score = min(coalesce(min_score, excluded.min_score), coalesce(excluded.min_score, min_score)),
+    max_score = max(coalesce(max_score, excluded.max_score), coalesce(excluded.max_score, max_score)),
+    sum_exg = sum_exg + excluded.sum_exg,
+    sum_gli = sum_gli + excluded.sum_gli,
+    first = min(first, excluded.first),
+    last = max(last, excluded.last)
+"""
+
+# kolom yang ditambahkan setelah tabel dibuat (ALTER TABLE untuk DB lama)
+MIGRATIONS = (
+    ("g", "REAL"),
+    ("scoring_version", "TEXT"),
+)
+
+# rollup harian dihitung ulang dari tabel mentah (setelah rescore)
+REBUILD_DAILY = """
+DELETE FROM analyses_daily;
+INSERT INTO analyses_daily
+    (day, plot_id, label, n, sum_score, min_score, max_score, sum_exg, sum_gli, first, last)
+SELECT CAST(observed_at / 86400 AS INTEGER), coalesce(plot_id, ''), coalesce(label, ''),
+    COUNT(*), coalesce(SUM(score), 0), MIN(score), MAX(score),
+    coalesce(SUM(exg), 0), coalesce(SUM(gli), 0), MIN(observed_at), MAX(observed_at)
+FROM analyses GROUP BY 1, 2, 3;
+"""
+
+DAY = 86400
+
+COLUMNS = (
+    "observed_at", "created_at", "plot_id", "tree_id", "sample_id",
+    "filename", "mode", "score", "label", "exg", "gli", "zonal_stats",
+    "g", "scoring_version"
+)
+
+# fitur konfigurasi skor -> kolom riwayat
+HISTORY_FEATURES = {
+    "mean_ExG": "exg",
+    "mean_GLI": "gli",
+    "mean_G": "g",
+}
+
+# baris per chunk saat rescore (satu transaksi per chunk)
+RESCORE_CHUNK = 50_000
+
+# bucket waktu untuk agregasi -> format strftime SQLite
+BUCKETS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-W%W",
+    "month": "%Y-%m",
+}
+
+# batas baris per query riwayat
+MAX_LIMIT = 1000
+
+_STOP = object()
+
+
+class HistoryStore:
+    """
+    Append-only store of analysis results with plot / tree ID.
+
+    `record()` never blocks the caller: rows go to a bounded queue and
+    are inserted by the writer thread every `batch_size` rows or
+    `flush_interval` seconds, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        path=HISTORY_DB_PATH,
+        enabled=HISTORY_ENABLED,
+        batch_size=HISTORY_BATCH_SIZE,
+        flush_interval=HISTORY_FLUSH_INTERVAL,
+        max_pending=HISTORY_MAX_PENDING
+    ):
+        self.path = Path(path)
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self.dropped = 0
+
+    def _connect(self, readonly=False):
+        if readonly:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        else:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            _init_schema(conn)
+
+        self._thread = threading.Thread(
+            target=self._writer, name="history-writer", daemon=True
+        )
+        self._thread.start()
+        logger.info("History store ready | path=%s", self.path)
+
+    def shutdown(self):
+        """
+        Flush pending rows and stop the writer thread.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def record(
+        self, result, plot_id=None, tree_id=None, filename=None,
+        observed_at=None, sample_id=None
+    ):
+        """
+        Queue one analysis result for insertion. `sample_id` defaults
+        to the one in the result (set when artifacts were stored).
+        """
+        if self._thread is None:
+            return
+
+        now = time.time()
+        zonal = result.get("zonal_stats")
+        row = (
+            observed_at if observed_at is not None else now,
+            now,
+            plot_id,
+            tree_id,
+            sample_id if sample_id is not None else result.get("sample_id"),
+            filename,
+            result.get("mode", "standard"),
+            result.get("score"),
+            result.get("label"),
+            result.get("exg"),
+            result.get("gli"),
+            json.dumps(zonal) if zonal is not None else None,
+            result.get("g"),
+            result.get("scoring_version")
+        )
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("History queue full, row dropped | dropped=%d", self.dropped)
+
+    def _writer(self):
+        conn = self._connect()
+        insert = (
+            f"INSERT INTO analyses ({', '.join(COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(COLUMNS))})"
+        )
+        batch = []
+        deadline = None
+        stopping = False
+
+        while not stopping:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+            except queue.Empty:
+                pass
+
+            if batch and (
+                stopping
+                or len(batch) >= self.batch_size
+                or time.monotonic() >= deadline
+            ):
+                try:
+                    with conn:
+                        conn.executemany(insert, batch)
+                        conn.executemany(UPSERT_DAILY, _daily_rollup(batch))
+                except sqlite3.Error:
+                    logger.exception("History write failed | rows=%d", len(batch))
+                batch = []
+                deadline = None
+
+        conn.close()
+
+    def query(self, plot_id=None, tree_id=None, start=None, end=None, limit=100, offset=0):
+        """
+        Analyses in [start, end) (unix seconds), newest first.
+        """
+        if not self.path.exists():
+            return []
+
+        where, params = _filters(plot_id, tree_id, start, end)
+        sql = (
+            f"SELECT id, {', '.join(COLUMNS)} FROM analyses {where} "
+            f"ORDER BY observed_at DESC LIMIT ? OFFSET ?"
+        )
+        params += [min(limit, MAX_LIMIT), offset]
+
+        with closing(self._connect(readonly=True)) as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        return [_row_to_dict(row) for row in rows]
+
+    def aggregate(self, plot_id=None, start=None, end=None, bucket=None):
+        """
+        Per plot (and time bucket, if given): count, score / index
+        averages, score min / max and label counts.
+        """
+        if bucket is not None and bucket not in BUCKETS:
+            raise ValueError(f"Bucket harus salah satu dari {tuple(BUCKETS)}.")
+        if not self.path.exists():
+            return []
+
+        # rentang per hari penuh -> baca rollup harian, selain itu tabel mentah
+        if _day_aligned(start) and _day_aligned(end):
+            rows = self._aggregate_daily(plot_id, start, end, bucket)
+        else:
+            rows = self._aggregate_raw(plot_id, start, end, bucket)
+
+        # gabungkan baris per label menjadi satu grup (plot, bucket)
+        groups = {}
+        for r in rows:
+            g = groups.setdefault((r["plot_id"], r["bucket"]), {
+                "plot_id": r["plot_id"],
+                "bucket": r["bucket"],
+                "n": 0,
+                "sum_score": 0.0,
+                "min_score": None,
+                "max_score": None,
+                "sum_exg": 0.0,
+                "sum_gli": 0.0,
+                "first": r["first"],
+                "last": r["last"],
+                "labels": {}
+            })
+            g["n"] += r["n"]
+            g["sum_score"] += r["sum_score"] or 0.0
+            g["sum_exg"] += r["sum_exg"] or 0.0
+            g["sum_gli"] += r["sum_gli"] or 0.0
+            g["min_score"] = _min(g["min_score"], r["min_score"])
+            g["max_score"] = _max(g["max_score"], r["max_score"])
+            g["first"] = min(g["first"], r["first"])
+            g["last"] = max(g["last"], r["last"])
+            g["labels"][r["label"]] = r["n"]
+
+        results = []
+        for key in sorted(groups, key=lambda k: (k[0] or "", k[1] or "")):
+            g = groups[key]
+            n = g.pop("n")
+            results.append({
+                "plot_id": g["plot_id"],
+                "bucket": g["bucket"],
+                "n": n,
+                "mean_score": round(g.pop("sum_score") / n, 2),
+                "min_score": g["min_score"],
+                "max_score": g["max_score"],
+                "mean_exg": round(g.pop("sum_exg") / n, 2),
+                "mean_gli": round(g.pop("sum_gli") / n, 3),
+                "first": _iso(g["first"]),
+                "last": _iso(g["last"]),
+                "labels": g["labels"]
+            })
+        if bucket is None:
+            for r in results:
+                del r["bucket"]
+        return results
+
+    def _aggregate_raw(self, plot_id, start, end, bucket):
+        where, params = _filters(plot_id, None, start, end)
+        bucket_sql = (
+            f"strftime('{BUCKETS[bucket]}', observed_at, 'unixepoch')"
+            if bucket else "NULL"
+        )
+        sql = (
+            f"SELECT plot_id, {bucket_sql} AS bucket, label, COUNT(*) AS n, "
+            f"SUM(score) AS sum_score, MIN(score) AS min_score, MAX(score) AS max_score, "
+            f"SUM(exg) AS sum_exg, SUM(gli) AS sum_gli, "
+            f"MIN(observed_at) AS first, MAX(observed_at) AS last "
+            f"FROM analyses {where} GROUP BY plot_id, bucket, label"
+        )
+        with closing(self._connect(readonly=True)) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _aggregate_daily(self, plot_id, start, end, bucket):
+        clauses, params = [], []
+        if plot_id is not None:
+            clauses.append("plot_id = ?")
+            params.append(plot_id)
+        if start is not None:
+            clauses.append("day >= ?")
+            params.append(int(start // DAY))
+        if end is not None:
+            clauses.append("day < ?")
+            params.append(int(end // DAY))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        bucket_sql = (
+            f"strftime('{BUCKETS[bucket]}', day * {DAY}, 'unixepoch')"
+            if bucket else "NULL"
+        )
+        # '' di rollup = plot / label kosong (kolom primary key NOT NULL)
+        sql = (
+            f"SELECT nullif(plot_id, '') AS plot_id, {bucket_sql} AS bucket, "
+            f"nullif(label, '') AS label, SUM(n) AS n, "
+            f"SUM(sum_score) AS sum_score, MIN(min_score) AS min_score, MAX(max_score) AS max_score, "
+            f"SUM(sum_exg) AS sum_exg, SUM(sum_gli) AS sum_gli, "
+            f"MIN(first) AS first, MAX(last) AS last "
+            f"FROM analyses_daily {where} GROUP BY plot_id, bucket, label"
+        )
+        with closing(self._connect(readonly=True)) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def rescore(self, config, chunk_size=RESCORE_CHUNK):
+        """
+        Recompute score and label of every stored analysis with the
+        scoring `config` (score_batch per chunk of rows), then rebuild
+        the daily rollup. Rows recorded before the `g` column existed
+        have no complete features and are left unchanged.
+
+        Scores come from the stored (rounded) exg / gli / g, so they can
+        differ from a fresh analysis in the last decimal.
+        """
+        missing = [name for name, *_ in config.features if name not in HISTORY_FEATURES]
+        if missing:
+            raise ValueError(f"Fitur tidak tersimpan di riwayat: {', '.join(missing)}.")
+        columns = [HISTORY_FEATURES[name] for name, *_ in config.features]
+        complete = " AND ".join(f"{c} IS NOT NULL" for c in columns)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        rescored = 0
+        with closing(self._connect()) as conn:
+            _init_schema(conn)
+            select = (
+                f"SELECT id, {', '.join(columns)} FROM analyses "
+                f"WHERE id > ? AND {complete} ORDER BY id LIMIT ?"
+            )
+            last_id = 0
+            while True:
+                rows = conn.execute(select, (last_id, chunk_size)).fetchall()
+                if not rows:
+                    break
+                data = np.array([tuple(r) for r in rows], dtype=np.float64)
+                scores = score_batch(
+                    {name: data[:, i + 1] for i, (name, *_) in enumerate(config.features)},
+                    config
+                )
+                ids = data[:, 0].astype(np.int64).tolist()
+                with conn:
+                    conn.executemany(
+                        "UPDATE analyses SET score = ?, label = ?, scoring_version = ? WHERE id = ?",
+                        zip(scores["score"].tolist(), scores["label"].tolist(),
+                            [config.version] * len(ids), ids)
+                    )
+                rescored += len(ids)
+                last_id = ids[-1]
+
+            conn.executescript(f"BEGIN; {REBUILD_DAILY} COMMIT;")
+            skipped = conn.execute(
+                f"SELECT COUNT(*) FROM analyses WHERE NOT ({complete})"
+            ).fetchone()[0]
+
+        logger.info(
+            "History rescored | version=%s | rows=%d | skipped=%d",
+            config.version, rescored, skipped
+        )
+        return {"version": config.version, "rescored": rescored, "skipped": skipped}
+
+
+def to_epoch(dt: datetime | None):
+    """
+    Datetime (e.g. query parameter) -> unix seconds; naive = UTC.
+    """
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _init_schema(conn):
+    conn.executescript(SCHEMA)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(analyses)")}
+    for name, sql_type in MIGRATIONS:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE analyses ADD COLUMN {name} {sql_type}")
+    conn.commit()
+
+
+def _day_aligned(ts):
+    return ts is None or ts % DAY == 0
+
+
+def _daily_rollup(batch):
+    """
+    Pre-aggregate one batch of rows per (plot, UTC day, label).
+    """
+    idx = {name: i for i, name in enumerate(COLUMNS)}
+    groups = {}
+    for row in batch:
+        ts, score = row[idx["observed_at"]], row[idx["score"]]
+        key = (int(ts // DAY), row[idx["plot_id"]] or "", row[idx["label"]] or "")
+        g = groups.get(key)
+        if g is None:
+            groups[key] = [1, score or 0.0, score, score,
+                           row[idx["exg"]] or 0.0, row[idx["gli"]] or 0.0, ts, ts]
+            continue
+        g[0] += 1
+        g[1] += score or 0.0
+        g[2] = _min(g[2], score)
+        g[3] = _max(g[3], score)
+        g[4] += row[idx["exg"]] or 0.0
+        g[5] += row[idx["gli"]] or 0.0
+        g[6] = min(g[6], ts)
+        g[7] = max(g[7], ts)
+    return [key + tuple(g) for key, g in groups.items()]
+
+
+def _filters(plot_id, tree_id, start, end):
+    clauses, params = [], []
+    if plot_id is not None:
+        clauses.append("plot_id = ?")
+        params.append(plot_id)
+    if tree_id is not None:
+        clauses.append("tree_id = ?")
+        params.append(tree_id)
+    if start is not None:
+        clauses.append("observed_at >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("observed_at < ?")
+        params.append(end)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def _min(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _max(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+def _iso(ts):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+
+
+def _row_to_dict(row):
+    d = dict(row)
+    d["observed_at"] = _iso(d["observed_at"])
+    d["created_at"] = _iso(d["created_at"])
+    if d["zonal_stats"] is not None:
+        d["zonal_stats"] = json.loads(d["zonal_stats"])
+    return d
+
+
+history_store = HistoryStore()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.utils.history",
+        description="Maintenance of the analysis history database."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_rescore = sub.add_parser("rescore", help="hitung ulang skor & label semua riwayat")
+    p_rescore.add_argument("--config", default=None, help="file JSON konfigurasi skor (default: bawaan)")
+    p_rescore.add_argument("--db", default=HISTORY_DB_PATH, help="file database riwayat")
+
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_scoring_config(args.config)
+    except (OSError, ValueError) as e:
+        parser.error(f"konfigurasi skor: {e}")
+
+    report = HistoryStore(path=args.db).rescore(config)
+    print(
+        f"Selesai | versi={report['version']} | rescore={report['rescored']} "
+        f"| dilewati={report['skipped']}",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,386 @@
+import tempfile
+from collections import deque
+from dataclasses import dataclass, field
+
+from fastapi import Request
+from starlette.requests import ClientDisconnect
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+    from python_multipart.exceptions import FormParserError
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+    from multipart.exceptions import FormParserError
+
+from image_pipeline.io import sniff_image_format
+from app.config import MAX_FILE_SIZE
+
+# ruang untuk header multipart & field kecil lain di luar file gambar
+MULTIPART_OVERHEAD = 64 * 1024
+
+# panjang maksimal field teks (mis. plot_id) yang ikut disimpan
+MAX_FIELD_SIZE = 256
+
+# part arsip (zip) di atas ukuran ini dipindah dari memori ke file sementara
+SPOOL_MAX_SIZE = 1024 * 1024
+
+# deskripsi body untuk OpenAPI (endpoint membaca body sendiri)
+IMAGE_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["image"],
+                    "properties": {
+                        "plot_id": {"type": "string"},
+                        "tree_id": {"type": "string"},
+                        "image": {"type": "string", "format": "binary"}
+                    }
+                }
+            }
+        }
+    }
+}
+
+
+class UploadTooLarge(ValueError):
+    """
+    Raised as soon as the upload exceeds the size limit.
+    """
+
+
+@dataclass
+class IngestedImage:
+    filename: str | None
+    fmt: str
+    buffer: bytearray
+    fields: dict = field(default_factory=dict)
+
+    @property
+    def data(self):
+        """
+        Zero-copy view of the image bytes.
+        """
+        return memoryview(self.buffer)
+
+    @property
+    def size(self):
+        return len(self.buffer)
+
+
+class _ImagePartReader:
+    """
+    Multipart callbacks: keep only the `field` file part, in a buffer
+    that never grows past `max_size`, plus small text fields sent
+    before it (truncated to MAX_FIELD_SIZE); everything else is discarded.
+    """
+
+    def __init__(self, field, max_size):
+        self.field = field
+        self.max_size = max_size
+        self.buffer = None
+        self.filename = None
+        self.fmt = None
+        self.done = False
+        self.fields = {}
+        self._capturing = False
+        self._text_name = None
+        self._text = b""
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def on_part_begin(self):
+        self._capturing = False
+        self._text_name = None
+        self._text = b""
+        self._disposition = b""
+
+    def on_header_field(self, data, start, end):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if name == self.field and b"filename" in options and not self.done:
+            self._capturing = True
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self.buffer = bytearray()
+        elif b"filename" not in options and name:
+            self._text_name = name
+
+    def on_part_data(self, data, start, end):
+        if self._text_name is not None:
+            if len(self._text) < MAX_FIELD_SIZE:
+                self._text += data[start:min(end, start + MAX_FIELD_SIZE - len(self._text))]
+            return
+        if not self._capturing:
+            return
+
+        if len(self.buffer) + (end - start) > self.max_size:
+            raise UploadTooLarge(
+                f"Ukuran file terlalu besar. Maksimal {self.max_size // (1024 * 1024)} MB."
+            )
+        self.buffer += memoryview(data)[start:end]
+
+        # sniff magic bytes dari chunk pertama, bukan dari content_type
+        if self.fmt is None and len(self.buffer) >= 8:
+            self._sniff()
+
+    def on_part_end(self):
+        if self._text_name is not None:
+            self.fields[self._text_name] = self._text.decode("utf-8", "replace")
+            self._text_name = None
+        if self._capturing:
+            if self.fmt is None:
+                self._sniff()
+            self._capturing = False
+            self.done = True
+
+    def _sniff(self):
+        self.fmt = sniff_image_format(self.buffer)
+        if self.fmt is None:
+            raise ValueError("Format file tidak didukung. Gunakan JPG atau PNG.")
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+
+def multipart_boundary(request: Request):
+    """
+    Boundary of a multipart/form-data request (ValueError otherwise).
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise ValueError("Request harus berupa multipart/form-data.")
+    return boundary
+
+
+async def ingest_image_upload(request: Request, field="image", max_size=MAX_FILE_SIZE):
+    """
+    Stream a multipart upload and return the `field` image.
+
+    The body is read chunk by chunk: the request is rejected as soon as
+    the image (or the whole body) exceeds the limit, and the format is
+    sniffed from the first bytes. Peak memory is bounded by `max_size`.
+    Text fields are returned in `fields` if they come before the image
+    (reading stops once the image part is complete).
+    """
+    body_limit = max_size + MULTIPART_OVERHEAD
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > body_limit:
+        raise UploadTooLarge(
+            f"Ukuran file terlalu besar. Maksimal {max_size // (1024 * 1024)} MB."
+        )
+
+    boundary = multipart_boundary(request)
+
+    reader = _ImagePartReader(field, max_size)
+    parser = MultipartParser(boundary, reader.callbacks())
+
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > body_limit:
+                raise UploadTooLarge(
+                    f"Ukuran file terlalu besar. Maksimal {max_size // (1024 * 1024)} MB."
+                )
+            parser.write(chunk)
+            if reader.done:
+                break
+        else:
+            parser.finalize()
+    except FormParserError:
+        raise ValueError("Request upload tidak valid.")
+
+    if reader.buffer is None or not reader.done:
+        raise ValueError("File gambar tidak ditemukan.")
+
+    return IngestedImage(
+        filename=reader.filename,
+        fmt=reader.fmt,
+        buffer=reader.buffer,
+        fields=reader.fields
+    )
+
+
+@dataclass
+class UploadedFile:
+    """
+    One file part of a multi-file upload: image bytes in `buffer`,
+    or a spooled temporary `file` (archives), or an `error`.
+    """
+    filename: str | None
+    content_type: str | None = None
+    buffer: bytearray | None = None
+    file: object = None
+    error: str | None = None
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class _FilePartsReader:
+    """
+    Multipart callbacks for many file parts: every completed part is
+    queued in `parts`. Image parts are buffered up to `max_size` (the
+    rest of a larger part is discarded and the part becomes an error),
+    parts for which `spool(filename, content_type)` is true go to a
+    spooled temporary file. Text fields are ignored.
+    """
+
+    def __init__(self, max_files, max_size, spool):
+        self.max_files = max_files
+        self.max_size = max_size
+        self.spool = spool
+        self.parts = deque()
+        self.current = None
+        self.n_files = 0
+        self._headers = {}
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_part_begin(self):
+        self.current = None
+        self._headers = {}
+
+    def on_header_field(self, data, start, end):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"filename" not in options:
+            return
+
+        self.n_files += 1
+        if self.n_files > self.max_files:
+            raise ValueError(f"Jumlah file melebihi batas ({self.max_files}).")
+
+        content_type, _ = parse_options_header(self._headers.get(b"content-type", b""))
+        part = UploadedFile(
+            filename=options[b"filename"].decode("utf-8", "replace"),
+            content_type=content_type.decode("latin-1") or None
+        )
+        if self.spool(part.filename, part.content_type):
+            part.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        else:
+            part.buffer = bytearray()
+        self.current = part
+
+    def on_part_data(self, data, start, end):
+        part = self.current
+        if part is None or part.error is not None:
+            return
+        if part.file is not None:
+            part.file.write(data[start:end])
+            return
+
+        if len(part.buffer) + (end - start) > self.max_size:
+            part.buffer = None
+            part.error = f"Ukuran file terlalu besar. Maksimal {self.max_size // (1024 * 1024)} MB."
+            return
+        part.buffer += memoryview(data)[start:end]
+
+    def on_part_end(self):
+        if self.current is not None:
+            if self.current.file is not None:
+                self.current.file.seek(0)
+            self.parts.append(self.current)
+            self.current = None
+
+    def close(self):
+        for part in (self.current, *self.parts):
+            if part is not None:
+                part.close()
+        self.parts.clear()
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+
+def iter_upload_files(
+    request: Request, max_files, max_size=MAX_FILE_SIZE, spool=None, body_done=None
+):
+    """
+    Stream a multipart upload of many files, one part at a time.
+
+    Returns an async iterator of UploadedFile, each yielded as soon as
+    its part is complete; the request is checked right away. The body
+    is only read when the next file is asked for, so a slow consumer
+    paces the client and memory holds one chunk's parts (images up to
+    `max_size`, larger ones become an error part). Parts for which
+    `spool(filename, content_type)` is true (archives) are written to
+    a spooled temporary file. An invalid body or more than `max_files`
+    files ends the iteration with an error part. The consumer closes
+    the yielded parts; `body_done` (asyncio.Event) is set once the
+    body is no longer read.
+    """
+    boundary = multipart_boundary(request)
+    reader = _FilePartsReader(max_files, max_size, spool or (lambda filename, content_type: False))
+    return _iter_file_parts(request, MultipartParser(boundary, reader.callbacks()), reader, body_done)
+
+
+async def _iter_file_parts(request, parser, reader, body_done):
+    try:
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                while reader.parts:
+                    yield reader.parts.popleft()
+            parser.finalize()
+        except FormParserError:
+            error = "Request upload tidak valid."
+        except ValueError as e:
+            error = str(e)
+        except ClientDisconnect:
+            return
+        else:
+            error = None
+
+        while reader.parts:
+            yield reader.parts.popleft()
+        if error is not None:
+            yield UploadedFile(filename=None, error=error)
+    finally:
+        reader.close()
+        if body_done is not None:
+            body_done.set()
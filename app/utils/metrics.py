@@ -0,0 +1,156 @@
+"""
+Minimal Prometheus text-format metrics (no external dependency).
+
+Stage timings are measured inside the pipeline worker (see
+image_pipeline.profiling) and observed here, in the API process.
+"""
+import bisect
+
+from app.config import METRICS_ENABLED
+from image_pipeline.profiling import peak_rss_bytes
+
+# detik; mencakup tahap < 1 ms hingga request multi-detik
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _fmt(v):
+    return repr(float(v)) if v != float("inf") else "+Inf"
+
+
+class Histogram:
+    def __init__(self, name, help_text, label, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        # label value -> [bucket counts..., sum, count]
+        self._series = {}
+
+    def observe(self, label_value, value):
+        series = self._series.get(label_value)
+        if series is None:
+            series = self._series[label_value] = [0] * len(self.buckets) + [0.0, 0]
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for label_value, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                lines.append(
+                    f'{self.name}_bucket{{{self.label}="{label_value}",le="{_fmt(bound)}"}} {cumulative}'
+                )
+            lines.append(
+                f'{self.name}_bucket{{{self.label}="{label_value}",le="+Inf"}} {series[-1]}'
+            )
+            lines.append(f'{self.name}_sum{{{self.label}="{label_value}"}} {_fmt(series[-2])}')
+            lines.append(f'{self.name}_count{{{self.label}="{label_value}"}} {series[-1]}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._values = {}
+
+    def inc(self, label_value, amount=1):
+        self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} counter",
+        ]
+        for label_value, v in sorted(self._values.items()):
+            lines.append(f'{self.name}{{{self.label}="{label_value}"}} {v}')
+        return lines
+
+
+class Gauge:
+    """
+    Gauge whose value is read from a callback at scrape time.
+    """
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+
+    def render(self):
+        return [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {_fmt(self.read())}",
+        ]
+
+
+class PipelineMetrics:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.worker_peak_rss = 0
+        self.stage_seconds = Histogram(
+            "leaf_pipeline_stage_seconds",
+            "Duration of each process_leaf_image stage.",
+            "stage"
+        )
+        self.request_seconds = Histogram(
+            "leaf_request_seconds",
+            "End-to-end handling time of analysis requests.",
+            "endpoint"
+        )
+        self.results = Counter(
+            "leaf_results_total",
+            "Analysis results by source (computed or cache).",
+            "source"
+        )
+        self._gauges = []
+
+    def add_gauge(self, name, help_text, read):
+        self._gauges.append(Gauge(name, help_text, read))
+
+    def observe_timings(self, timings):
+        """
+        Record a pipeline timing report (StageTimer.report()).
+        """
+        if not self.enabled or not timings:
+            return
+        for stage, seconds in timings["stages"].items():
+            self.stage_seconds.observe(stage, seconds)
+        self.stage_seconds.observe("total", timings["total"])
+        self.worker_peak_rss = max(self.worker_peak_rss, timings["peak_rss_bytes"])
+
+    def observe_request(self, endpoint, seconds, cached):
+        if not self.enabled:
+            return
+        self.request_seconds.observe(endpoint, seconds)
+        self.results.inc("cache" if cached else "computed")
+
+    def render(self):
+        lines = []
+        for metric in (self.stage_seconds, self.request_seconds, self.results):
+            lines.extend(metric.render())
+        for gauge in self._gauges:
+            lines.extend(gauge.render())
+        lines.extend([
+            "# HELP leaf_peak_rss_bytes Peak resident set size per process role.",
+            "# TYPE leaf_peak_rss_bytes gauge",
+            f'leaf_peak_rss_bytes{{process="api"}} {peak_rss_bytes()}',
+            f'leaf_peak_rss_bytes{{process="worker"}} {self.worker_peak_rss}',
+        ])
+        return "\n".join(lines) + "\n"
+
+
+pipeline_metrics = PipelineMetrics(enabled=METRICS_ENABLED)
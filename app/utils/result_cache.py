@@ -0,0 +1,139 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+
+from app.config import RESULT_CACHE_SIZE, SEGMENTATION_METHOD, SCORING_CONFIG
+from app.utils.artifact_store import artifact_store
+from app.utils.artifacts import ARTIFACT_ENCODING
+from image_pipeline.pipeline import PIPELINE_VERSION
+from image_pipeline.scoring import load_scoring_config
+
+logger = logging.getLogger("result-cache")
+
+RESULT_FILENAME = "result.json"
+
+# konfigurasi skor semua endpoint (dimuat sekali, ikut cache key)
+SCORING = load_scoring_config(SCORING_CONFIG)
+
+
+def make_cache_key(image_bytes, **params):
+    """
+    Content address: sha256 of image bytes + pipeline parameters
+    (including the artifact encoding, which decides the file names,
+    the segmentation method and the scoring config).
+    """
+    h = hashlib.sha256()
+    h.update(image_bytes)
+    h.update(PIPELINE_VERSION.encode())
+    h.update(repr(ARTIFACT_ENCODING).encode())
+    h.update(SEGMENTATION_METHOD.encode())
+    h.update(json.dumps(SCORING.to_dict(), sort_keys=True).encode())
+    h.update(json.dumps(params, sort_keys=True, default=list).encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier result cache keyed by make_cache_key().
+
+    - memory: bounded LRU of result dicts
+    - artifact store: `result.json` next to the artifacts of the same
+      sample (see app.utils.artifact_store), so it expires together
+      with them.
+
+    Entries whose artifacts are gone from the store are treated as misses.
+    Identical requests arriving while the first is still being
+    processed wait for that result instead of recomputing it.
+    """
+
+    def __init__(self, store=artifact_store, max_entries=RESULT_CACHE_SIZE):
+        self.store = store
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._inflight = {}
+
+    def get(self, key):
+        entry = self._memory.get(key)
+
+        # touch: cek artifact masih ada & perpanjang masa simpannya
+        if entry is not None:
+            result, with_artifacts = entry
+            if with_artifacts and not self.store.touch(key):
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            logger.info("Cache hit (memory) | key=%s", key[:12])
+            return copy.deepcopy(result)
+
+        stored = self.store.get(key, RESULT_FILENAME)
+        if stored is None:
+            return None
+        try:
+            result = json.loads(stored.data)
+        except ValueError:
+            return None
+
+        if not self.store.touch(key):
+            return None
+
+        self._remember(key, result, with_artifacts=True)
+        logger.info("Cache hit (store) | key=%s", key[:12])
+        return copy.deepcopy(result)
+
+    def put(self, key, result, with_artifacts=False):
+        """
+        Store result. With `with_artifacts=True` it is also written to
+        the artifact store, next to the artifacts of the sample.
+        """
+        if with_artifacts:
+            try:
+                self.store.put(key, RESULT_FILENAME, json.dumps(result).encode())
+            except OSError as e:
+                logger.warning("Cache write failed | key=%s | %s", key[:12], e)
+
+        self._remember(key, copy.deepcopy(result), with_artifacts)
+
+    async def get_or_compute(self, key, compute, with_artifacts=False):
+        """
+        Return (result, hit). On a miss, `await compute()` produces the
+        result, which is then stored with put().
+        """
+        result = self.get(key)
+        if result is not None:
+            return result, True
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            logger.info("Cache hit (in-flight) | key=%s", key[:12])
+            return copy.deepcopy(await asyncio.shield(pending)), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except BaseException as e:
+            future.set_exception(e)
+            # tandai sudah dibaca agar tidak muncul warning jika tak ada yang menunggu
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+        self.put(key, result, with_artifacts)
+        future.set_result(result)
+        return result, False
+
+    def _remember(self, key, result, with_artifacts):
+        self._memory[key] = (result, with_artifacts)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        self._memory.clear()
+
+
+result_cache = ResultCache()
@@ -0,0 +1,331 @@
+"""
+Reproducible performance benchmark for image_pipeline.
+
+Run:
+    python -m benchmarks.bench_pipeline run -o bench.json
+    python -m benchmarks.bench_pipeline run --sizes 512 2mp --repeat 10
+
+Compare (exit code 1 on regression):
+    python -m benchmarks.bench_pipeline compare base.json bench.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+
+from image_pipeline.artifact_writer import ArtifactEncoding
+from image_pipeline.pipeline import process_leaf_image
+from image_pipeline.profiling import peak_rss_bytes
+from image_pipeline.segmentation import segment_leaf_hsv, extract_main_leaf_center_first
+from image_pipeline.zonal import create_geometric_zones, create_zone_labels
+from image_pipeline.zonal_stats import zonal_stats_exg_gli
+from image_pipeline.green_indices import compute_exg_map
+from image_pipeline.visualization import overlay_colormap_on_image
+
+# nama -> (lebar, tinggi)
+SIZES = {
+    "512": (512, 512),
+    "2mp": (1632, 1224),
+    "12mp": (4000, 3000),
+    "48mp": (8000, 6000),
+}
+
+SEED = 20240131
+
+
+def synthetic_leaf(width, height, seed=SEED):
+    """
+    Deterministic RGB photo-like image: textured soil background with
+    an elongated leaf (veins, darker edge, brown spots) slightly off center.
+    """
+    rng = np.random.default_rng(seed)
+
+    # background: noise frekuensi rendah + noise per piksel
+    coarse = rng.integers(60, 140, size=(12, 16, 3), dtype=np.uint8)
+    img = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+    img = cv2.add(img, rng.integers(0, 25, size=img.shape, dtype=np.uint8))
+    img[..., 0] = cv2.add(img[..., 0], 30)  # kecoklatan (R)
+
+    s = min(width, height)
+    cx, cy = int(width * 0.52), int(height * 0.48)
+    axes = (int(s * 0.42), int(s * 0.16))
+    angle = 28
+
+    mask = np.zeros((height, width), np.uint8)
+    cv2.ellipse(mask, (cx, cy), axes, angle, 0, 360, 255, -1)
+
+    leaf = np.empty_like(img)
+    leaf[..., 0] = rng.integers(40, 90, size=(height, width), dtype=np.uint8)
+    leaf[..., 1] = rng.integers(120, 190, size=(height, width), dtype=np.uint8)
+    leaf[..., 2] = rng.integers(30, 70, size=(height, width), dtype=np.uint8)
+
+    # tepi lebih gelap & tulang daun
+    edge = cv2.erode(mask, np.ones((max(3, s // 40),) * 2, np.uint8))
+    leaf[(mask > 0) & (edge == 0)] //= 2
+    t = np.deg2rad(angle)
+    dx, dy = int(np.cos(t) * axes[0]), int(np.sin(t) * axes[0])
+    cv2.line(leaf, (cx - dx, cy - dy), (cx + dx, cy + dy), (150, 200, 110), max(1, s // 200))
+
+    # bercak coklat
+    for _ in range(12):
+        px = int(cx + rng.uniform(-0.6, 0.6) * axes[0] * np.cos(t))
+        py = int(cy + rng.uniform(-0.6, 0.6) * axes[0] * np.sin(t))
+        cv2.circle(leaf, (px, py), int(s * rng.uniform(0.005, 0.02)), (120, 90, 40), -1)
+
+    img[mask > 0] = leaf[mask > 0]
+    return img
+
+
+def synthetic_frond(width, height, leaflets=8, seed=SEED):
+    """
+    Deterministic frond photo: a rachis across brown soil with
+    `leaflets` separate elongated leaflets alternating on both sides.
+    """
+    rng = np.random.default_rng(seed)
+
+    # tanah coklat (R > G > B, tidak pernah lolos threshold hijau)
+    coarse = rng.integers(70, 130, size=(12, 16), dtype=np.uint8)
+    gray = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+    img = np.dstack([cv2.add(gray, 35), cv2.add(gray, 5), gray])
+    img = cv2.add(img, rng.integers(0, 10, size=img.shape, dtype=np.uint8))
+
+    s = min(width, height)
+    cy = height // 2
+    cv2.line(img, (width // 20, cy), (width - width // 20, cy), (110, 80, 50), max(2, s // 80))
+
+    step = width * 0.75 / leaflets
+    axes = (int(s * 0.2), max(3, int(min(step * 0.35, s * 0.06))))
+    for i in range(leaflets):
+        cx = int(width * 0.1 + step * (i + 0.5))
+        side = -1 if i % 2 else 1
+        angle = side * rng.uniform(55, 75)
+        t = np.deg2rad(angle)
+        center = (cx + int(np.cos(t) * axes[0] * 1.1), cy + int(np.sin(t) * axes[0] * 1.1))
+
+        mask = np.zeros((height, width), np.uint8)
+        cv2.ellipse(mask, center, axes, angle, 0, 360, 255, -1)
+        inside = mask > 0
+        n = int(np.count_nonzero(inside))
+
+        # tiap leaflet sedikit beda kehijauan -> skor berbeda
+        shade = int(rng.integers(-40, 30))
+        leaf = np.empty((n, 3), np.uint8)
+        leaf[:, 0] = rng.integers(40, 90, size=n)
+        leaf[:, 1] = np.clip(rng.integers(120, 190, size=n) + shade, 0, 255)
+        leaf[:, 2] = rng.integers(30, 70, size=n)
+        img[inside] = leaf
+    return img
+
+
+def _cases(img_rgb, jpeg_bytes, artifact_dir):
+    """
+    (name, callable) per public function, with inputs prepared once.
+    """
+    mask_green = segment_leaf_hsv(img_rgb)
+    mask_leaf = extract_main_leaf_center_first(img_rgb, mask_green, crop_ratio=0.65)
+    zones = create_geometric_zones(mask_leaf)
+    exg_map = compute_exg_map(img_rgb, mask_leaf)
+
+    height, width = img_rgb.shape[:2]
+    frond = cv2.cvtColor(synthetic_frond(width, height), cv2.COLOR_RGB2BGR)
+    frond_bytes = cv2.imencode(".jpg", frond, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+    return [
+        ("segment_leaf_hsv", lambda: segment_leaf_hsv(img_rgb)),
+        ("extract_main_leaf_center_first",
+         lambda: extract_main_leaf_center_first(img_rgb, mask_green, crop_ratio=0.65)),
+        ("create_geometric_zones", lambda: create_geometric_zones(mask_leaf)),
+        ("create_zone_labels", lambda: create_zone_labels(mask_leaf)),
+        ("zonal_stats_exg_gli", lambda: zonal_stats_exg_gli(img_rgb, *zones)),
+        ("compute_exg_map", lambda: compute_exg_map(img_rgb, mask_leaf)),
+        ("overlay_colormap_on_image",
+         lambda: overlay_colormap_on_image(img_rgb, exg_map, mask_leaf, alpha=0.6)),
+        ("process_leaf_image", lambda: process_leaf_image(jpeg_bytes)),
+        ("process_leaf_image[artifacts]",
+         lambda: process_leaf_image(jpeg_bytes, output_dir=artifact_dir)),
+        ("process_leaf_image[jpg]",
+         lambda: process_leaf_image(
+             jpeg_bytes, output_dir=artifact_dir, encoding=ArtifactEncoding("jpg")
+         )),
+        ("process_leaf_image[multi]", lambda: process_leaf_image(frond_bytes, mode="multi")),
+    ]
+
+
+def _percentile(sorted_values, q):
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def measure(fn, repeat, warmup=1):
+    """
+    Latency percentiles (seconds) over `repeat` runs, then one extra
+    run under tracemalloc for allocation figures (Python + NumPy heap).
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        out = fn()
+        current, peak = tracemalloc.get_traced_memory()
+        del out
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "n": repeat,
+        "min": samples[0],
+        "mean": statistics.fmean(samples),
+        "p50": _percentile(samples, 0.50),
+        "p90": _percentile(samples, 0.90),
+        "p99": _percentile(samples, 0.99),
+        "max": samples[-1],
+        "alloc_peak_bytes": peak - before,
+        "alloc_retained_bytes": current - before,
+    }
+
+
+def run(sizes, repeat, functions=None, log=sys.stderr):
+    results = {}
+
+    with tempfile.TemporaryDirectory() as artifact_dir:
+        for size_name in sizes:
+            width, height = SIZES[size_name]
+            img_rgb = synthetic_leaf(width, height)
+            ok, buf = cv2.imencode(".jpg", cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, 90])
+            jpeg_bytes = buf.tobytes()
+
+            results[size_name] = {}
+            for name, fn in _cases(img_rgb, jpeg_bytes, artifact_dir):
+                if functions and name not in functions:
+                    continue
+                stats = measure(fn, repeat)
+                results[size_name][name] = stats
+                print(
+                    f"{size_name:>5} {name:<32} p50={stats['p50'] * 1e3:9.2f} ms "
+                    f"p90={stats['p90'] * 1e3:9.2f} ms "
+                    f"alloc_peak={stats['alloc_peak_bytes'] / 2**20:8.1f} MiB",
+                    file=log
+                )
+
+    return {"meta": run_meta(repeat), "results": results}
+
+
+def run_meta(repeat):
+    """
+    Environment of a benchmark run (stored next to the results).
+    """
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv_threads": cv2.getNumThreads(),
+        "repeat": repeat,
+        "seed": SEED,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def compare(base, new, threshold, metric="p50", mem_threshold=None, log=sys.stdout):
+    """
+    Compare two benchmark JSON reports.
+
+    Returns list of regressions as (size, function, field, base, new).
+    """
+    mem_threshold = threshold if mem_threshold is None else mem_threshold
+    regressions = []
+
+    print(f"{'size':>5} {'function':<32} {'base':>10} {'new':>10} {'change':>8}", file=log)
+    for size_name, funcs in new["results"].items():
+        base_funcs = base["results"].get(size_name, {})
+        for name, stats in funcs.items():
+            if name not in base_funcs:
+                continue
+            b = base_funcs[name]
+
+            change = stats[metric] / b[metric] - 1 if b[metric] > 0 else 0.0
+            flag = ""
+            if change > threshold:
+                regressions.append((size_name, name, metric, b[metric], stats[metric]))
+                flag = "  REGRESSION"
+
+            b_mem, n_mem = b["alloc_peak_bytes"], stats["alloc_peak_bytes"]
+            if b_mem > 0 and n_mem / b_mem - 1 > mem_threshold:
+                regressions.append((size_name, name, "alloc_peak_bytes", b_mem, n_mem))
+                flag += "  MEM-REGRESSION"
+
+            print(
+                f"{size_name:>5} {name:<32} {b[metric] * 1e3:8.2f}ms {stats[metric] * 1e3:8.2f}ms "
+                f"{change * 100:+7.1f}%{flag}",
+                file=log
+            )
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_pipeline")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="jalankan benchmark")
+    p_run.add_argument("-o", "--output", default="bench_results.json")
+    p_run.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    p_run.add_argument("--repeat", type=int, default=5)
+    p_run.add_argument("--functions", nargs="+", default=None, help="subset nama fungsi")
+
+    p_cmp = sub.add_parser("compare", help="bandingkan dua hasil benchmark")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=0.15, help="batas regresi latency (0.15 = +15%%)")
+    p_cmp.add_argument("--mem-threshold", type=float, default=None, help="batas regresi alokasi (default = --threshold)")
+    p_cmp.add_argument("--metric", default="p50", choices=["min", "mean", "p50", "p90", "p99"])
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run(args.sizes, args.repeat, args.functions)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Hasil disimpan: {args.output}", file=sys.stderr)
+        return 0
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    regressions = compare(base, new, args.threshold, args.metric, args.mem_threshold)
+    if regressions:
+        print(f"{len(regressions)} regresi melewati batas.", file=sys.stderr)
+        return 1
+    print("Tidak ada regresi.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
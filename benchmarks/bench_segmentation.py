@@ -0,0 +1,177 @@
+"""
+Leaf segmentation methods: latency and mask quality against the
+default ("hsv") method, to choose SEGMENTATION_METHOD per deployment.
+
+Run:
+    python -m benchmarks.bench_segmentation run -o seg.json
+    python -m benchmarks.bench_segmentation run --sizes 512 12mp --images foto/
+
+Quality per method (mean over the images): IoU, precision, recall and
+area ratio of the main-leaf mask against "hsv", plus the largest
+change of the final score. Latency regressions between two runs can be
+checked with `python -m benchmarks.bench_pipeline compare`.
+"""
+import argparse
+import json
+import statistics
+import sys
+
+import cv2
+
+from benchmarks.bench_pipeline import SIZES, SEED, synthetic_leaf, measure, run_meta
+from image_pipeline.batch import iter_image_files
+from image_pipeline.io import load_image_from_bytes
+from image_pipeline.pipeline import process_leaf_image
+from image_pipeline.preprocessing import preprocess_image, PREPROCESS_SIZE
+from image_pipeline.segmentation import (
+    SEGMENTATION_METHODS,
+    DEFAULT_SEGMENTATION,
+    segment_main_leaf,
+    mask_agreement
+)
+
+# jumlah gambar sintetis per ukuran (seed berurutan)
+SYNTHETIC_IMAGES = 5
+
+# field waktu pada hasil measure() (dibagi jumlah gambar)
+TIME_FIELDS = ("min", "mean", "p50", "p90", "p99", "max")
+
+
+def synthetic_inputs(size_name, n=SYNTHETIC_IMAGES):
+    """
+    (segmentation input, JPEG bytes) per synthetic image; the input is
+    blurred like preprocess_image, at the given size.
+    """
+    width, height = SIZES[size_name]
+    inputs = []
+    for i in range(n):
+        img_rgb = synthetic_leaf(width, height, seed=SEED + i)
+        ok, buf = cv2.imencode(".jpg", cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, 90])
+        inputs.append((preprocess_image(img_rgb, size=(width, height)), buf.tobytes()))
+    return inputs
+
+
+def image_inputs(directory):
+    """
+    (segmentation input, file bytes) per image, as the standard pipeline
+    sees it (PREPROCESS_SIZE). Unreadable files are skipped.
+    """
+    inputs = []
+    for path in iter_image_files(directory):
+        data = path.read_bytes()
+        try:
+            img_rgb = load_image_from_bytes(data, target_size=PREPROCESS_SIZE)
+        except ValueError:
+            continue
+        inputs.append((preprocess_image(img_rgb), data))
+    return inputs
+
+
+def _masks(method, images):
+    masks = []
+    for img in images:
+        try:
+            masks.append(segment_main_leaf(img, method))
+        except ValueError:
+            masks.append(None)
+    return masks
+
+
+def _scores(method, blobs):
+    scores = []
+    for data in blobs:
+        try:
+            scores.append(process_leaf_image(data, segmentation=method)["score"])
+        except ValueError:
+            scores.append(None)
+    return scores
+
+
+def evaluate(inputs, methods, repeat, log=sys.stderr, group=""):
+    """
+    Latency (per image) and quality against DEFAULT_SEGMENTATION for
+    every method over `inputs`.
+    """
+    images = [img for img, _ in inputs]
+    blobs = [data for _, data in inputs]
+    ref_masks = _masks(DEFAULT_SEGMENTATION, images)
+    ref_scores = _scores(DEFAULT_SEGMENTATION, blobs)
+
+    results = {}
+    for method in methods:
+        stats = measure(lambda: _masks(method, images), repeat)
+        for field in TIME_FIELDS:
+            stats[field] /= len(images)
+
+        masks = _masks(method, images)
+        scores = _scores(method, blobs)
+        pairs = [(m, r) for m, r in zip(masks, ref_masks) if m is not None and r is not None]
+        agreement = [mask_agreement(m, r) for m, r in pairs]
+        deltas = [
+            abs(s - r) for s, r in zip(scores, ref_scores)
+            if s is not None and r is not None
+        ]
+
+        stats["quality"] = {
+            "images": len(images),
+            "failed": sum(m is None for m in masks),
+            "iou_mean": statistics.fmean(a["iou"] for a in agreement) if agreement else None,
+            "iou_min": min(a["iou"] for a in agreement) if agreement else None,
+            "precision": statistics.fmean(a["precision"] for a in agreement) if agreement else None,
+            "recall": statistics.fmean(a["recall"] for a in agreement) if agreement else None,
+            "area_ratio": statistics.fmean(a["area_ratio"] for a in agreement) if agreement else None,
+            "score_delta_max": max(deltas) if deltas else None,
+        }
+        results[method] = stats
+
+    base = results.get(DEFAULT_SEGMENTATION, {}).get("p50")
+    for method, stats in results.items():
+        q = stats["quality"]
+        speedup = f"{base / stats['p50']:5.2f}x" if base else "    -"
+        iou = "-" if q["iou_mean"] is None else f"{q['iou_mean']:.4f} (min {q['iou_min']:.4f})"
+        delta = "-" if q["score_delta_max"] is None else f"{q['score_delta_max']:.1f}"
+        print(
+            f"{group:>8} {method:<14} p50={stats['p50'] * 1e3:8.2f} ms {speedup} "
+            f"iou={iou} failed={q['failed']}/{q['images']} score_delta_max={delta}",
+            file=log
+        )
+    return results
+
+
+def run(sizes, repeat, methods, image_dir=None, log=sys.stderr):
+    results = {}
+    for size_name in sizes:
+        results[size_name] = evaluate(synthetic_inputs(size_name), methods, repeat, log, size_name)
+    if image_dir:
+        inputs = image_inputs(image_dir)
+        if inputs:
+            results["images"] = evaluate(inputs, methods, repeat, log, "images")
+
+    meta = run_meta(repeat)
+    meta["reference"] = DEFAULT_SEGMENTATION
+    return {"meta": meta, "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_segmentation")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="bandingkan metode segmentasi")
+    p_run.add_argument("-o", "--output", default="bench_segmentation.json")
+    p_run.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["512", "2mp"])
+    p_run.add_argument("--repeat", type=int, default=10)
+    p_run.add_argument("--methods", nargs="+", choices=list(SEGMENTATION_METHODS), default=list(SEGMENTATION_METHODS))
+    p_run.add_argument("--images", default=None, help="folder foto daun (opsional)")
+
+    args = parser.parse_args(argv)
+
+    methods = [DEFAULT_SEGMENTATION] + [m for m in args.methods if m != DEFAULT_SEGMENTATION]
+    report = run(args.sizes, args.repeat, methods, args.images)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Hasil disimpan: {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
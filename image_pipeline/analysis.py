@@ -1,26 +1,184 @@
+import math
+
+import cv2
 import numpy as np
-import matplotlib.pyplot as plt
-from pathlib import Path
 
+# backend render histogram: "opencv" (default) atau "matplotlib" (opsional)
+HISTOGRAM_BACKENDS = ("opencv", "matplotlib")
+DEFAULT_HISTOGRAM_BACKEND = "opencv"
+
+# ukuran sama dengan figure matplotlib lama (4x3 inch @ 150 dpi)
+HIST_SIZE = (600, 450)
+
+BAR_COLOR_BGR = (80, 175, 76)  # #4CAF50
 
-def save_histogram(values, title, filename, output_dir, bins=50):
+
+def compute_histogram(values, bins=50):
     """
-    Save histogram of index values (ExG / GLI).
+    Bin counts of index values (NaN ignored).
+
+    Returns
+    -------
+    counts : np.ndarray (bins,) int64
+    edges : np.ndarray (bins + 1,) float
     """
     values = values[~np.isnan(values)]
+    if values.size == 0:
+        return np.zeros(bins, dtype=np.int64), np.linspace(0, 1, bins + 1)
+    return np.histogram(values, bins=bins)
 
-    plt.figure(figsize=(4, 3))
-    plt.hist(values, bins=bins, color="#4CAF50", edgecolor="black")
-    plt.title(title)
-    plt.xlabel("Value")
-    plt.ylabel("Pixel Count")
-    plt.tight_layout()
 
-    # out = Path(output_dir)
-    # out.mkdir(parents=True, exist_ok=True)
+def histogram_to_dict(counts, edges):
+    """
+    JSON-friendly histogram, so clients can draw the chart themselves.
+    """
+    return {
+        "counts": counts.tolist(),
+        "edges": [round(float(e), 4) for e in edges]
+    }
 
-    path = output_dir / filename
-    plt.savefig(path, dpi=150)
-    plt.close()
 
-    return path.name
\ No newline at end of file
+def _nice_ticks(lo, hi, n=5):
+    """
+    Round tick positions (1/2/5 x 10^k steps) covering [lo, hi].
+    """
+    span = hi - lo
+    if span <= 0:
+        return [lo]
+
+    raw = span / n
+    mag = 10 ** math.floor(math.log10(raw))
+    step = next(m * mag for m in (1, 2, 5, 10) if m * mag >= raw)
+
+    start = math.ceil(lo / step) * step
+    ticks = []
+    t = start
+    while t <= hi + step * 1e-9:
+        ticks.append(round(t, 10))
+        t += step
+    return ticks
+
+
+def _fmt_tick(v):
+    if v == int(v) and abs(v) >= 1:
+        return str(int(v))
+    return f"{v:.2f}".rstrip("0").rstrip(".")
+
+
+def render_histogram(counts, edges, title, size=HIST_SIZE):
+    """
+    Draw a bar histogram directly into a BGR image with OpenCV.
+    """
+    w, h = size
+    img = np.full((h, w, 3), 255, dtype=np.uint8)
+
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    black = (0, 0, 0)
+
+    left, right, top, bottom = 80, 20, 45, 60
+    x0, x1 = left, w - right
+    y0, y1 = top, h - bottom
+
+    lo, hi = float(edges[0]), float(edges[-1])
+    if hi <= lo:
+        hi = lo + 1.0
+    c_max = max(int(counts.max()), 1) if counts.size else 1
+    c_top = c_max * 1.05
+
+    def px(v):
+        return int(round(x0 + (v - lo) / (hi - lo) * (x1 - x0)))
+
+    def py(c):
+        return int(round(y1 - c / c_top * (y1 - y0)))
+
+    # bars
+    for c, e0, e1 in zip(counts, edges[:-1], edges[1:]):
+        if c <= 0:
+            continue
+        p0 = (px(e0), py(c))
+        p1 = (px(e1), y1)
+        cv2.rectangle(img, p0, p1, BAR_COLOR_BGR, thickness=cv2.FILLED)
+        cv2.rectangle(img, p0, p1, black, thickness=1)
+
+    # axes
+    cv2.rectangle(img, (x0, y0), (x1, y1), black, thickness=1)
+
+    # x ticks
+    for t in _nice_ticks(lo, hi):
+        x = px(t)
+        cv2.line(img, (x, y1), (x, y1 + 5), black, 1)
+        label = _fmt_tick(t)
+        (tw, th), _ = cv2.getTextSize(label, font, 0.4, 1)
+        cv2.putText(img, label, (x - tw // 2, y1 + 10 + th), font, 0.4, black, 1, cv2.LINE_AA)
+
+    # y ticks
+    for t in _nice_ticks(0, c_top):
+        y = py(t)
+        cv2.line(img, (x0 - 5, y), (x0, y), black, 1)
+        label = _fmt_tick(t)
+        (tw, th), _ = cv2.getTextSize(label, font, 0.4, 1)
+        cv2.putText(img, label, (x0 - 8 - tw, y + th // 2), font, 0.4, black, 1, cv2.LINE_AA)
+
+    # title & x label
+    (tw, th), _ = cv2.getTextSize(title, font, 0.55, 1)
+    cv2.putText(img, title, ((w - tw) // 2, top - 15), font, 0.55, black, 1, cv2.LINE_AA)
+
+    (tw, th), _ = cv2.getTextSize("Value", font, 0.45, 1)
+    cv2.putText(img, "Value", ((x0 + x1 - tw) // 2, h - 15), font, 0.45, black, 1, cv2.LINE_AA)
+
+    # y label (teks diputar 90 derajat)
+    (tw, th), base = cv2.getTextSize("Pixel Count", font, 0.45, 1)
+    label_img = np.full((th + base + 4, tw + 4, 3), 255, dtype=np.uint8)
+    cv2.putText(label_img, "Pixel Count", (2, th + 2), font, 0.45, black, 1, cv2.LINE_AA)
+    label_img = cv2.rotate(label_img, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    lh, lw = label_img.shape[:2]
+    ly = (y0 + y1 - lh) // 2
+    img[ly:ly + lh, 8:8 + lw] = label_img
+
+    return img
+
+
+def _render_histogram_matplotlib(values, title, bins):
+    # lazy import: matplotlib hanya dimuat jika backend ini dipakai
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(4, 3), dpi=150)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.hist(values, bins=bins, color="#4CAF50", edgecolor="black")
+    ax.set_title(title)
+    ax.set_xlabel("Value")
+    ax.set_ylabel("Pixel Count")
+    fig.tight_layout()
+    canvas.draw()
+
+    return cv2.cvtColor(np.asarray(canvas.buffer_rgba()), cv2.COLOR_RGBA2BGR)
+
+
+def render_histogram_image(values, title, bins=50, backend=DEFAULT_HISTOGRAM_BACKEND, hist=None):
+    """
+    Render histogram of index values into a BGR image
+    (`backend`: see HISTOGRAM_BACKENDS).
+
+    `hist` may carry precomputed (counts, edges) from compute_histogram.
+    """
+    if backend == "matplotlib":
+        return _render_histogram_matplotlib(values[~np.isnan(values)], title, bins)
+    if backend == "opencv":
+        counts, edges = hist if hist is not None else compute_histogram(values, bins)
+        return render_histogram(counts, edges, title)
+
+    raise ValueError(f"Backend histogram tidak dikenal: {backend}")
+
+
+def save_histogram(
+    values, title, filename, output_dir, bins=50,
+    backend=DEFAULT_HISTOGRAM_BACKEND, hist=None
+):
+    """
+    Save histogram of index values (ExG / GLI).
+    """
+    path = output_dir / filename
+    cv2.imwrite(str(path), render_histogram_image(values, title, bins, backend, hist))
+    return path.name
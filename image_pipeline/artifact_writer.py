@@ -0,0 +1,200 @@
+"""
+Artifact encoding options and a background writer pool.
+
+Encoding (cv2.imencode) releases the GIL, so a couple of threads per
+process can encode and write artifacts while the caller returns the
+result. Files appear atomically (temporary name + rename): a reader
+sees either nothing or the complete file.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+
+from image_pipeline.analysis import HISTOGRAM_BACKENDS, DEFAULT_HISTOGRAM_BACKEND
+
+logger = logging.getLogger("artifact-writer")
+
+# format -> ekstensi file
+FORMATS = {"png": ".png", "jpg": ".jpg", "webp": ".webp"}
+
+# thread encode/tulis per proses
+WRITER_THREADS = 2
+
+# maksimal artifact yang menunggu ditulis (submit memblok di atas ini)
+WRITER_MAX_PENDING = 32
+
+
+@dataclass(frozen=True)
+class ArtifactEncoding:
+    """
+    How artifacts are rendered and encoded.
+
+    `image_format` applies to photo-like artifacts (segmented image,
+    index maps, overlays); histograms are line charts and stay PNG.
+    `png_compression` None keeps OpenCV's default, its fastest setting.
+    `overlay_edge` > 0 fades the overlays out over that many pixels
+    inside the leaf edge (soft alpha); 0 is a hard edge.
+    `histogram_backend` draws the histograms (see HISTOGRAM_BACKENDS).
+    """
+    image_format: str = "png"
+    quality: int = 90
+    png_compression: int | None = None
+    overlay_edge: int = 0
+    histogram_backend: str = DEFAULT_HISTOGRAM_BACKEND
+
+    def __post_init__(self):
+        if self.image_format not in FORMATS:
+            raise ValueError(
+                f"Format artifact tidak dikenal: {self.image_format}. "
+                f"Pilihan: {', '.join(FORMATS)}."
+            )
+        if not 1 <= self.quality <= 100:
+            raise ValueError("Quality artifact harus 1–100.")
+        if self.png_compression is not None and not 0 <= self.png_compression <= 9:
+            raise ValueError("Kompresi PNG harus 0–9.")
+        if self.overlay_edge < 0:
+            raise ValueError("Lebar tepi overlay tidak boleh negatif.")
+        if self.histogram_backend not in HISTOGRAM_BACKENDS:
+            raise ValueError(
+                f"Backend histogram tidak dikenal: {self.histogram_backend}. "
+                f"Pilihan: {', '.join(HISTOGRAM_BACKENDS)}."
+            )
+
+    def extension(self, kind):
+        """
+        File extension for an artifact kind ("image" or "chart").
+        """
+        return FORMATS[self.image_format] if kind == "image" else ".png"
+
+    def params(self, ext):
+        """
+        cv2.imencode parameters for an extension.
+        """
+        if ext == ".jpg":
+            return [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        if ext == ".webp":
+            return [cv2.IMWRITE_WEBP_QUALITY, self.quality]
+        if self.png_compression is not None:
+            return [cv2.IMWRITE_PNG_COMPRESSION, self.png_compression]
+        return []
+
+
+def encode_artifact(image_bgr, ext, params=()):
+    ok, buf = cv2.imencode(ext, image_bgr, list(params))
+    if not ok:
+        raise ValueError(f"Gagal encode artifact {ext}.")
+    return buf
+
+
+def write_artifact(path, buf):
+    """
+    Write encoded bytes atomically (temporary file + rename).
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    buf.tofile(str(tmp))
+    os.replace(tmp, path)
+
+
+class ArtifactWriter:
+    """
+    Encode + write artifacts on a small thread pool of this process.
+
+    `submit` hands the image over and returns immediately (it blocks
+    only while `max_pending` artifacts are already queued, so memory
+    stays bounded). The image must not be modified afterwards.
+    """
+
+    def __init__(self, max_workers=WRITER_THREADS, max_pending=WRITER_MAX_PENDING):
+        self.max_workers = max_workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pending = set()
+
+    def submit(self, path, image_bgr, ext, params=()):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="artifact-writer"
+                )
+
+        self._slots.acquire()
+        future = self._pool.submit(self._write, Path(path), image_bgr, ext, params)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+        self._slots.release()
+
+    @staticmethod
+    def _write(path, image_bgr, ext, params):
+        try:
+            write_artifact(path, encode_artifact(image_bgr, ext, params))
+        except Exception:
+            # folder bisa sudah dihapus cleanup; request lain tidak terpengaruh
+            logger.exception("Artifact write failed | path=%s", path)
+
+    def flush(self):
+        """
+        Wait until every submitted artifact is written.
+        """
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+class ArtifactSink:
+    """
+    Destination of rendered artifacts: files in `out_dir`, encoded
+    inline (timed as "encode" / "write") or on `artifact_writer`; or,
+    without `out_dir`, encoded bytes collected in `files` for the
+    caller to store.
+    """
+
+    def __init__(self, encoding, timer, out_dir=None, background=False):
+        self.encoding = encoding
+        self.timer = timer
+        self.out_dir = None if out_dir is None else Path(out_dir)
+        self.background = background
+        self.files = {}
+
+    def save(self, stem, kind, image_bgr):
+        """
+        Store `image_bgr` as `stem` + extension; returns the file name.
+        """
+        ext = self.encoding.extension(kind)
+        params = self.encoding.params(ext)
+        filename = stem + ext
+
+        if self.out_dir is None:
+            with self.timer.stage("encode"):
+                self.files[filename] = encode_artifact(image_bgr, ext, params).tobytes()
+        elif self.background:
+            artifact_writer.submit(self.out_dir / filename, image_bgr, ext, params)
+        else:
+            with self.timer.stage("encode"):
+                buf = encode_artifact(image_bgr, ext, params)
+            with self.timer.stage("write"):
+                write_artifact(self.out_dir / filename, buf)
+        return filename
+
+
+# satu writer per proses (worker pipeline membuatnya saat artifact pertama)
+artifact_writer = ArtifactWriter()
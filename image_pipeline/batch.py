@@ -0,0 +1,217 @@
+"""
+Batch analysis over many leaf images.
+
+Usage:
+    python -m image_pipeline.batch <dir> [-o results.jsonl] [--format csv] [--scoring scoring.json]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+from image_pipeline.pipeline import process_leaf_image
+from image_pipeline.scoring import DEFAULT_SCORING, load_scoring_config
+from image_pipeline.segmentation import SEGMENTATION_METHODS, DEFAULT_SEGMENTATION
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+RESULT_FIELDS = ["index", "file", "status", "score", "label", "exg", "gli", "g", "scoring_version", "error"]
+
+FORMATS = ("jsonl", "csv")
+
+
+def is_image_name(name):
+    return Path(name).suffix.lower() in IMAGE_EXTENSIONS
+
+
+def iter_image_files(directory):
+    """
+    Yield image paths under `directory` (recursive, sorted).
+    """
+    for path in sorted(Path(directory).rglob("*")):
+        if path.is_file() and is_image_name(path.name):
+            yield path
+
+
+def error_record(name, message, index=None):
+    return {
+        "index": index,
+        "file": name,
+        "status": "error",
+        "error": message
+    }
+
+
+def analyze_image_bytes(
+    name, image_bytes, index=None,
+    segmentation=DEFAULT_SEGMENTATION, scoring=DEFAULT_SCORING
+):
+    """
+    Analyze one image and return a flat, JSON-safe record.
+    Errors are captured in the record instead of raised.
+    """
+    try:
+        result = process_leaf_image(
+            image_bytes=image_bytes, output_dir=None,
+            segmentation=segmentation, scoring=scoring
+        )
+    except Exception as e:
+        return error_record(name, str(e) or type(e).__name__, index)
+
+    return {
+        "index": index,
+        "file": name,
+        "status": "ok",
+        "score": round(float(result["score"]), 1),
+        "label": result["label"],
+        "exg": round(float(result["exg"]), 2),
+        "gli": round(float(result["gli"]), 3),
+        "g": round(float(result["g"]), 2),
+        "scoring_version": result["scoring_version"]
+    }
+
+
+def analyze_image_file(path, index=None, segmentation=DEFAULT_SEGMENTATION, scoring=DEFAULT_SCORING):
+    try:
+        image_bytes = Path(path).read_bytes()
+    except OSError as e:
+        return error_record(str(path), str(e), index)
+
+    return analyze_image_bytes(str(path), image_bytes, index, segmentation, scoring)
+
+
+def format_header(fmt, fields=RESULT_FIELDS):
+    """
+    Return header text for the output format ("" for JSONL).
+    """
+    if fmt == "csv":
+        buf = io.StringIO()
+        csv.writer(buf).writerow(fields)
+        return buf.getvalue()
+    return ""
+
+
+def format_record(record, fmt, fields=RESULT_FIELDS):
+    """
+    Serialize one record as a single JSONL or CSV line.
+    """
+    if fmt == "csv":
+        buf = io.StringIO()
+        csv.DictWriter(buf, fieldnames=fields, extrasaction="ignore").writerow(record)
+        return buf.getvalue()
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def _init_worker():
+    import cv2
+    # satu thread OpenCV per worker, paralelisme dari jumlah proses
+    cv2.setNumThreads(1)
+
+
+def iter_batch(
+    paths, workers=None, max_pending=None,
+    segmentation=DEFAULT_SEGMENTATION, scoring=DEFAULT_SCORING
+):
+    """
+    Analyze image files across worker processes.
+
+    Yields records in completion order. At most `max_pending` jobs are
+    submitted at a time, so neither paths nor results pile up in memory.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = set()
+
+        for index, path in enumerate(paths):
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    yield f.result()
+
+            pending.add(pool.submit(analyze_image_file, path, index, segmentation, scoring))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                yield f.result()
+
+
+def run_batch(
+    directory, output, fmt="jsonl", workers=None, progress=sys.stderr,
+    segmentation=DEFAULT_SEGMENTATION, scoring=DEFAULT_SCORING
+):
+    """
+    Analyze every image in `directory` and write results incrementally.
+
+    Returns (n_ok, n_error).
+    """
+    paths = list(iter_image_files(directory))
+    total = len(paths)
+    n_ok = n_error = 0
+
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        f.write(format_header(fmt))
+
+        records = iter_batch(paths, workers, segmentation=segmentation, scoring=scoring)
+        for done, record in enumerate(records, start=1):
+            f.write(format_record(record, fmt))
+            f.flush()
+
+            if record["status"] == "ok":
+                n_ok += 1
+                status = f"ok score={record['score']} label={record['label']}"
+            else:
+                n_error += 1
+                status = f"error: {record['error']}"
+
+            if progress is not None:
+                print(f"[{done}/{total}] {record['file']} | {status}", file=progress)
+
+    return n_ok, n_error
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m image_pipeline.batch",
+        description="Batch analysis of salak leaf images."
+    )
+    parser.add_argument("directory", help="folder berisi gambar JPG/PNG")
+    parser.add_argument("-o", "--output", help="file hasil (default: batch_results.<format>)")
+    parser.add_argument("-f", "--format", choices=FORMATS, help="format hasil (default dari ekstensi output, atau jsonl)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="jumlah proses worker (default: jumlah CPU)")
+    parser.add_argument("-s", "--segmentation", choices=list(SEGMENTATION_METHODS), default=DEFAULT_SEGMENTATION, help="metode segmentasi daun")
+    parser.add_argument("--scoring", default=None, help="file JSON konfigurasi skor (default: bawaan)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format
+    if fmt is None and args.output:
+        suffix = Path(args.output).suffix.lower().lstrip(".")
+        fmt = suffix if suffix in FORMATS else None
+    fmt = fmt or "jsonl"
+    output = args.output or f"batch_results.{fmt}"
+
+    if not Path(args.directory).is_dir():
+        parser.error(f"bukan folder: {args.directory}")
+
+    try:
+        scoring = load_scoring_config(args.scoring)
+    except (OSError, ValueError) as e:
+        parser.error(f"konfigurasi skor: {e}")
+
+    n_ok, n_error = run_batch(
+        args.directory, output, fmt, args.workers,
+        segmentation=args.segmentation, scoring=scoring
+    )
+    print(f"Selesai | ok={n_ok} | error={n_error} | output={output}", file=sys.stderr)
+
+    return 0 if n_ok or not n_error else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
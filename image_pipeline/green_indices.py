@@ -1,53 +1,83 @@
 import numpy as np
 import cv2
 
-def compute_exg_map(img_rgb, mask):
-    """
-    Generate Excess Green (ExG) heatmap image.
-    """
-    img = img_rgb.astype(np.float32)
+from image_pipeline.index_frame import build_index_frame
+from image_pipeline.visualization import paste_roi
 
-    R = img[:, :, 0]
-    G = img[:, :, 1]
-    B = img[:, :, 2]
+INDEX_COLORMAP = cv2.COLORMAP_TURBO
 
-    exg = 2 * G - R - B
+# warna background map (nilai 0 setelah colormap), dipakai saat paste ROI ke frame penuh
+BACKGROUND_BGR = cv2.applyColorMap(np.zeros((1, 1), np.uint8), INDEX_COLORMAP)[0, 0]
 
-    # set background to NaN agar tidak ikut
-    exg[mask == 0] = np.nan
 
-    # normalize ExG to 0–255
-    exg_min = np.nanmin(exg)
-    exg_max = np.nanmax(exg)
+def _index_colormap(values, leaf):
+    """
+    Normalize index plane to 0–255 over leaf pixels only
+    and apply colormap. Background stays 0 before colormap.
 
-    exg_norm = (exg - exg_min) / (exg_max - exg_min + 1e-6)
-    exg_norm = (exg_norm * 255).astype(np.uint8)
+    Min / max come from the masked leaf pixels (cv2.minMaxLoc); the
+    normalization runs densely over the plane (no gather / scatter of
+    leaf pixels) with the same float32 arithmetic, so the result is
+    identical to normalizing the gathered leaf values.
+    """
+    leaf_u8 = leaf.view(np.uint8)
+    if not cv2.countNonZero(leaf_u8):
+        raise ValueError("Segmentasi gagal. Daun tidak terdeteksi.")
+    lo, hi, _, _ = cv2.minMaxLoc(values, leaf_u8)
+    v_min, v_max = values.dtype.type(lo), values.dtype.type(hi)
 
-    # apply colormap
-    # exg_colormap = cv2.applyColorMap(exg_norm, cv2.COLORMAP_RDYLGN)
-    exg_colormap = cv2.applyColorMap(exg_norm, cv2.COLORMAP_TURBO)
+    norm = np.subtract(values, v_min)
+    norm /= v_max - v_min + 1e-6
+    norm *= 255
+    # background bisa di luar [min, max] daun; piksel daun sudah 0..255
+    np.clip(norm, 0, 255, out=norm)
+    norm = norm.astype(np.uint8)
+    norm *= leaf
 
+    # exg_colormap = cv2.applyColorMap(norm, cv2.COLORMAP_RDYLGN)
+    return cv2.applyColorMap(norm, INDEX_COLORMAP)
 
-    return exg_colormap
 
+def _leaf_bbox_map(img_rgb, mask, plane):
+    """
+    Heatmap of one index plane computed on the leaf bounding box only,
+    pasted into a full-size frame (background color outside).
+    """
+    leaf = mask > 0
+    if not leaf.any():
+        raise ValueError("Segmentasi gagal. Daun tidak terdeteksi.")
+    x, y, w, h = cv2.boundingRect(leaf.view(np.uint8))
+    roi = slice(y, y + h), slice(x, x + w)
+    frame = build_index_frame(img_rgb[roi], leaf[roi])
+    return paste_roi(
+        _index_colormap(getattr(frame, plane), frame.leaf),
+        roi, leaf.shape, fill=BACKGROUND_BGR
+    )
 
-def compute_exg_gli(img_rgb, mask):
-    pixels = img_rgb[mask > 0].astype(np.float32)
 
-    if pixels.size == 0:
-        raise ValueError("Segmentasi gagal. Daun tidak terdeteksi.")
+def compute_exg_map(img_rgb, mask, frame=None):
+    """
+    Generate Excess Green (ExG) heatmap image.
+
+    Without `frame`, index planes are built on the leaf bounding box
+    only; the result is identical.
+    """
+    if frame is None:
+        return _leaf_bbox_map(img_rgb, mask, "exg")
+
+    return _index_colormap(frame.exg, frame.leaf)
 
-    R = pixels[:, 0]
-    G = pixels[:, 1]
-    B = pixels[:, 2]
 
-    ExG = 2*G - R - B
-    GLI = (2*G - R - B) / (2*G + R + B + 1e-6)
+def compute_exg_gli(img_rgb, mask, frame=None):
+    if frame is None:
+        frame = build_index_frame(img_rgb, mask)
 
-    print("GLI min:", np.nanmin(GLI))
-    print("GLI mean:", np.nanmean(GLI))
-    print("GLI max:", np.nanmax(GLI))
+    if not frame.leaf.any():
+        raise ValueError("Segmentasi gagal. Daun tidak terdeteksi.")
 
+    ExG = frame.leaf_values("exg")
+    GLI = frame.leaf_values("gli")
+    G = frame.leaf_values("g")
 
     return {
         "mean_ExG": np.mean(ExG),
@@ -57,44 +87,21 @@ def compute_exg_gli(img_rgb, mask):
         "mean_G": np.mean(G)
     }
 
-def compute_gli_map(img_rgb, mask):
+def compute_gli_map(img_rgb, mask, frame=None):
     """
-    Generate Green Leaf Index (GLI) heatmap image.
+    Generate Green Leaf Index (GLI) heatmap image (see compute_exg_map).
     """
-    img = img_rgb.astype(np.float32)
-
-    R = img[:, :, 0]
-    G = img[:, :, 1]
-    B = img[:, :, 2]
-
-    gli = (2 * G - R - B) / (2 * G + R + B + 1e-6)
-
-    # background di-nol-kan
-    gli[mask == 0] = np.nan
-
-    # normalize GLI to 0–255
-    gli_min = np.nanmin(gli)
-    gli_max = np.nanmax(gli)
-
-    gli_norm = (gli - gli_min) / (gli_max - gli_min + 1e-6)
-    gli_norm = (gli_norm * 255).astype(np.uint8)
+    if frame is None:
+        return _leaf_bbox_map(img_rgb, mask, "gli")
 
     # colormap (konsisten dengan ExG)
-    gli_colormap = cv2.applyColorMap(gli_norm, cv2.COLORMAP_TURBO)
-
-    return gli_colormap
-
-def extract_exg_gli_values(img_rgb, mask):
-    img = img_rgb.astype(float)
-
-    R = img[:, :, 0]
-    G = img[:, :, 1]
-    B = img[:, :, 2]
+    return _index_colormap(frame.gli, frame.leaf)
 
-    exg = 2 * G - R - B
-    gli = (2 * G - R - B) / (2 * G + R + B + 1e-6)
+def extract_exg_gli_values(img_rgb, mask, frame=None):
+    if frame is None:
+        frame = build_index_frame(img_rgb, mask)
 
-    exg_vals = exg[mask > 0]
-    gli_vals = gli[mask > 0]
+    exg_vals = frame.leaf_values("exg")
+    gli_vals = frame.leaf_values("gli")
 
-    return exg_vals, gli_vals
\ No newline at end of file
+    return exg_vals, gli_vals
@@ -0,0 +1,123 @@
+"""
+High-resolution analysis: segment on a downscaled proxy, then compute
+ExG / GLI statistics over full-resolution tiles.
+
+Only one tile of float planes exists at a time, so working memory does
+not grow with the megapixel count (the decoded uint8 image itself is
+still held once, OpenCV cannot decode a region of a JPEG/PNG).
+"""
+import cv2
+import numpy as np
+
+from image_pipeline.index_frame import build_index_frame
+from image_pipeline.zonal_stats import RunningStats, label_stats
+
+# sisi terpanjang proxy untuk segmentasi (aspect ratio dipertahankan)
+PROXY_MAX_SIDE = 1024
+
+# ukuran tile full-resolution (piksel)
+TILE_SIZE = 1024
+
+# histogram fixed-bin untuk akumulasi antar tile:
+# ExG bilangan bulat di [-510, 510] -> bin lebar 1 (rebin exact), GLI di [-1, 1]
+HIST_BINS = {
+    "exg": (1021, (-510.5, 510.5)),
+    "gli": (4000, (-1.0, 1.0)),
+}
+
+
+def make_proxy(img_rgb, max_side=PROXY_MAX_SIDE):
+    """
+    Downscale (aspect ratio preserved) and blur, like preprocess_image.
+    """
+    h, w = img_rgb.shape[:2]
+    scale = min(1.0, max_side / max(h, w))
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+
+    proxy = cv2.resize(img_rgb, size, interpolation=cv2.INTER_AREA)
+    return cv2.GaussianBlur(proxy, (5, 5), 0)
+
+
+def iter_tiles(height, width, tile_size=TILE_SIZE):
+    """
+    Yield (y0, y1, x0, x1) tile bounds covering the image row by row.
+    """
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield y0, min(y0 + tile_size, height), x0, min(x0 + tile_size, width)
+
+
+def upscale_labels(labels, y0, y1, x0, x1, full_shape):
+    """
+    Nearest-neighbour lookup of proxy labels for one full-resolution tile.
+    """
+    ph, pw = labels.shape
+    h, w = full_shape
+    rows = np.arange(y0, y1) * ph // h
+    cols = np.arange(x0, x1) * pw // w
+    return labels[np.ix_(rows, cols)]
+
+
+def tiled_index_stats(img_rgb, zones, tile_size=TILE_SIZE):
+    """
+    Accumulate index statistics over full-resolution tiles.
+
+    Parameters
+    ----------
+    img_rgb : np.ndarray
+        Full-resolution RGB image (H, W, 3), uint8
+    zones : ZoneLabels
+        Zones computed on the proxy
+
+    Returns
+    -------
+    leaf : dict of str -> RunningStats
+        "exg", "gli" (with fixed-bin histogram, see HIST_BINS) and "g"
+        over all leaf pixels
+    zones : dict of str -> dict of str -> RunningStats
+        Per zone "ExG" and "GLI"
+    n_tiles : int
+    """
+    h, w = img_rgb.shape[:2]
+    labels = zones.full()
+    zone_names = zones.names
+    n_zones = len(zone_names)
+
+    stats = {
+        name: {
+            "ExG": RunningStats(*HIST_BINS["exg"]),
+            "GLI": RunningStats(*HIST_BINS["gli"])
+        }
+        for name in zone_names
+    }
+    g_stats = RunningStats()
+
+    n_tiles = 0
+    for y0, y1, x0, x1 in iter_tiles(h, w, tile_size):
+        n_tiles += 1
+        tile_labels = upscale_labels(labels, y0, y1, x0, x1, (h, w))
+        if not tile_labels.any():
+            continue
+
+        frame = build_index_frame(img_rgb[y0:y1, x0:x1], tile_labels)
+
+        # piksel daun dikumpulkan sekali per plane, lalu dibagi per zona
+        exg = label_stats(frame.exg, tile_labels, n_zones, *HIST_BINS["exg"])
+        gli = label_stats(frame.gli, tile_labels, n_zones, *HIST_BINS["gli"])
+        for k, name in enumerate(zone_names, start=1):
+            stats[name]["ExG"].merge(exg[k])
+            stats[name]["GLI"].merge(gli[k])
+
+        g_stats.update(frame.leaf_values("g"))
+
+    # zona mempartisi daun: statistik daun = gabungan semua zona
+    leaf = {
+        "exg": RunningStats(*HIST_BINS["exg"]),
+        "gli": RunningStats(*HIST_BINS["gli"]),
+        "g": g_stats
+    }
+    for per_index in stats.values():
+        leaf["exg"].merge(per_index["ExG"])
+        leaf["gli"].merge(per_index["GLI"])
+
+    return leaf, stats, n_tiles
@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from image_pipeline.zonal import ZoneLabels
+
+
+@dataclass
+class IndexFrame:
+    """
+    Per-image vegetation index planes (float32, H x W) plus the boolean
+    leaf mask and zone labels they are evaluated on.
+
+    Built once per image by `build_index_frame`; maps, global stats,
+    zonal stats and histograms all read from the same planes.
+    """
+    exg: np.ndarray
+    gli: np.ndarray
+    g: np.ndarray
+    leaf: np.ndarray
+    zones: ZoneLabels | None = None
+
+    def leaf_values(self, plane):
+        """
+        Return values of an index plane ("exg", "gli", "g") on leaf pixels.
+        """
+        return getattr(self, plane)[self.leaf]
+
+
+def build_index_frame(img_rgb, mask_leaf, zones=None):
+    """
+    Compute ExG, GLI and G planes in a single float32 pass.
+
+    Parameters
+    ----------
+    img_rgb : np.ndarray
+        RGB image (H, W, 3), uint8
+    mask_leaf : np.ndarray
+        Binary mask of leaf (H, W), >0 = leaf
+    zones : ZoneLabels or dict of str -> np.ndarray, optional
+        Zone labels, or zone masks (>0 = inside zone),
+        e.g. {"center": ..., "ring": ...}
+
+    Returns
+    -------
+    IndexFrame
+    """
+    R = img_rgb[:, :, 0]
+    B = img_rgb[:, :, 2]
+
+    # G sekali di-upcast, R/B dibaca langsung dari uint8
+    g = img_rgb[:, :, 1].astype(np.float32)
+
+    # ExG = 2G - R - B
+    exg = np.multiply(g, 2, dtype=np.float32)
+    np.subtract(exg, R, out=exg)
+    np.subtract(exg, B, out=exg)
+
+    # GLI = ExG / (2G + R + B)
+    gli = np.multiply(g, 2, dtype=np.float32)
+    np.add(gli, R, out=gli)
+    np.add(gli, B, out=gli)
+    gli += 1e-6
+    np.divide(exg, gli, out=gli)
+
+    if isinstance(zones, dict):
+        zones = ZoneLabels.from_masks(zones)
+
+    return IndexFrame(
+        exg=exg,
+        gli=gli,
+        g=g,
+        leaf=mask_leaf > 0,
+        zones=zones
+    )
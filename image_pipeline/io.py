@@ -1,11 +1,128 @@
+import struct
+
 import cv2
 import numpy as np
 
-def load_image_from_bytes(image_bytes: bytes):
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# marker JPEG Start-Of-Frame (berisi dimensi); C4/C8/CC bukan SOF
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+             0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# faktor reduksi decode JPEG (DCT scaling di libjpeg)
+_JPEG_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def sniff_image_format(head):
+    """
+    Identify image format from the first bytes (magic number).
+
+    Returns "jpeg", "png" or None.
+    """
+    head = bytes(head[:8])
+    if head == PNG_SIGNATURE:
+        return "png"
+    if head[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    return None
+
+
+def _probe_jpeg(data):
+    pos = 2
+    n = len(data)
+    while pos + 4 <= n:
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+
+        # fill byte
+        if marker == 0xFF:
+            pos += 1
+            continue
+        # marker tanpa panjang
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            pos += 2
+            continue
+        # start of scan / end of image sebelum SOF
+        if marker in (0xDA, 0xD9):
+            return None
+
+        (length,) = struct.unpack_from(">H", data, pos + 2)
+        if marker in _JPEG_SOF:
+            if pos + 9 > n:
+                return None
+            height, width = struct.unpack_from(">HH", data, pos + 5)
+            return width, height
+        pos += 2 + length
+
+    return None
+
+
+def probe_image(image_bytes):
+    """
+    Read format and dimensions from the file header only (no decode).
+
+    Returns
+    -------
+    fmt, width, height : str, int, int
+        fmt is "jpeg" or "png"
+    """
+    data = memoryview(image_bytes).cast("B")
+
+    if data[:8] == PNG_SIGNATURE and len(data) >= 24 and data[12:16] == b"IHDR":
+        width, height = struct.unpack_from(">II", data, 16)
+        return "png", width, height
+
+    if data[:2] == b"\xff\xd8":
+        size = _probe_jpeg(data)
+        if size is not None:
+            return ("jpeg",) + size
+
+    raise ValueError("File tidak dapat dibaca sebagai gambar.")
+
+
+def _decode_flag(image_bytes, target_size):
+    """
+    Pick the largest JPEG reduction that still leaves the image
+    at least as large as `target_size` on both sides.
+    """
+    if target_size is None:
+        return cv2.IMREAD_COLOR
+
+    try:
+        fmt, width, height = probe_image(image_bytes)
+    except ValueError:
+        return cv2.IMREAD_COLOR
+
+    if fmt != "jpeg":
+        return cv2.IMREAD_COLOR
+
+    # orientasi EXIF bisa menukar w/h, jadi bandingkan sisi terpendek
+    short_side = min(width, height)
+    needed = max(target_size)
+    for factor, flag in _JPEG_REDUCED_FLAGS:
+        if short_side // factor >= needed:
+            return flag
+
+    return cv2.IMREAD_COLOR
+
+
+def load_image_from_bytes(image_bytes: bytes, target_size=None):
+    """
+    Decode image bytes once into RGB.
+
+    With `target_size` (w, h), large JPEGs are decoded directly at
+    1/2, 1/4 or 1/8 resolution, never below the target size.
+    """
     arr = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+    img = cv2.imdecode(arr, _decode_flag(image_bytes, target_size))
 
     if img is None:
         raise ValueError("Gambar tidak valid atau rusak.")
 
-    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
\ No newline at end of file
+    # in-place: tidak ada salinan kedua dari gambar full-resolution
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=img)
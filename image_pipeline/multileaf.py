@@ -0,0 +1,232 @@
+"""
+Multi-leaf analysis: every leaflet of a frond photo in one pass.
+
+Leaflets are the connected components of the HSV mask above a minimum
+area (no center crop). Index planes are computed once over the frond
+bounding box; leaf pixels are gathered once and reduced per leaflet and
+per (leaflet, zone) with bincount, so the cost barely depends on the
+number of leaflets.
+"""
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from image_pipeline.index_frame import build_index_frame
+from image_pipeline.segmentation import fill_holes
+from image_pipeline.zonal import ZoneLabels, ZONE_NAMES
+
+# luas minimum leaflet, relatif terhadap luas gambar
+MIN_LEAFLET_AREA = 0.002
+
+# maksimal leaflet per gambar (yang terbesar)
+MAX_LEAFLETS = 100
+
+# sisi terpanjang gambar kerja mode multi (aspect ratio dipertahankan)
+MULTI_MAX_SIDE = 1024
+
+# threshold jarak relatif zona, sama dengan create_zone_labels
+ZONE_THRESHOLDS = (0.35, 0.65)
+
+
+@dataclass
+class Leaflets:
+    """
+    Leaflet label image cropped to the frond bounding box
+    (0 = background, k = k-th leaflet, largest first) and per-leaflet
+    bounding boxes (x, y, w, h) in full-image coordinates.
+    """
+    labels: np.ndarray
+    boxes: np.ndarray
+    offset: tuple
+    shape: tuple
+
+    def __len__(self):
+        return len(self.boxes)
+
+    @property
+    def slices(self):
+        y0, x0 = self.offset
+        h, w = self.labels.shape
+        return slice(y0, y0 + h), slice(x0, x0 + w)
+
+
+@dataclass
+class GroupStats:
+    """
+    count, mean, std, min, max of one index per group (arrays).
+    """
+    count: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+
+    def combine(self, mapping, n_groups):
+        """
+        Merge groups: group i goes into mapping[i] (pairwise update,
+        exact like RunningStats.merge).
+        """
+        count = np.bincount(mapping, self.count, n_groups)
+        safe = np.maximum(count, 1)
+        mean = np.bincount(mapping, self.count * self.mean, n_groups) / safe
+        spread = self.count * (self.std ** 2 + (self.mean - mean[mapping]) ** 2)
+        std = np.sqrt(np.bincount(mapping, spread, n_groups) / safe)
+
+        vmin = np.full(n_groups, np.inf, dtype=self.min.dtype)
+        vmax = np.full(n_groups, -np.inf, dtype=self.max.dtype)
+        np.minimum.at(vmin, mapping, self.min)
+        np.maximum.at(vmax, mapping, self.max)
+
+        return GroupStats(count.astype(np.int64), mean, std, vmin, vmax)
+
+    def to_dict(self, i):
+        # format sama dengan RunningStats.to_dict
+        if not self.count[i]:
+            return {"mean": None, "std": None, "min": None, "max": None, "n_pixel": 0}
+        return {
+            "mean": float(self.mean[i]),
+            "std": float(self.std[i]),
+            "min": float(self.min[i]),
+            "max": float(self.max[i]),
+            "n_pixel": int(self.count[i])
+        }
+
+
+def group_stats(values, groups, n_groups, count=None):
+    """
+    Statistics of `values` for every group 0..n_groups-1 (vectorized).
+    `groups` must be intp; `count` (bincount of groups) can be shared.
+    """
+    if count is None:
+        count = np.bincount(groups, minlength=n_groups)
+    safe = np.maximum(count, 1)
+
+    mean = np.bincount(groups, values, n_groups) / safe
+    dev = values - mean[groups]
+    std = np.sqrt(np.bincount(groups, dev * dev, n_groups) / safe)
+
+    # dtype sama dengan values & index intp: jalur cepat ufunc.at
+    vmin = np.full(n_groups, np.inf, dtype=values.dtype)
+    vmax = np.full(n_groups, -np.inf, dtype=values.dtype)
+    np.minimum.at(vmin, groups, values)
+    np.maximum.at(vmax, groups, values)
+
+    return GroupStats(count, mean, std, vmin, vmax)
+
+
+def detect_leaflets(mask_green, min_area=MIN_LEAFLET_AREA, max_leaflets=MAX_LEAFLETS):
+    """
+    Connected components of the HSV mask with at least `min_area`
+    (fraction of the image) pixels, largest first, holes filled.
+    """
+    n, labels, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(
+        mask_green, 8, cv2.CV_32S, cv2.CCL_GRANA
+    )
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    keep = np.flatnonzero(areas >= max(1, int(min_area * mask_green.size)))
+    if keep.size == 0:
+        raise ValueError("Segmentasi gagal. Daun tidak terdeteksi.")
+
+    keep = keep[np.argsort(-areas[keep], kind="stable")][:max_leaflets] + 1
+    boxes = stats[keep, :4]
+
+    # label lama -> 1..n, komponen kecil -> 0
+    relabel = np.zeros(n, dtype=np.int32)
+    relabel[keep] = np.arange(1, keep.size + 1, dtype=np.int32)
+
+    x0, y0 = boxes[:, 0].min(), boxes[:, 1].min()
+    x1 = (boxes[:, 0] + boxes[:, 2]).max()
+    y1 = (boxes[:, 1] + boxes[:, 3]).max()
+    crop = relabel[labels[y0:y1, x0:x1]]
+
+    # isi lubang tiap leaflet (seperti kontur FILLED di mode standar)
+    for k, (x, y, w, h) in enumerate(boxes, start=1):
+        sub = crop[y - y0:y - y0 + h, x - x0:x - x0 + w]
+        filled = fill_holes(cv2.compare(sub, k, cv2.CMP_EQ))
+        sub[(filled > 0) & (sub == 0)] = k
+
+    return Leaflets(
+        labels=crop,
+        boxes=boxes,
+        offset=(int(y0), int(x0)),
+        shape=mask_green.shape[:2]
+    )
+
+
+def leaflet_stats(img_rgb, leaflets, thresholds=ZONE_THRESHOLDS):
+    """
+    Index statistics of every leaflet, its zones and the whole frond
+    from one pass over shared index planes.
+
+    Zones follow create_zone_labels per leaflet (distance to the
+    leaflet centroid, normalized by its maximum).
+
+    Returns
+    -------
+    dict with
+        "frame": IndexFrame over the frond bounding box, zones = zone
+            labels of all leaflets (for artifacts)
+        "zone": {"exg", "gli", "g"} -> GroupStats, group (k-1) * n_zones + z
+        "leaflet": same, group k-1 = leaflet k
+        "frond_zone": same, group z over all leaflets
+        "frond": same, group 0 = all leaflets
+        "values": {"exg", "gli"} -> leaf pixel values (for histograms)
+        "zone_names": tuple
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    n_zones = thresholds.size + 1
+    zone_names = ZONE_NAMES if n_zones == len(ZONE_NAMES) else tuple(
+        f"zone{k}" for k in range(1, n_zones + 1)
+    )
+    n = len(leaflets)
+
+    # piksel daun dikumpulkan sekali untuk semua leaflet (urutan baris)
+    leaf = leaflets.labels > 0
+    ys, xs = np.nonzero(leaf)
+    leaf_id = leaflets.labels[leaf].astype(np.intp) - 1
+
+    # zona per leaflet: jarak ke centroid, dinormalisasi jarak maksimum
+    count = np.bincount(leaf_id, minlength=n)
+    cy = np.bincount(leaf_id, ys, n) / count
+    cx = np.bincount(leaf_id, xs, n) / count
+    dist = np.hypot(ys - cy[leaf_id], xs - cx[leaf_id])
+    dmax = np.zeros(n)
+    np.maximum.at(dmax, leaf_id, dist)
+    zone = np.searchsorted(thresholds, dist / (dmax[leaf_id] + 1e-6), side="left")
+
+    zone_labels = np.zeros(leaflets.labels.shape, dtype=np.uint8)
+    zone_labels[leaf] = zone + 1
+    zones = ZoneLabels(
+        labels=zone_labels, names=zone_names, offset=(0, 0), shape=zone_labels.shape
+    )
+
+    # plane indeks sekali untuk semua leaflet
+    frame = build_index_frame(img_rgb[leaflets.slices], leaflets.labels, zones=zones)
+
+    values = {
+        "exg": frame.exg[leaf],
+        "gli": frame.gli[leaf],
+        "g": frame.g[leaf]
+    }
+
+    # reduksi piksel hanya sekali (per leaflet x zona), level lain digabung
+    zone_id = leaf_id * n_zones + zone
+    zone_count = np.bincount(zone_id, minlength=n * n_zones)
+    by_zone = {
+        k: group_stats(v, zone_id, n * n_zones, zone_count) for k, v in values.items()
+    }
+
+    groups = np.arange(n * n_zones)
+    to_leaflet, to_zone = groups // n_zones, groups % n_zones
+    by_leaflet = {k: st.combine(to_leaflet, n) for k, st in by_zone.items()}
+
+    return {
+        "frame": frame,
+        "zone": by_zone,
+        "leaflet": by_leaflet,
+        "frond_zone": {k: st.combine(to_zone, n_zones) for k, st in by_zone.items()},
+        "frond": {k: st.combine(np.zeros(n, np.intp), 1) for k, st in by_leaflet.items()},
+        "values": {k: values[k] for k in ("exg", "gli")},
+        "zone_names": zone_names
+    }
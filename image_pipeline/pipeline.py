@@ -1,153 +1,480 @@
-from pathlib import Path
 import cv2
 
 from image_pipeline.io import load_image_from_bytes
-from image_pipeline.preprocessing import preprocess_image
+from image_pipeline.preprocessing import preprocess_image, PREPROCESS_SIZE
 from image_pipeline.segmentation import (
+    segment_main_leaf,
     segment_leaf_hsv,
-    extract_main_leaf_center_first,
-    apply_mask
+    check_segmentation,
+    leaf_roi,
+    apply_mask,
+    DEFAULT_SEGMENTATION
 )
-from image_pipeline.green_indices import compute_exg_gli, compute_exg_map, compute_gli_map, extract_exg_gli_values
-from image_pipeline.scoring import compute_visual_score
-from image_pipeline.analysis import save_histogram
-from image_pipeline.visualization import overlay_colormap_on_image
-from image_pipeline.zonal import (
-    create_geometric_zones
+from image_pipeline.green_indices import (
+    compute_exg_gli,
+    compute_exg_map,
+    compute_gli_map,
+    extract_exg_gli_values,
+    BACKGROUND_BGR
 )
+from image_pipeline.index_frame import build_index_frame
+from image_pipeline.scoring import compute_visual_score, score_batch, DEFAULT_SCORING, ScoringConfig
+from image_pipeline.analysis import render_histogram_image, compute_histogram, histogram_to_dict
+from image_pipeline.artifact_writer import ArtifactEncoding, ArtifactSink
+from image_pipeline.highres import make_proxy, tiled_index_stats, TILE_SIZE
+from image_pipeline.multileaf import detect_leaflets, leaflet_stats, MULTI_MAX_SIDE
+from image_pipeline.profiling import make_timer
+from image_pipeline.visualization import composite_overlays, paste_roi
+from image_pipeline.zonal import create_zone_labels
 from image_pipeline.zonal_stats import zonal_stats_exg_gli
 
 import logging
 logger = logging.getLogger("image-pipeline")
 
+# naikkan jika perubahan pipeline mengubah hasil (invalidasi cache hasil)
+PIPELINE_VERSION = "2"
+
+# nama artifact -> (nama file tanpa ekstensi, key pada result, jenis)
+# jenis "image" mengikuti ArtifactEncoding.image_format, "chart" selalu PNG
+ARTIFACTS = {
+    "segmented": ("leaf_segmented", "segmented_image", "image"),
+    "exg_map": ("exg_map", "exg_image", "image"),
+    "gli_map": ("gli_map", "gli_image", "image"),
+    "hist_exg": ("hist_exg", "hist_exg", "chart"),
+    "hist_gli": ("hist_gli", "hist_gli", "chart"),
+    "exg_overlay": ("exg_overlay", "exg_overlay", "image"),
+    "gli_overlay": ("gli_overlay", "gli_overlay", "image"),
+}
+
+# "standard": resize ke PREPROCESS_SIZE; "highres": statistik full-resolution per tile;
+# "multi": semua leaflet dalam satu foto pelepah
+MODES = ("standard", "highres", "multi")
+
+
+def resolve_artifacts(artifacts, output_dir, return_artifacts=False):
+    """
+    Normalize the requested artifact names.
+
+    None means every artifact when `output_dir` is set (or the bytes
+    are returned), none otherwise.
+    """
+    destination = bool(output_dir) or return_artifacts
+    if artifacts is None:
+        return set(ARTIFACTS) if destination else set()
+
+    wanted = set(artifacts)
+    unknown = wanted - set(ARTIFACTS)
+    if unknown:
+        raise ValueError(
+            f"Artifact tidak dikenal: {', '.join(sorted(unknown))}. "
+            f"Pilihan: {', '.join(ARTIFACTS)}."
+        )
+    if wanted and not destination:
+        raise ValueError("output_dir wajib diisi jika artifact diminta.")
+
+    return wanted
+
+
 def process_leaf_image(
     image_bytes: bytes,
-    output_dir: str | None = None
+    output_dir: str | None = None,
+    artifacts=None,
+    profile: bool = False,
+    mode: str = "standard",
+    encoding: ArtifactEncoding | None = None,
+    background_write: bool = False,
+    return_artifacts: bool = False,
+    segmentation: str = DEFAULT_SEGMENTATION,
+    scoring: ScoringConfig = DEFAULT_SCORING
+):
+    """
+    Analyze one leaf image.
+
+    `artifacts` selects which images are rendered into `output_dir`
+    (see ARTIFACTS); maps and overlays nobody asked for are not computed.
+    Default: all artifacts if `output_dir` is given, otherwise numbers only.
+
+    With `profile=True` the result gets a "timings" entry with the
+    duration of every stage (see image_pipeline.profiling).
+
+    `mode="highres"` keeps the native resolution: segmentation runs on
+    a downscaled proxy, ExG / GLI statistics over full-resolution tiles
+    (see image_pipeline.highres).
+
+    `mode="multi"` analyzes every leaflet of a frond photo: result
+    "leaflets" (one entry per leaflet) and "frond" (aggregate); the
+    top-level numbers cover all leaflets together
+    (see image_pipeline.multileaf).
+
+    `encoding` sets artifact format / quality (default: PNG). With
+    `background_write=True` artifacts are only rendered here; encoding
+    and writing happen on the process' artifact writer pool, so the
+    result (with file names) returns before the files exist.
+    `return_artifacts=True` writes nothing: the encoded artifacts are
+    returned in result["artifact_files"] ({file name: bytes}).
+
+    `segmentation` picks the leaf segmentation method
+    (see image_pipeline.segmentation.SEGMENTATION_METHODS). It is still
+    validated for `mode="multi"` but not used there: those methods pick
+    the one main leaf, while multi keeps every component of the
+    full-frame HSV mask (see detect_leaflets).
+
+    `scoring` sets score weights, ranges and label cutoffs; its version
+    is reported as result["scoring_version"] (see image_pipeline.scoring).
+    """
+    if mode not in MODES:
+        raise ValueError(f"Mode tidak dikenal: {mode}. Pilihan: {', '.join(MODES)}.")
+    check_segmentation(segmentation)
+
+    wanted = resolve_artifacts(artifacts, output_dir, return_artifacts)
+    timer = make_timer(profile)
+    sink = ArtifactSink(
+        encoding or ArtifactEncoding(), timer,
+        out_dir=None if return_artifacts else output_dir,
+        background=background_write
+    )
+
+    if mode == "highres":
+        result = _process_leaf_image_highres(image_bytes, wanted, timer, sink, segmentation, scoring)
+    elif mode == "multi":
+        result = _process_leaf_image_multi(image_bytes, wanted, timer, sink, scoring)
+    else:
+        result = _process_leaf_image_standard(image_bytes, wanted, timer, sink, segmentation, scoring)
+
+    if return_artifacts:
+        result["artifact_files"] = sink.files
+    if timer.enabled:
+        result["timings"] = timer.report()
+
+    return result
+
+
+def _process_leaf_image_standard(
+    image_bytes, wanted, timer, sink,
+    segmentation=DEFAULT_SEGMENTATION, scoring=DEFAULT_SCORING
 ):
     logger.info("Starting image processing")
-    # 1) load from memory
-    img_rgb = load_image_from_bytes(image_bytes)
+    # 1) load from memory (sekali decode, JPEG besar langsung di-downscale)
+    with timer.stage("decode"):
+        img_rgb = load_image_from_bytes(image_bytes, target_size=PREPROCESS_SIZE)
 
     # 2) preprocessing
-    img_prep = preprocess_image(img_rgb)
+    with timer.stage("preprocess"):
+        img_prep = preprocess_image(img_rgb)
 
-    # 3) segmentation
-    mask_green = segment_leaf_hsv(img_prep)
-    mask_leaf = extract_main_leaf_center_first(
-        img_prep, mask_green, crop_ratio=0.65
-    )
+    # 3) segmentation (stage "segmentation" + "contours", lihat SEGMENTATION_METHODS)
+    mask_leaf = segment_main_leaf(img_prep, segmentation, crop_ratio=0.65, timer=timer)
 
     # guard: mask kosong
     if mask_leaf is None or mask_leaf.sum() == 0:
         logger.warning("Segmentation failed: empty mask")
         raise ValueError("Segmentasi gagal. Daun tidak terdeteksi.")
-    
-    logger.info("Image processing completed successfully")
-    leaf_only = apply_mask(img_prep, mask_leaf)
 
-    # 4) indices
-    indices = compute_exg_gli(leaf_only, mask_leaf)
-    exg_map = compute_exg_map(leaf_only, mask_leaf)
-    gli_map = compute_gli_map(img_prep, mask_leaf)
+    # semua tahap berikutnya bekerja pada view bounding box daun (tanpa copy)
+    roi = leaf_roi(mask_leaf)
+    img_roi, mask_roi = img_prep[roi], mask_leaf[roi]
 
-    # Overlay
-    exg_overlay = overlay_colormap_on_image(
-        img_prep, exg_map, mask_leaf, alpha=0.6
-    )
+    # === ZONES (satu label image, bukan tiga mask) ===
+    with timer.stage("zoning"):
+        zones = create_zone_labels(mask_roi)
 
-    gli_overlay = overlay_colormap_on_image(
-        img_prep, gli_map, mask_leaf, alpha=0.6
-    )
-    
-    # === ZONAL MASKS ===
-    mask_center, mask_ring, mask_edge = create_geometric_zones(mask_leaf)
-
-    # === ZONAL STATISTICS ===
-    zonal_stats = zonal_stats_exg_gli(
-        img_prep,
-        mask_center,
-        mask_ring,
-        mask_edge
-    )
-    print("Zonal Statistics:", zonal_stats)
-    # 5) scoring
-    score = compute_visual_score(indices)
+    # 4) indices (sekali hitung, dipakai semua tahap)
+    with timer.stage("indices"):
+        frame = build_index_frame(img_roi, mask_roi, zones=zones)
+
+    with timer.stage("stats"):
+        indices = compute_exg_gli(img_roi, mask_roi, frame=frame)
 
-    # extract values for histogram
-    exg_vals, gli_vals = extract_exg_gli_values(img_prep, mask_leaf)
+        # === ZONAL STATISTICS ===
+        zonal_stats = zonal_stats_exg_gli(img_roi, frame=frame)
+        logger.debug("Zonal Statistics: %s", zonal_stats)
+
+        # 5) scoring
+        score = compute_visual_score(indices, scoring)
+
+        # histogram (bin counts ikut di result JSON)
+        exg_vals, gli_vals = extract_exg_gli_values(img_roi, mask_roi, frame=frame)
+        exg_hist = compute_histogram(exg_vals)
+        gli_hist = compute_histogram(gli_vals)
 
     result = {
-        "exg": round(indices["mean_ExG"], 2),
-        "gli": round(indices["mean_GLI"], 3),
-        "score": score["score"],
+        "exg": round(float(indices["mean_ExG"]), 2),
+        "gli": round(float(indices["mean_GLI"]), 3),
+        "g": round(float(indices["mean_G"]), 2),
+        "score": round(float(score["score"]), 1),
         "label": score["label"],
+        "scoring_version": scoring.version,
+        "zonal_stats": zonal_stats,
+        "histograms": {
+            "ExG": histogram_to_dict(*exg_hist),
+            "GLI": histogram_to_dict(*gli_hist)
+        }
     }
 
-    # 6) optional: save visual output
-    if output_dir:
-        out = Path(output_dir)
-        out.mkdir(parents=True, exist_ok=True)
+    logger.info("Image processing completed successfully")
 
-        # segmented image
-        seg_path = out / "leaf_segmented.png"
-        cv2.imwrite(
-            str(seg_path),
-            cv2.cvtColor(leaf_only, cv2.COLOR_RGB2BGR)
+    # 6) optional: save visual output (hanya yang diminta)
+    if wanted:
+        _save_artifacts(
+            result, wanted, timer, sink,
+            img_prep, roi, mask_roi, frame,
+            exg_vals, gli_vals, exg_hist, gli_hist
         )
 
-        # ExG map
-        exg_path = out / "exg_map.png"
-        cv2.imwrite(
-            str(exg_path),
-            exg_map
-        )
+    return result
+
+
+def _process_leaf_image_highres(
+    image_bytes, wanted, timer, sink,
+    segmentation=DEFAULT_SEGMENTATION, scoring=DEFAULT_SCORING, tile_size=TILE_SIZE
+):
+    logger.info("Starting high-resolution image processing")
+    with timer.stage("decode"):
+        img_rgb = load_image_from_bytes(image_bytes)
+
+    with timer.stage("preprocess"):
+        img_proxy = make_proxy(img_rgb)
+
+    mask_leaf = segment_main_leaf(img_proxy, segmentation, crop_ratio=0.65, timer=timer)
+
+    if mask_leaf is None or mask_leaf.sum() == 0:
+        logger.warning("Segmentation failed: empty mask")
+        raise ValueError("Segmentasi gagal. Daun tidak terdeteksi.")
 
-        # save histograms
-        exg_hist = save_histogram(
-            exg_vals,
-            title="Histogram Excess Green (ExG)",
-            filename="hist_exg.png",
-            output_dir=out
+    with timer.stage("zoning"):
+        zones = create_zone_labels(mask_leaf)
+
+    # statistik full-resolution, satu tile per iterasi
+    with timer.stage("tiles"):
+        leaf_stats, zone_stats, n_tiles = tiled_index_stats(img_rgb, zones, tile_size)
+
+    if not leaf_stats["exg"].count:
+        raise ValueError("Segmentasi gagal. Daun tidak terdeteksi.")
+
+    height, width = img_rgb.shape[:2]
+    del img_rgb
+
+    with timer.stage("stats"):
+        indices = {
+            "mean_ExG": leaf_stats["exg"].mean,
+            "std_ExG": leaf_stats["exg"].std,
+            "mean_GLI": leaf_stats["gli"].mean,
+            "std_GLI": leaf_stats["gli"].std,
+            "mean_G": leaf_stats["g"].mean
+        }
+        zonal_stats = {
+            zone: {index: stats.to_dict() for index, stats in per_index.items()}
+            for zone, per_index in zone_stats.items()
+        }
+        score = compute_visual_score(indices, scoring)
+
+        # histogram full-resolution dari akumulator tile
+        exg_hist = leaf_stats["exg"].to_histogram()
+        gli_hist = leaf_stats["gli"].to_histogram()
+
+    result = {
+        "exg": round(float(indices["mean_ExG"]), 2),
+        "gli": round(float(indices["mean_GLI"]), 3),
+        "g": round(float(indices["mean_G"]), 2),
+        "score": round(float(score["score"]), 1),
+        "label": score["label"],
+        "scoring_version": scoring.version,
+        "zonal_stats": zonal_stats,
+        "histograms": {
+            "ExG": histogram_to_dict(*exg_hist),
+            "GLI": histogram_to_dict(*gli_hist)
+        },
+        "mode": "highres",
+        "resolution": {"width": width, "height": height, "tiles": n_tiles}
+    }
+
+    logger.info("High-resolution processing completed | %dx%d | tiles=%d", width, height, n_tiles)
+
+    # artifact dirender dari ROI proxy
+    if wanted:
+        roi = leaf_roi(mask_leaf)
+        mask_roi = mask_leaf[roi]
+        frame = build_index_frame(img_proxy[roi], mask_roi, zones=create_zone_labels(mask_roi))
+        exg_vals, gli_vals = extract_exg_gli_values(img_proxy[roi], mask_roi, frame=frame)
+        _save_artifacts(
+            result, wanted, timer, sink,
+            img_proxy, roi, mask_roi, frame,
+            exg_vals, gli_vals, exg_hist, gli_hist
         )
 
-        gli_hist = save_histogram(
-            gli_vals,
-            title="Histogram Green Leaf Index (GLI)",
-            filename="hist_gli.png",
-            output_dir=out
+    return result
+
+
+def _process_leaf_image_multi(image_bytes, wanted, timer, sink, scoring=DEFAULT_SCORING):
+    logger.info("Starting multi-leaf image processing")
+    with timer.stage("decode"):
+        img_rgb = load_image_from_bytes(image_bytes, target_size=(MULTI_MAX_SIDE, MULTI_MAX_SIDE))
+
+    # aspect ratio dipertahankan: leaflet tidak terdistorsi
+    with timer.stage("preprocess"):
+        img_prep = make_proxy(img_rgb, MULTI_MAX_SIDE)
+    del img_rgb
+
+    # seluruh frame (tanpa crop tengah), satu komponen per leaflet;
+    # SEGMENTATION_METHODS memilih satu daun utama, jadi tidak dipakai di sini
+    with timer.stage("segmentation"):
+        mask_green = segment_leaf_hsv(img_prep)
+    with timer.stage("contours"):
+        leaflets = detect_leaflets(mask_green)
+
+    with timer.stage("stats"):
+        stats = leaflet_stats(img_prep, leaflets)
+        zone_names = stats["zone_names"]
+        n_zones = len(zone_names)
+
+        def features(group):
+            return {
+                "mean_ExG": group["exg"].mean,
+                "mean_GLI": group["gli"].mean,
+                "mean_G": group["g"].mean
+            }
+
+        def index_stats(group, i):
+            return {"ExG": group["exg"].to_dict(i), "GLI": group["gli"].to_dict(i)}
+
+        # skor semua leaflet sekaligus (kolom mean per leaflet)
+        leaflet_scores = score_batch(features(stats["leaflet"]), scoring)
+
+        per_leaflet = []
+        for i, (x, y, w, h) in enumerate(leaflets.boxes):
+            per_leaflet.append({
+                "id": i + 1,
+                "bbox": [int(x), int(y), int(w), int(h)],
+                "area": int(stats["leaflet"]["exg"].count[i]),
+                "exg": round(float(stats["leaflet"]["exg"].mean[i]), 2),
+                "gli": round(float(stats["leaflet"]["gli"].mean[i]), 3),
+                "g": round(float(stats["leaflet"]["g"].mean[i]), 2),
+                "score": round(float(leaflet_scores["score"][i]), 1),
+                "label": leaflet_scores["label"][i],
+                "zonal_stats": {
+                    name: index_stats(stats["zone"], i * n_zones + z)
+                    for z, name in enumerate(zone_names)
+                }
+            })
+
+        # pelepah = semua piksel leaflet sebagai satu daun
+        score = compute_visual_score(
+            {name: column[0] for name, column in features(stats["frond"]).items()}, scoring
         )
+        scores = [leaf["score"] for leaf in per_leaflet]
+        labels = {}
+        for leaf in per_leaflet:
+            labels[leaf["label"]] = labels.get(leaf["label"], 0) + 1
+
+        exg_vals, gli_vals = stats["values"]["exg"], stats["values"]["gli"]
+        exg_hist = compute_histogram(exg_vals)
+        gli_hist = compute_histogram(gli_vals)
+
+    height, width = img_prep.shape[:2]
+    result = {
+        "exg": round(float(stats["frond"]["exg"].mean[0]), 2),
+        "gli": round(float(stats["frond"]["gli"].mean[0]), 3),
+        "g": round(float(stats["frond"]["g"].mean[0]), 2),
+        "score": round(float(score["score"]), 1),
+        "label": score["label"],
+        "scoring_version": scoring.version,
+        "zonal_stats": {
+            name: index_stats(stats["frond_zone"], z)
+            for z, name in enumerate(zone_names)
+        },
+        "histograms": {
+            "ExG": histogram_to_dict(*exg_hist),
+            "GLI": histogram_to_dict(*gli_hist)
+        },
+        "mode": "multi",
+        "resolution": {"width": width, "height": height},
+        "leaflets": per_leaflet,
+        "frond": {
+            "n_leaflets": len(per_leaflet),
+            "area": int(stats["frond"]["exg"].count[0]),
+            "score_mean": round(sum(scores) / len(scores), 1),
+            "score_min": min(scores),
+            "score_max": max(scores),
+            "labels": labels
+        }
+    }
+
+    logger.info("Multi-leaf processing completed | leaflets=%d", len(per_leaflet))
 
-        # GLI map
-        gli_path = out / "gli_map.png"
-        cv2.imwrite(
-            str(out / "gli_map.png"),
-            gli_map
+    if wanted:
+        roi = leaflets.slices
+        _save_artifacts(
+            result, wanted, timer, sink,
+            img_prep, roi, cv2.compare(leaflets.labels, 0, cv2.CMP_GT), stats["frame"],
+            exg_vals, gli_vals, exg_hist, gli_hist
         )
-        # overlays
-        exg_overlay_path = out / "exg_overlay.png"
-        cv2.imwrite(str(out / "exg_overlay.png"), exg_overlay)
-
-        gli_overlay_path = out / "gli_overlay.png"
-        cv2.imwrite(str(out / "gli_overlay.png"), gli_overlay)
-
-        # result["segmented_image"] = seg_path.name
-        # result["exg_image"] = exg_path.name
-        # result["gli_image"] = gli_path.name
-        # result["hist_exg"] = exg_hist
-        # result["hist_gli"] = gli_hist
-        # result["exg_overlay"] = exg_overlay_path.name
-        # result["gli_overlay"] = gli_overlay_path.name
-        
-        result.update({
-            "segmented_image": seg_path.name,
-            "exg_image": exg_path.name,
-            "gli_image": gli_path.name,
-            "hist_exg": exg_hist,
-            "hist_gli": gli_hist,
-            "exg_overlay": exg_overlay_path.name,
-            "gli_overlay": gli_overlay_path.name,
-            "zonal_stats": zonal_stats
-        })
-
-
-    return result
\ No newline at end of file
+
+    return result
+
+
+def _save_artifacts(
+    result, wanted, timer, sink,
+    img_full, roi, mask_roi, frame,
+    exg_vals, gli_vals, exg_hist, gli_hist
+):
+    """
+    Render the requested artifacts. Everything is computed on the leaf
+    ROI; the full frame is assembled only for the image being written.
+    """
+    if sink.out_dir is not None:
+        sink.out_dir.mkdir(parents=True, exist_ok=True)
+    img_roi = img_full[roi]
+    shape = img_full.shape[:2]
+
+    def save(name, image_bgr):
+        stem, key, kind = ARTIFACTS[name]
+        result[key] = sink.save(stem, kind, image_bgr)
+
+    # segmented image
+    if "segmented" in wanted:
+        with timer.stage("render"):
+            leaf_only = paste_roi(
+                cv2.cvtColor(apply_mask(img_roi, mask_roi), cv2.COLOR_RGB2BGR),
+                roi, shape
+            )
+        save("segmented", leaf_only)
+
+    # ExG / GLI map (dipakai juga oleh overlay)
+    maps = {}
+    for index, compute_map in (("exg", compute_exg_map), ("gli", compute_gli_map)):
+        if not wanted & {f"{index}_map", f"{index}_overlay"}:
+            continue
+        with timer.stage("render"):
+            maps[index] = compute_map(img_roi, mask_roi, frame=frame)
+        if f"{index}_map" in wanted:
+            with timer.stage("render"):
+                map_full = paste_roi(maps[index], roi, shape, fill=BACKGROUND_BGR)
+            save(f"{index}_map", map_full)
+
+    # semua overlay sekaligus: base BGR sekali, blend per colormap di bbox daun
+    overlays = [index for index in maps if f"{index}_overlay" in wanted]
+    if overlays:
+        with timer.stage("render"):
+            images = composite_overlays(
+                img_full, [maps[index] for index in overlays], frame.zones,
+                alpha=0.6, soft_edge=sink.encoding.overlay_edge, roi=roi
+            )
+        for index, image in zip(overlays, images):
+            save(f"{index}_overlay", image)
+
+    # histograms
+    if "hist_exg" in wanted:
+        with timer.stage("render"):
+            hist_img = render_histogram_image(
+                exg_vals, title="Histogram Excess Green (ExG)", hist=exg_hist,
+                backend=sink.encoding.histogram_backend
+            )
+        save("hist_exg", hist_img)
+
+    if "hist_gli" in wanted:
+        with timer.stage("render"):
+            hist_img = render_histogram_image(
+                gli_vals, title="Histogram Green Leaf Index (GLI)", hist=gli_hist,
+                backend=sink.encoding.histogram_backend
+            )
+        save("hist_gli", hist_img)
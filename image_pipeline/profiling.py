@@ -0,0 +1,71 @@
+import resource
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+# ru_maxrss: kilobyte di Linux, byte di macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def peak_rss_bytes():
+    """
+    Peak resident set size of the current process.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+class StageTimer:
+    """
+    Collect wall-clock duration per pipeline stage (seconds).
+
+    Usage:
+        timer = StageTimer()
+        with timer.stage("decode"):
+            ...
+        timer.timings  # {"decode": 0.012}
+    """
+    enabled = True
+
+    def __init__(self):
+        self.timings = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - t0
+
+    def report(self):
+        """
+        Stage timings plus total and peak RSS of this process.
+        """
+        return {
+            "stages": {k: round(v, 6) for k, v in self.timings.items()},
+            "total": round(time.perf_counter() - self._start, 6),
+            "peak_rss_bytes": peak_rss_bytes()
+        }
+
+
+class _NullTimer:
+    """
+    Disabled timer: every stage is a shared no-op context.
+    """
+    enabled = False
+    timings = {}
+    _null = nullcontext()
+
+    def stage(self, name):
+        return self._null
+
+    def report(self):
+        return None
+
+
+NULL_TIMER = _NullTimer()
+
+
+def make_timer(enabled):
+    return StageTimer() if enabled else NULL_TIMER
@@ -1,30 +1,168 @@
+"""
+Visual health score: weighted sum of min-max normalized features,
+mapped to a label by score cutoffs.
+
+Weights, ranges and cutoffs live in a versioned ScoringConfig (built-in
+DEFAULT_SCORING, or a JSON file via load_scoring_config). Scoring one
+analysis uses compute_visual_score; whole columns of features (history
+re-scoring, batch results) use score_batch.
+"""
+import json
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class ScoringConfig:
+    """
+    `features`: (feature name, weight, min, max) in summation order.
+    `labels`: (minimum score, label) from the highest cutoff down;
+    scores below every cutoff get `default_label`.
+    """
+    version: str
+    features: tuple
+    labels: tuple
+    default_label: str
+    decimals: int = 1
+
+    def __post_init__(self):
+        if not self.version:
+            raise ValueError("Versi konfigurasi skor wajib diisi.")
+        if not self.features:
+            raise ValueError("Konfigurasi skor tanpa fitur.")
+        for name, weight, lo, hi in self.features:
+            if not hi > lo:
+                raise ValueError(f"Rentang fitur {name} tidak valid: [{lo}, {hi}].")
+        cutoffs = [cutoff for cutoff, _ in self.labels]
+        if cutoffs != sorted(cutoffs, reverse=True):
+            raise ValueError("Batas label harus urut dari skor tertinggi.")
+
+    @classmethod
+    def from_dict(cls, data):
+        try:
+            return cls(
+                version=str(data["version"]),
+                features=tuple(
+                    (name, float(f["weight"]), float(f["range"][0]), float(f["range"][1]))
+                    for name, f in data["features"].items()
+                ),
+                labels=tuple((float(cutoff), label) for cutoff, label in data["labels"]),
+                default_label=data["default_label"],
+                decimals=int(data.get("decimals", 1))
+            )
+        except (KeyError, IndexError, TypeError, AttributeError) as e:
+            raise ValueError(f"Konfigurasi skor tidak valid: {e!r}") from e
+
+    def to_dict(self):
+        return {
+            "version": self.version,
+            "features": {
+                name: {"weight": weight, "range": [lo, hi]}
+                for name, weight, lo, hi in self.features
+            },
+            "labels": [[cutoff, label] for cutoff, label in self.labels],
+            "default_label": self.default_label,
+            "decimals": self.decimals
+        }
+
+
+DEFAULT_SCORING = ScoringConfig(
+    version="1",
+    features=(
+        ("mean_ExG", 0.45, -50.0, 200.0),
+        ("mean_GLI", 0.35, -0.2, 0.6),
+        ("mean_G", 0.20, 60.0, 160.0),
+    ),
+    labels=(
+        (80.0, "Sehat"),
+        (60.0, "Cukup Sehat"),
+        (40.0, "Kurang Sehat"),
+    ),
+    default_label="Stres"
+)
+
+
+def load_scoring_config(path=None):
+    """
+    ScoringConfig from a JSON file (format of ScoringConfig.to_dict);
+    no path means DEFAULT_SCORING.
+    """
+    if not path:
+        return DEFAULT_SCORING
+    with open(path, encoding="utf-8") as f:
+        return ScoringConfig.from_dict(json.load(f))
+
+
 def minmax(x, xmin, xmax):
     return max(0, min(1, (x - xmin) / (xmax - xmin)))
 
 
-def compute_visual_score(features):
-    ExG_n = minmax(features["mean_ExG"], -50, 200)
-    GLI_n = minmax(features["mean_GLI"], -0.2, 0.6)
-    G_n   = minmax(features["mean_G"], 60, 160)
+def compute_visual_score(features, config=DEFAULT_SCORING):
+    score_01 = 0.0
+    for name, weight, lo, hi in config.features:
+        score_01 += weight * minmax(features[name], lo, hi)
 
-    score_01 = (
-        0.45 * ExG_n +
-        0.35 * GLI_n +
-        0.20 * G_n
-    )
-
-    score = round(score_01 * 100, 1)
+    score = round(score_01 * 100, config.decimals)
 
-    if score >= 80:
-        label = "Sehat"
-    elif score >= 60:
-        label = "Cukup Sehat"
-    elif score >= 40:
-        label = "Kurang Sehat"
-    else:
-        label = "Stres"
+    label = config.default_label
+    for cutoff, name in config.labels:
+        if score >= cutoff:
+            label = name
+            break
 
     return {
         "score": score,
         "label": label
-    }
\ No newline at end of file
+    }
+
+
+def score_batch(features, config=DEFAULT_SCORING):
+    """
+    Vectorized compute_visual_score over columns of features.
+
+    `features` is anything indexable by feature name with equal-length
+    columns: a dict of arrays / lists, a NumPy structured or record
+    array, a DataFrame; a scalar is one row. Rows with a missing
+    (NaN / None) feature get score NaN and label None.
+
+    Returns {"score": float64 array, "label": object array}; the same
+    numbers as compute_visual_score row by row.
+    """
+    score_01 = None
+    for name, weight, lo, hi in config.features:
+        x = np.atleast_1d(np.asarray(features[name], dtype=np.float64))
+        if x.ndim != 1:
+            raise ValueError(f"Kolom fitur {name} harus 1 dimensi, bukan {x.shape}.")
+        if score_01 is not None and x.shape != score_01.shape:
+            raise ValueError(f"Panjang kolom fitur {name} berbeda: {x.size} != {score_01.size}.")
+        # sama dengan minmax(), NaN tetap NaN
+        term = weight * np.clip((x - lo) / (hi - lo), 0, 1)
+        score_01 = term if score_01 is None else score_01 + term
+
+    score = _round(score_01 * 100, config.decimals)
+
+    # cutoff naik; side="right" = score >= cutoff
+    cutoffs = np.array([cutoff for cutoff, _ in config.labels][::-1])
+    names = np.array(
+        [config.default_label] + [name for _, name in config.labels][::-1] + [None],
+        dtype=object
+    )
+    index = np.searchsorted(cutoffs, score, side="right")
+    index[np.isnan(score)] = len(names) - 1
+
+    return {"score": score, "label": names[index]}
+
+
+def _round(x, decimals):
+    """
+    np.round with the result of Python round(): np.round scales first
+    (x * 10**decimals), which can break a near-.5 tie the other way, so
+    those few values are rounded by Python.
+    """
+    x = np.atleast_1d(x)
+    out = np.round(x, decimals)
+    scaled = x * 10.0 ** decimals
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    out[ties] = [round(v, decimals) for v in x[ties].tolist()]
+    return out
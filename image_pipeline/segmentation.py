@@ -1,6 +1,18 @@
+from functools import partial
+
 import cv2
 import numpy as np
 
+from image_pipeline.profiling import NULL_TIMER
+
+# metode segmentasi daun utama (lihat SEGMENTATION_METHODS)
+DEFAULT_SEGMENTATION = "hsv"
+
+# faktor downscale proxy untuk metode "proxy"
+PROXY_FACTOR = 2
+
+_EDGE_KERNEL = np.ones((3, 3), np.uint8)
+
 
 def segment_leaf_hsv(
     img_rgb,
@@ -63,6 +75,168 @@ def extract_main_leaf_center_first(
     return full_mask
 
 
+def extract_main_leaf_components(hsv_mask, crop_ratio=0.7):
+    """
+    Same selection as extract_main_leaf_center_first, from connected
+    component statistics instead of contour areas: the largest component
+    inside the center crop, holes filled.
+    """
+    cropped_mask, (ox, oy) = center_crop(hsv_mask, crop_ratio)
+
+    n, labels, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(
+        cropped_mask, 8, cv2.CV_32S, cv2.CCL_GRANA
+    )
+    if n < 2:
+        raise ValueError("No contours found in center region")
+
+    # label 0 = background
+    k = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+    x, y, w, h = stats[k, :4]
+
+    full_mask = np.zeros(hsv_mask.shape, dtype=np.uint8)
+    full_mask[oy + y:oy + y + h, ox + x:ox + x + w] = fill_holes(
+        cv2.compare(labels[y:y + h, x:x + w], k, cv2.CMP_EQ)
+    )
+    return full_mask
+
+
+def fill_holes(mask):
+    """
+    Fill background regions not connected to the border (like drawing
+    the external contour filled).
+    """
+    outside = cv2.copyMakeBorder(mask, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    cv2.floodFill(outside, None, (0, 0), 255)
+    return cv2.bitwise_or(mask, cv2.bitwise_not(outside[1:-1, 1:-1]))
+
+
+def segment_main_leaf_hsv(img_rgb, crop_ratio=0.65, timer=NULL_TIMER):
+    """
+    Default method: full-resolution HSV mask, largest contour in the
+    center crop.
+    """
+    with timer.stage("segmentation"):
+        mask_green = segment_leaf_hsv(img_rgb)
+    with timer.stage("contours"):
+        return extract_main_leaf_center_first(img_rgb, mask_green, crop_ratio=crop_ratio)
+
+
+def segment_main_leaf_components(img_rgb, crop_ratio=0.65, timer=NULL_TIMER):
+    """
+    HSV mask, main leaf picked from connected component statistics.
+    """
+    with timer.stage("segmentation"):
+        mask_green = segment_leaf_hsv(img_rgb)
+    with timer.stage("contours"):
+        return extract_main_leaf_components(mask_green, crop_ratio=crop_ratio)
+
+
+def segment_main_leaf_proxy(
+    img_rgb,
+    crop_ratio=0.65,
+    timer=NULL_TIMER,
+    factor=PROXY_FACTOR,
+    refine=False
+):
+    """
+    Segment on a proxy downscaled by `factor`, then upscale the mask
+    bilinearly (edges interpolated, thresholded at half).
+
+    With `refine=True` the pixels along the leaf edge are classified
+    again with the HSV threshold at full resolution.
+    """
+    h, w = img_rgb.shape[:2]
+
+    with timer.stage("segmentation"):
+        small = cv2.resize(
+            img_rgb, (max(1, w // factor), max(1, h // factor)),
+            interpolation=cv2.INTER_AREA
+        )
+        # kernel morfologi ikut diperkecil (5 px full-res ~ 3 px proxy)
+        mask_green = segment_leaf_hsv(small, kernel_size=3)
+    with timer.stage("contours"):
+        leaf_small = extract_main_leaf_center_first(small, mask_green, crop_ratio=crop_ratio)
+
+    with timer.stage("refine"):
+        soft = cv2.resize(leaf_small, (w, h), interpolation=cv2.INTER_LINEAR)
+        _, mask = cv2.threshold(soft, 127, 255, cv2.THRESH_BINARY)
+        if refine:
+            _refine_edges(img_rgb, mask, leaf_small, factor)
+
+    return mask
+
+
+def _refine_edges(img_rgb, mask, leaf_small, factor):
+    # piksel full-res di sekitar tepi proxy (blok factor x factor per piksel tepi)
+    h, w = mask.shape
+    sy, sx = np.nonzero(cv2.morphologyEx(leaf_small, cv2.MORPH_GRADIENT, _EDGE_KERNEL))
+    offsets = np.arange(factor)
+    ys = np.repeat(sy[:, None] * factor + offsets, factor, axis=1).ravel()
+    xs = np.tile(sx[:, None] * factor + offsets, (1, factor)).ravel()
+    inside = (ys < h) & (xs < w)
+    ys, xs = ys[inside], xs[inside]
+
+    hsv = cv2.cvtColor(img_rgb[ys, xs].reshape(-1, 1, 3), cv2.COLOR_RGB2HSV)
+    mask[ys, xs] = cv2.inRange(
+        hsv, np.array((25, 40, 40), np.uint8), np.array((85, 255, 255), np.uint8)
+    ).ravel()
+
+
+# nama -> fungsi(img_rgb, crop_ratio, timer) -> mask daun utama (uint8 0/255)
+SEGMENTATION_METHODS = {
+    "hsv": segment_main_leaf_hsv,
+    "proxy": segment_main_leaf_proxy,
+    "proxy_refine": partial(segment_main_leaf_proxy, refine=True),
+    "components": segment_main_leaf_components,
+}
+
+
+def segment_main_leaf(img_rgb, method=DEFAULT_SEGMENTATION, crop_ratio=0.65, timer=NULL_TIMER):
+    """
+    Mask of the main leaf with the given method (see SEGMENTATION_METHODS).
+    """
+    return SEGMENTATION_METHODS[check_segmentation(method)](
+        img_rgb, crop_ratio=crop_ratio, timer=timer
+    )
+
+
+def check_segmentation(method):
+    if method not in SEGMENTATION_METHODS:
+        raise ValueError(
+            f"Metode segmentasi tidak dikenal: {method}. "
+            f"Pilihan: {', '.join(SEGMENTATION_METHODS)}."
+        )
+    return method
+
+
+def mask_agreement(mask, reference):
+    """
+    Quality of `mask` against a `reference` mask (same shape):
+    IoU, precision, recall and area ratio.
+    """
+    a = mask > 0
+    b = reference > 0
+    inter = int(np.count_nonzero(a & b))
+    union = int(np.count_nonzero(a | b))
+    area, area_ref = int(np.count_nonzero(a)), int(np.count_nonzero(b))
+    return {
+        "iou": inter / union if union else 1.0,
+        "precision": inter / area if area else float(not area_ref),
+        "recall": inter / area_ref if area_ref else float(not area),
+        "area_ratio": area / area_ref if area_ref else float(not area)
+    }
+
+
+def leaf_roi(mask_leaf):
+    """
+    Bounding box of the leaf mask as (rows, cols) slices.
+
+    Indexing an image with it gives a view (no copy) of the leaf region.
+    """
+    x, y, w, h = cv2.boundingRect(mask_leaf)
+    return slice(y, y + h), slice(x, x + w)
+
+
 def apply_mask(img_rgb, mask):
     """
     Apply binary mask to RGB image.
@@ -0,0 +1,284 @@
+"""
+Video / time-lapse analysis: leaf health over the frames of a video
+from a fixed camera.
+
+Frames are read one at a time from a local file with cv2.VideoCapture
+(decode buffer reused), every `step`-th frame is a candidate and, with
+`scene_change`, only candidates that differ enough from the last
+analyzed frame are analyzed. When the scene barely moved since the
+last segmentation, its leaf mask and ROI are reused (warm start).
+Records are yielded as frames are analyzed; memory does not grow with
+the video length.
+
+Usage:
+    python -m image_pipeline.video <file> [-o series.jsonl] [--step 30] [--scene-change 6]
+"""
+import argparse
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+
+from image_pipeline.batch import FORMATS, format_header, format_record
+from image_pipeline.green_indices import compute_exg_gli
+from image_pipeline.index_frame import build_index_frame
+from image_pipeline.preprocessing import preprocess_image
+from image_pipeline.scoring import compute_visual_score, DEFAULT_SCORING, load_scoring_config
+from image_pipeline.segmentation import (
+    segment_main_leaf,
+    check_segmentation,
+    leaf_roi,
+    SEGMENTATION_METHODS,
+    DEFAULT_SEGMENTATION
+)
+
+VIDEO_FIELDS = [
+    "frame", "time", "status", "score", "label", "exg", "gli", "g",
+    "scoring_version", "warm_start", "change", "error"
+]
+
+# analisis setiap N frame
+FRAME_STEP = 30
+
+# thumbnail (w, h) untuk mengukur perubahan antar frame
+THUMB_SIZE = (64, 64)
+
+# perubahan (rata-rata selisih absolut thumbnail, 0-255) maksimum
+# terhadap frame tersegmentasi terakhir agar mask & ROI dipakai ulang
+WARM_MAX_CHANGE = 3.0
+
+# segmentasi ulang paling lambat setelah N frame warm start berturut-turut
+WARM_MAX_FRAMES = 30
+
+
+@dataclass
+class WarmStart:
+    """
+    Leaf mask (cropped to `roi`) of the last segmented frame and the
+    thumbnail it was segmented from; `frames` counts reuses since.
+    """
+    thumb: object
+    roi: tuple
+    mask_roi: object
+    frames: int = 0
+
+
+def frame_thumbnail(frame):
+    return cv2.resize(frame, THUMB_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def frame_change(thumb, reference):
+    """
+    Mean absolute difference (0-255) of two thumbnails.
+    """
+    return cv2.norm(thumb, reference, cv2.NORM_L1) / thumb.size
+
+
+def analyze_frame(
+    frame_bgr, thumb, warm=None,
+    segmentation=DEFAULT_SEGMENTATION, scoring=DEFAULT_SCORING,
+    warm_max_change=WARM_MAX_CHANGE, warm_max_frames=WARM_MAX_FRAMES
+):
+    """
+    Standard-mode score, ExG, GLI and G of one decoded (BGR) frame.
+
+    The mask and ROI in `warm` are reused while the frame differs from
+    the thumbnail they were segmented from by at most
+    `warm_max_change`, for at most `warm_max_frames` frames in a row;
+    otherwise the frame is segmented again.
+
+    Returns (result, warm start for the next frame).
+    """
+    change = None if warm is None else frame_change(thumb, warm.thumb)
+    reuse = change is not None and change <= warm_max_change and warm.frames < warm_max_frames
+
+    # resize & blur per kanal: urutan kanal bebas, konversi RGB cukup di 512 px
+    img_prep = cv2.cvtColor(preprocess_image(frame_bgr), cv2.COLOR_BGR2RGB)
+
+    if reuse:
+        warm.frames += 1
+    else:
+        mask_leaf = segment_main_leaf(img_prep, segmentation, crop_ratio=0.65)
+        if mask_leaf is None or not cv2.countNonZero(mask_leaf):
+            raise ValueError("Segmentasi gagal. Daun tidak terdeteksi.")
+        roi = leaf_roi(mask_leaf)
+        warm = WarmStart(thumb=thumb, roi=roi, mask_roi=mask_leaf[roi])
+
+    img_roi = img_prep[warm.roi]
+    indices = compute_exg_gli(
+        img_roi, warm.mask_roi, frame=build_index_frame(img_roi, warm.mask_roi)
+    )
+    score = compute_visual_score(indices, scoring)
+
+    result = {
+        "score": round(float(score["score"]), 1),
+        "label": score["label"],
+        "exg": round(float(indices["mean_ExG"]), 2),
+        "gli": round(float(indices["mean_GLI"]), 3),
+        "g": round(float(indices["mean_G"]), 2),
+        "scoring_version": scoring.version,
+        "warm_start": reuse,
+        "change": None if change is None else round(change, 2)
+    }
+    return result, warm
+
+
+def iter_video(
+    path, step=FRAME_STEP, scene_change=None,
+    segmentation=DEFAULT_SEGMENTATION, scoring=DEFAULT_SCORING,
+    warm_max_change=WARM_MAX_CHANGE, warm_max_frames=WARM_MAX_FRAMES
+):
+    """
+    Analyze a video file frame by frame.
+
+    Every `step`-th frame is a candidate (the others are grabbed, not
+    converted). With `scene_change` set, a candidate is only analyzed
+    if its thumbnail differs from the last analyzed one by at least
+    that much (0-255); the first frame is always analyzed.
+
+    Returns an iterator of one record per analyzed frame, in frame
+    order; the video is opened (and checked) right away. Errors in a
+    frame (e.g. no leaf) are captured in its record.
+    """
+    if step < 1:
+        raise ValueError("Langkah frame minimal 1.")
+    check_segmentation(segmentation)
+
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        raise ValueError(f"Video tidak dapat dibuka: {path}")
+
+    return _iter_frames(
+        cap, step, scene_change, segmentation, scoring, warm_max_change, warm_max_frames
+    )
+
+
+def _iter_frames(cap, step, scene_change, segmentation, scoring, warm_max_change, warm_max_frames):
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_bgr = None
+    last_thumb = None
+    warm = None
+    index = -1
+
+    try:
+        while True:
+            # frame yang dilewati hanya di-grab (tanpa konversi warna)
+            for _ in range(step - 1 if index >= 0 else 0):
+                if not cap.grab():
+                    return
+                index += 1
+
+            ok, frame_bgr = cap.read(frame_bgr)
+            if not ok:
+                return
+            index += 1
+
+            thumb = frame_thumbnail(frame_bgr)
+            if (
+                scene_change is not None and last_thumb is not None
+                and frame_change(thumb, last_thumb) < scene_change
+            ):
+                continue
+            last_thumb = thumb
+
+            record = {
+                "frame": index,
+                "time": round(index / fps, 3) if fps > 0 else None
+            }
+            try:
+                result, warm = analyze_frame(
+                    frame_bgr, thumb, warm, segmentation, scoring,
+                    warm_max_change, warm_max_frames
+                )
+            except Exception as e:
+                warm = None
+                record.update(status="error", error=str(e) or type(e).__name__)
+            else:
+                record["status"] = "ok"
+                record.update(result)
+            yield record
+    finally:
+        cap.release()
+
+
+def run_video(path, output, fmt="jsonl", progress=sys.stderr, **options):
+    """
+    Analyze a video and write the time series incrementally
+    (options: see iter_video).
+
+    Returns (n_ok, n_error).
+    """
+    records = iter_video(path, **options)
+    n_ok = n_error = 0
+
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        f.write(format_header(fmt, VIDEO_FIELDS))
+
+        for record in records:
+            f.write(format_record(record, fmt, VIDEO_FIELDS))
+            f.flush()
+
+            if record["status"] == "ok":
+                n_ok += 1
+                status = (
+                    f"ok score={record['score']} label={record['label']}"
+                    f"{' warm' if record['warm_start'] else ''}"
+                )
+            else:
+                n_error += 1
+                status = f"error: {record['error']}"
+
+            if progress is not None:
+                print(f"[frame {record['frame']}] t={record['time']} | {status}", file=progress)
+
+    return n_ok, n_error
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m image_pipeline.video",
+        description="Time series of salak leaf health from a video file."
+    )
+    parser.add_argument("video", help="file video (mp4, avi, ...)")
+    parser.add_argument("-o", "--output", help="file hasil (default: video_results.<format>)")
+    parser.add_argument("-f", "--format", choices=FORMATS, help="format hasil (default dari ekstensi output, atau jsonl)")
+    parser.add_argument("--step", type=int, default=FRAME_STEP, help=f"analisis setiap N frame (default: {FRAME_STEP})")
+    parser.add_argument("--scene-change", type=float, default=None, help="hanya analisis frame yang berubah minimal sebesar ini (0-255)")
+    parser.add_argument("--warm-max-change", type=float, default=WARM_MAX_CHANGE, help="perubahan maksimum untuk memakai ulang mask (0-255)")
+    parser.add_argument("--warm-max-frames", type=int, default=WARM_MAX_FRAMES, help="warm start berturut-turut maksimum (0 = selalu segmentasi)")
+    parser.add_argument("-s", "--segmentation", choices=list(SEGMENTATION_METHODS), default=DEFAULT_SEGMENTATION, help="metode segmentasi daun")
+    parser.add_argument("--scoring", default=None, help="file JSON konfigurasi skor (default: bawaan)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format
+    if fmt is None and args.output:
+        suffix = Path(args.output).suffix.lower().lstrip(".")
+        fmt = suffix if suffix in FORMATS else None
+    fmt = fmt or "jsonl"
+    output = args.output or f"video_results.{fmt}"
+
+    if not Path(args.video).is_file():
+        parser.error(f"bukan file: {args.video}")
+
+    try:
+        scoring = load_scoring_config(args.scoring)
+    except (OSError, ValueError) as e:
+        parser.error(f"konfigurasi skor: {e}")
+
+    try:
+        n_ok, n_error = run_video(
+            args.video, output, fmt,
+            step=args.step, scene_change=args.scene_change,
+            segmentation=args.segmentation, scoring=scoring,
+            warm_max_change=args.warm_max_change, warm_max_frames=args.warm_max_frames
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Selesai | ok={n_ok} | error={n_error} | output={output}", file=sys.stderr)
+
+    return 0 if n_ok or not n_error else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
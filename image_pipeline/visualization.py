@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 
+from image_pipeline.zonal import ZoneLabels
+
 
 def overlay_colormap_on_image(
     base_rgb,
@@ -10,18 +12,108 @@ def overlay_colormap_on_image(
 ):
     """
     Overlay colormap on original RGB image using alpha blending.
+
+    `mask` is a binary leaf mask (>0 = leaf) or ZoneLabels, in which
+    case blending is limited to the zone bounding box.
     """
-    base_bgr = cv2.cvtColor(base_rgb, cv2.COLOR_RGB2BGR)
+    return composite_overlays(base_rgb, [colormap_bgr], mask, alpha=alpha)[0]
 
-    overlay = base_bgr.copy()
 
-    # hanya area daun
-    overlay[mask > 0] = cv2.addWeighted(
-        base_bgr[mask > 0],
-        1 - alpha,
-        colormap_bgr[mask > 0],
-        alpha,
-        0
-    )
+def overlay_weight(inside, alpha=0.6, soft_edge=0):
+    """
+    Per-pixel colormap weight: `alpha` inside the leaf, 0 outside.
+    With `soft_edge` > 0 the weight ramps up from 0 at the leaf edge to
+    `alpha` at `soft_edge` pixels inside (float32); otherwise the boolean
+    `inside` itself is returned (hard edge).
+    """
+    if soft_edge <= 0:
+        return inside
+    dist = cv2.distanceTransform(inside.view(np.uint8), cv2.DIST_L2, 3)
+    np.multiply(dist, alpha / soft_edge, out=dist)
+    return np.minimum(dist, alpha, out=dist)
+
 
-    return overlay
\ No newline at end of file
+def composite_overlays(
+    base_rgb,
+    colormaps_bgr,
+    mask,
+    alpha=0.6,
+    soft_edge=0,
+    roi=None,
+    base_bgr=None,
+    out=None
+):
+    """
+    Blend several colormaps over one base image.
+
+    `base_rgb` is the full image; the colormaps and `mask` (binary leaf
+    mask or ZoneLabels) cover its `roi` (default: the whole image).
+    The base is converted to BGR once (or passed as `base_bgr`) and
+    every colormap is blended with dense operations inside the mask
+    bounding box, the mask acting as the blend weight; pixels outside
+    keep the base. `out` can hold preallocated full-size BGR buffers,
+    one per colormap, to write into.
+
+    Returns one BGR image per colormap. With the hard edge the pixels
+    equal cv2.addWeighted(base, 1 - alpha, colormap, alpha, 0).
+    """
+    if base_bgr is None:
+        base_bgr = cv2.cvtColor(base_rgb, cv2.COLOR_RGB2BGR)
+    height, width = base_bgr.shape[:2]
+
+    if isinstance(mask, ZoneLabels):
+        inner = mask.slices
+        inside = mask.labels > 0
+    else:
+        inner = slice(None), slice(None)
+        inside = mask > 0
+
+    # bounding box mask dalam koordinat gambar penuh
+    roi = roi or (slice(0, height), slice(0, width))
+    (y0, _, _), (x0, _, _) = roi[0].indices(height), roi[1].indices(width)
+    rows = slice(y0 + (inner[0].start or 0), y0 + (inner[0].start or 0) + inside.shape[0])
+    cols = slice(x0 + (inner[1].start or 0), x0 + (inner[1].start or 0) + inside.shape[1])
+    base_area = base_bgr[rows, cols]
+
+    weight = overlay_weight(inside, alpha, soft_edge)
+    if weight.dtype == bool:
+        where = weight[..., None]
+    else:
+        base_weight = 1 - weight
+
+    # satu buffer kerja untuk semua colormap
+    blended = np.empty_like(base_area)
+    results = []
+    for i, colormap_bgr in enumerate(colormaps_bgr):
+        if out is None:
+            result = base_bgr.copy()
+        else:
+            result = out[i]
+            np.copyto(result, base_bgr)
+
+        area = colormap_bgr[inner]
+        if weight.dtype == bool:
+            cv2.addWeighted(base_area, 1 - alpha, area, alpha, 0, dst=blended)
+            np.copyto(result[rows, cols], blended, where=where)
+        else:
+            cv2.blendLinear(area, base_area, weight, base_weight, dst=blended)
+            result[rows, cols] = blended
+        results.append(result)
+
+    return results
+
+
+def paste_roi(roi_img, roi, shape, fill=0):
+    """
+    Place an ROI image back into a full frame of `shape` (H, W),
+    filled with `fill` (scalar or per channel) outside the ROI.
+    """
+    height, width = shape[:2]
+    (y0, y1, _), (x0, x1, _) = roi[0].indices(height), roi[1].indices(width)
+
+    # satu panggilan border konstan; full[...] = fill per-channel jauh lebih lambat
+    value = np.broadcast_to(np.asarray(fill, dtype=np.float64), roi_img.shape[2:] or (1,))
+    return cv2.copyMakeBorder(
+        roi_img, y0, height - y1, x0, width - x1,
+        cv2.BORDER_CONSTANT, value=value.tolist()
+    )
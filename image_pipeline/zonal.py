@@ -1,5 +1,156 @@
+from dataclasses import dataclass
+
+import cv2
 import numpy as np
 
+ZONE_NAMES = ("center", "ring", "edge")
+
+
+@dataclass
+class ZoneLabels:
+    """
+    Compact zone representation: a single uint8 label image cropped to
+    the leaf bounding box (0 = background, k = names[k-1]).
+
+    Replaces one full-size mask per zone; use `to_masks()` where the old
+    (center, ring, edge) tuple is still expected.
+    """
+    labels: np.ndarray
+    names: tuple
+    offset: tuple
+    shape: tuple
+
+    @property
+    def slices(self):
+        """
+        (rows, cols) slices of the bounding box in full-image coordinates.
+        """
+        y0, x0 = self.offset
+        h, w = self.labels.shape
+        return slice(y0, y0 + h), slice(x0, x0 + w)
+
+    def crop(self, plane):
+        """
+        View of a full-size plane / image restricted to the bounding box.
+        """
+        return plane[self.slices]
+
+    def full(self):
+        """
+        Full-size label image (H, W).
+        """
+        labels = np.zeros(self.shape, dtype=np.uint8)
+        labels[self.slices] = self.labels
+        return labels
+
+    def mask(self, name):
+        """
+        Full-size binary mask (0/255) of one zone.
+        """
+        k = self.names.index(name) + 1
+        mask = np.zeros(self.shape, dtype=np.uint8)
+        mask[self.slices] = np.where(self.labels == k, 255, 0)
+        return mask
+
+    def to_masks(self):
+        """
+        Compatibility adapter: one full-size 0/255 mask per zone, in `names` order.
+        """
+        return tuple(self.mask(name) for name in self.names)
+
+    @classmethod
+    def from_masks(cls, zones):
+        """
+        Build from disjoint zone masks, e.g. {"center": ..., "ring": ...} (>0 = inside).
+        """
+        masks = list(zones.values())
+        labels = np.zeros(masks[0].shape, dtype=np.uint8)
+        for k, mask in enumerate(masks, start=1):
+            labels[mask > 0] = k
+
+        x, y, w, h = cv2.boundingRect(labels)
+        return cls(
+            labels=labels[y:y + h, x:x + w].copy(),
+            names=tuple(zones),
+            offset=(y, x),
+            shape=labels.shape
+        )
+
+
+def create_zone_labels(mask_leaf, thresholds=(0.35, 0.65), names=None):
+    """
+    Create N+1 concentric zones from N relative distance thresholds,
+    as a bounding-box cropped label image.
+
+    Parameters
+    ----------
+    mask_leaf : np.ndarray
+        Binary mask of leaf (H, W), >0 = leaf
+    thresholds : sequence of float
+        Ascending relative distance thresholds (0–1). Pixel with
+        normalized distance d goes to the first zone whose threshold
+        satisfies d <= threshold, otherwise to the outermost zone.
+    names : sequence of str, optional
+        Zone names, inside-out. Default ZONE_NAMES for 2 thresholds,
+        otherwise "zone1", "zone2", ...
+
+    Returns
+    -------
+    ZoneLabels
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    if thresholds.ndim != 1 or np.any(np.diff(thresholds) < 0):
+        raise ValueError("Threshold zona harus berupa list naik (ascending).")
+
+    n_zones = thresholds.size + 1
+    if names is None:
+        names = ZONE_NAMES if n_zones == len(ZONE_NAMES) else tuple(
+            f"zone{k}" for k in range(1, n_zones + 1)
+        )
+    if len(names) != n_zones:
+        raise ValueError("Jumlah nama zona harus sama dengan jumlah threshold + 1.")
+
+    # ambil koordinat pixel daun
+    ys, xs = np.nonzero(mask_leaf > 0)
+
+    if ys.size == 0:
+        raise ValueError("Mask daun kosong, tidak bisa membuat zona.")
+
+    # centroid (y, x)
+    centroid_y, centroid_x = ys.mean(), xs.mean()
+
+    # jarak tiap pixel ke centroid, dinormalisasi
+    distances = np.sqrt((ys - centroid_y) ** 2 + (xs - centroid_x) ** 2)
+    norm_dist = distances / (distances.max() + 1e-6)
+
+    # indeks zona per pixel: d <= t[0] -> 0, t[0] < d <= t[1] -> 1, ...
+    zone_idx = np.searchsorted(thresholds, norm_dist, side="left")
+
+    # label image hanya seluas bounding box daun
+    y0, x0 = ys.min(), xs.min()
+    labels = np.zeros((ys.max() - y0 + 1, xs.max() - x0 + 1), dtype=np.uint8)
+    labels[ys - y0, xs - x0] = zone_idx + 1
+
+    return ZoneLabels(
+        labels=labels,
+        names=tuple(names),
+        offset=(int(y0), int(x0)),
+        shape=mask_leaf.shape[:2]
+    )
+
+
+def create_concentric_zones(mask_leaf, thresholds=(0.35, 0.65)):
+    """
+    Create N+1 concentric zonal masks from N relative distance thresholds.
+
+    Returns
+    -------
+    masks : tuple of np.ndarray
+        len(thresholds) + 1 binary masks (0/255), ordered inside-out
+        (see create_zone_labels for the compact form)
+    """
+    return create_zone_labels(mask_leaf, thresholds).to_masks()
+
 
 def create_geometric_zones(mask_leaf,
                            center_thresh=0.35,
@@ -22,45 +173,7 @@ def create_geometric_zones(mask_leaf,
     mask_center, mask_ring, mask_edge : np.ndarray
         Binary masks for each zone
     """
-
-    # pastikan mask boolean
-    leaf_pixels = mask_leaf > 0
-
-    # ambil koordinat pixel daun
-    coords = np.column_stack(np.where(leaf_pixels))
-
-    if coords.shape[0] == 0:
-        raise ValueError("Mask daun kosong, tidak bisa membuat zona.")
-
-    # centroid (y, x)
-    centroid_y, centroid_x = coords.mean(axis=0)
-
-    # hitung jarak tiap pixel ke centroid
-    distances = np.sqrt(
-        (coords[:, 0] - centroid_y) ** 2 +
-        (coords[:, 1] - centroid_x) ** 2
-    )
-
-    # normalisasi jarak
-    max_dist = distances.max()
-    norm_dist = distances / (max_dist + 1e-6)
-
-    # siapkan mask kosong
-    mask_center = np.zeros_like(mask_leaf, dtype=np.uint8)
-    mask_ring = np.zeros_like(mask_leaf, dtype=np.uint8)
-    mask_edge = np.zeros_like(mask_leaf, dtype=np.uint8)
-
-    # klasifikasi zona
-    for (y, x), d in zip(coords, norm_dist):
-        if d <= center_thresh:
-            mask_center[y, x] = 255
-        elif d <= ring_thresh:
-            mask_ring[y, x] = 255
-        else:
-            mask_edge[y, x] = 255
-
-    # print("Leaf pixels :", np.sum(mask_leaf > 0))
-    # print("Center pixels:", np.sum(mask_center > 0))
-    # print("Ring pixels  :", np.sum(mask_ring > 0))
-    # print("Edge pixels  :", np.sum(mask_edge > 0))
+    mask_center, mask_ring, mask_edge = create_zone_labels(
+        mask_leaf, thresholds=(center_thresh, ring_thresh)
+    ).to_masks()
     return mask_center, mask_ring, mask_edge
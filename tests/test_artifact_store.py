@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+from app.utils.artifact_store import FileArtifactStore, MemoryArtifactStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FileArtifactStore(
+        base_dir=tmp_path / "uploads", background_write=False,
+        ttl=100, max_bytes=10_000, settle=5
+    )
+
+
+def write_artifacts(store, sample_id, sizes):
+    # seperti worker pipeline: tulis langsung ke folder sample
+    folder = store.sample_dir(sample_id)
+    for i, size in enumerate(sizes):
+        (folder / f"a{i}.png").write_bytes(b"x" * size)
+
+
+def test_pipeline_folder_indexed_and_measured_after_settle(store):
+    store.pipeline_options("s1")
+    assert store.sample_dir("s1").is_dir()
+    assert len(store) == 1
+
+    write_artifacts(store, "s1", [300, 200])
+    created = store._index["s1"][2]
+    store.sweep(now=created + 1)
+    assert store.total_bytes == 0
+
+    store.sweep(now=created + 5)
+    assert store.total_bytes == 500
+
+
+def test_failed_job_folder_is_swept(store):
+    # worker gagal sebelum put: folder tetap terindeks & kedaluwarsa
+    store.pipeline_options("crashed")
+    write_artifacts(store, "crashed", [100])
+    created = store._index["crashed"][2]
+
+    assert store.sweep(now=created + 101) == 1
+    assert not store.sample_dir("crashed").exists()
+    assert len(store) == 0
+    assert store.total_bytes == 0
+
+
+def test_put_after_measure_adds_size(store):
+    store.pipeline_options("s1")
+    write_artifacts(store, "s1", [400])
+    store.sweep(now=store._index["s1"][2] + 5)
+    assert store.total_bytes == 400
+
+    store.put("s1", "result.json", b"{" * 50)
+    assert store.total_bytes == 450
+
+    # put ulang file yang sama: hanya selisih ukuran
+    store.put("s1", "result.json", b"{" * 20)
+    assert store.total_bytes == 420
+    assert store._index["s1"][1] == 420
+
+
+def test_rewrite_is_measured_again(store):
+    store.pipeline_options("s1")
+    write_artifacts(store, "s1", [400])
+    store.sweep(now=store._index["s1"][2] + 5)
+
+    store.pipeline_options("s1")
+    assert store.total_bytes == 0
+    write_artifacts(store, "s1", [700])
+    store.sweep(now=store._index["s1"][2] + 5)
+    assert store.total_bytes == 700
+
+
+def test_sweep_evicts_oldest_over_max_bytes(store):
+    for i, sample_id in enumerate(["old", "mid", "new"]):
+        store.pipeline_options(sample_id)
+        write_artifacts(store, sample_id, [4_000])
+        store._index[sample_id][0] = store._index[sample_id][2] = 1_000 + i
+
+    assert store.sweep(now=1_010) == 1
+    assert not store.sample_dir("old").exists()
+    assert [s for s in store._index] == ["mid", "new"]
+    assert store.total_bytes == 8_000
+
+
+def test_touch_keeps_sample(store):
+    store.put("s1", "result.json", b"{}")
+    store.put("s2", "result.json", b"{}")
+    for entry in store._index.values():
+        entry[0] -= 90
+    assert store.touch("s1")
+
+    assert store.sweep(now=store._index["s1"][0] + 20) == 1
+    assert list(store._index) == ["s1"]
+
+
+def test_load_index_from_folders(store):
+    store.put("s1", "result.json", b"x" * 30)
+    os.utime(store.sample_dir("s1"), (1_000, 1_000))
+
+    fresh = FileArtifactStore(base_dir=store.base_dir, ttl=100, max_bytes=10_000)
+    fresh.load_index()
+    assert fresh.total_bytes == 30
+    assert fresh.sweep(now=1_101) == 1
+
+
+def test_memory_store_evicts_lru_over_max_bytes():
+    store = MemoryArtifactStore(max_bytes=100, ttl=1_000)
+    store.put("a", "x.png", b"1" * 60)
+    store.put("b", "x.png", b"2" * 30)
+    assert store.touch("a")
+    store.put("c", "x.png", b"3" * 30)
+
+    assert store.get("b", "x.png") is None
+    assert store.get("a", "x.png").data == b"1" * 60
+    assert store.total_bytes == 90
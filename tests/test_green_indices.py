@@ -0,0 +1,139 @@
+import cv2
+import numpy as np
+import pytest
+
+from image_pipeline.green_indices import (
+    INDEX_COLORMAP,
+    _index_colormap,
+    compute_exg_map,
+    compute_gli_map
+)
+from image_pipeline.index_frame import build_index_frame
+
+
+def reference_colormap(values, leaf):
+    # implementasi lama (gather piksel daun), acuan parity
+    leaf_vals = values[leaf]
+    v_min = leaf_vals.min()
+    v_max = leaf_vals.max()
+
+    norm = np.zeros(values.shape, dtype=np.uint8)
+    norm[leaf] = ((leaf_vals - v_min) / (v_max - v_min + 1e-6) * 255).astype(np.uint8)
+    return cv2.applyColorMap(norm, INDEX_COLORMAP)
+
+
+def reference_map(img, mask, plane):
+    frame = build_index_frame(np.ascontiguousarray(img), mask)
+    return reference_colormap(getattr(frame, plane), frame.leaf)
+
+
+def image_with_exg(exg):
+    """
+    uint8 RGB image whose ExG = 2G - R - B equals `exg` (-510..510).
+    """
+    exg = np.asarray(exg, dtype=np.int32)
+    g = np.clip((exg + 1) // 2, 0, 255)
+    rb = 2 * g - exg
+    r = np.minimum(rb, 255)
+    img = np.stack([r, g, rb - r], axis=-1).astype(np.uint8)
+    as_int = img.astype(np.int32)
+    assert np.array_equal(2 * as_int[..., 1] - as_int[..., 0] - as_int[..., 2], exg)
+    return img
+
+
+def leaf_ellipse(h, w):
+    yy, xx = np.mgrid[:h, :w]
+    inside = ((yy - h / 2) / (h * 0.4)) ** 2 + ((xx - w / 2) / (w * 0.35)) ** 2 <= 1
+    return np.where(inside, 255, 0).astype(np.uint8)
+
+
+def random_case(lo, hi, seed=0, shape=(60, 80)):
+    rng = np.random.default_rng(seed)
+    mask = leaf_ellipse(*shape)
+    exg = rng.integers(-510, 511, size=shape)
+    # rentang ExG daun tepat [lo, hi]: min & max dipasang eksplisit
+    leaf_exg = rng.integers(lo, hi + 1, size=shape)
+    ys, xs = np.nonzero(mask)
+    leaf_exg[ys[0], xs[0]] = lo
+    leaf_exg[ys[-1], xs[-1]] = hi
+    exg = np.where(mask > 0, leaf_exg, exg)
+    return image_with_exg(exg), mask
+
+
+CASES = {
+    "narrow": (100, 112),
+    "wide": (-400, 450),
+    "full": (-510, 510),
+    "span_255": (10, 265),
+    "span_256": (10, 266),
+    "flat": (37, 37),
+}
+
+MAPS = {"exg": compute_exg_map, "gli": compute_gli_map}
+
+
+@pytest.mark.parametrize("plane", MAPS)
+@pytest.mark.parametrize("name", CASES)
+@pytest.mark.parametrize("seed", [0, 1])
+def test_map_matches_gather_reference(plane, name, seed):
+    img, mask = random_case(*CASES[name], seed=seed)
+    expected = reference_map(img, mask, plane)
+
+    assert np.array_equal(MAPS[plane](img, mask), expected)
+    assert np.array_equal(MAPS[plane](img, mask, frame=build_index_frame(img, mask)), expected)
+
+
+@pytest.mark.parametrize("plane", MAPS)
+@pytest.mark.parametrize("value", [-510, -3, 0, 510])
+def test_one_pixel_leaf(plane, value):
+    rng = np.random.default_rng(value + 510)
+    exg = rng.integers(-510, 511, size=(20, 30))
+    exg[5, 17] = value
+    mask = np.zeros((20, 30), np.uint8)
+    mask[5, 17] = 255
+    img = image_with_exg(exg)
+
+    assert np.array_equal(MAPS[plane](img, mask), reference_map(img, mask, plane))
+
+
+@pytest.mark.parametrize("plane", MAPS)
+def test_non_contiguous_roi_view(plane):
+    img, mask = random_case(-300, 300, shape=(120, 160))
+    img_view, mask_view = img[10:110:2, 5:155:3], mask[10:110:2, 5:155:3]
+    assert not img_view.flags["C_CONTIGUOUS"]
+
+    expected = reference_map(img_view, mask_view, plane)
+    assert np.array_equal(MAPS[plane](img_view, mask_view), expected)
+
+    frame = build_index_frame(img, mask)
+    sub = getattr(frame, plane)[10:110:2, 5:155:3]
+    assert np.array_equal(_index_colormap(sub, frame.leaf[10:110:2, 5:155:3]), expected)
+
+
+@pytest.mark.parametrize("plane", MAPS)
+def test_leaf_touching_border(plane):
+    img, mask = random_case(0, 300, shape=(40, 50))
+    mask[:, :3] = 255
+    mask[-2:, :] = 255
+    assert np.array_equal(MAPS[plane](img, mask), reference_map(img, mask, plane))
+
+
+@pytest.mark.parametrize("plane", MAPS)
+def test_every_pixel_value(plane):
+    # semua nilai ExG -510..510 dalam satu daun, plus gambar foto-like
+    exg = np.arange(-510, 511).reshape(1, -1).repeat(3, axis=0)
+    mask = np.full(exg.shape, 255, np.uint8)
+    img = image_with_exg(exg)
+    assert np.array_equal(MAPS[plane](img, mask), reference_map(img, mask, plane))
+
+    rng = np.random.default_rng(5)
+    photo = rng.integers(0, 256, size=(90, 120, 3), dtype=np.uint8)
+    mask = leaf_ellipse(90, 120)
+    assert np.array_equal(MAPS[plane](photo, mask), reference_map(photo, mask, plane))
+
+
+@pytest.mark.parametrize("plane", MAPS)
+def test_empty_mask_raises(plane):
+    img, _ = random_case(0, 10)
+    with pytest.raises(ValueError):
+        MAPS[plane](img, np.zeros(img.shape[:2], np.uint8))
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from app.utils.ingest import MULTIPART_OVERHEAD, UploadTooLarge, ingest_image_upload
+
+BOUNDARY = b"testboundary"
+JPEG_HEAD = b"\xff\xd8\xff\xe0" + b"\0" * 12
+CHUNK = 4096
+
+
+def multipart_body(image, fields=()):
+    body = b""
+    for name, value in fields:
+        body += (
+            b"--" + BOUNDARY + b"\r\n"
+            + f'Content-Disposition: form-data; name="{name}"\r\n\r\n'.encode()
+            + value + b"\r\n"
+        )
+    body += (
+        b"--" + BOUNDARY + b"\r\n"
+        b'Content-Disposition: form-data; name="image"; filename="daun.jpg"\r\n'
+        b"Content-Type: image/jpeg\r\n\r\n"
+        + image + b"\r\n--" + BOUNDARY + b"--\r\n"
+    )
+    return body
+
+
+class StreamedRequest:
+    """
+    ASGI request whose body arrives in CHUNK-sized messages; counts
+    how many bytes the handler actually pulled.
+    """
+
+    def __init__(self, body, content_length=None):
+        self.body = body
+        self.received = 0
+        headers = [(b"content-type", b"multipart/form-data; boundary=" + BOUNDARY)]
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        self.request = Request(
+            {"type": "http", "method": "POST", "path": "/", "headers": headers},
+            self.receive
+        )
+
+    async def receive(self):
+        chunk = self.body[self.received:self.received + CHUNK]
+        self.received += len(chunk)
+        return {
+            "type": "http.request",
+            "body": chunk,
+            "more_body": self.received < len(self.body)
+        }
+
+
+def ingest(streamed, max_size):
+    return asyncio.run(ingest_image_upload(streamed.request, max_size=max_size))
+
+
+def test_image_and_fields_before_it():
+    image = JPEG_HEAD + b"x" * 10_000
+    streamed = StreamedRequest(multipart_body(image, [("plot_id", b"A1")]))
+
+    result = ingest(streamed, max_size=20_000)
+
+    assert bytes(result.buffer) == image
+    assert result.fmt == "jpeg"
+    assert result.filename == "daun.jpg"
+    assert result.fields == {"plot_id": "A1"}
+
+
+def test_content_length_over_limit_rejected_without_reading():
+    streamed = StreamedRequest(b"", content_length=20_000 + MULTIPART_OVERHEAD + 1)
+
+    with pytest.raises(UploadTooLarge):
+        ingest(streamed, max_size=20_000)
+    assert streamed.received == 0
+
+
+def test_oversized_image_rejected_before_body_is_read():
+    # tanpa Content-Length: ditolak begitu bagian gambar melewati batas
+    body = multipart_body(JPEG_HEAD + b"x" * 1_000_000)
+    streamed = StreamedRequest(body)
+
+    with pytest.raises(UploadTooLarge):
+        ingest(streamed, max_size=20_000)
+    assert streamed.received <= 20_000 + 2 * CHUNK
+    assert streamed.received < len(body)
+
+
+def test_oversized_body_rejected_before_fully_read():
+    # field teks besar sebelum gambar: batas body total yang berlaku
+    body = multipart_body(JPEG_HEAD, [("note", b"n" * 1_000_000)])
+    streamed = StreamedRequest(body)
+
+    with pytest.raises(UploadTooLarge):
+        ingest(streamed, max_size=20_000)
+    assert streamed.received <= 20_000 + MULTIPART_OVERHEAD + CHUNK
+    assert streamed.received < len(body)
+
+
+def test_unsupported_format_rejected_from_first_chunk():
+    body = multipart_body(b"GIF89a" + b"x" * 1_000_000)
+    streamed = StreamedRequest(body)
+
+    with pytest.raises(ValueError, match="Format file tidak didukung"):
+        ingest(streamed, max_size=2_000_000)
+    assert streamed.received <= CHUNK
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from image_pipeline.scoring import DEFAULT_SCORING, compute_visual_score, score_batch
+
+
+def random_features(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "mean_ExG": rng.uniform(-80, 230, n),
+        "mean_GLI": rng.uniform(-0.3, 0.7, n),
+        "mean_G": rng.uniform(40, 180, n),
+    }
+
+
+def test_score_batch_matches_compute_visual_score():
+    features = random_features(5000)
+    batch = score_batch(features, DEFAULT_SCORING)
+    for i in range(5000):
+        row = compute_visual_score({k: float(v[i]) for k, v in features.items()}, DEFAULT_SCORING)
+        assert batch["score"][i] == row["score"]
+        assert batch["label"][i] == row["label"]
+
+
+def test_score_batch_near_half_ties():
+    # skor yang jatuh tepat di x.x5 harus dibulatkan seperti round()
+    exg = np.linspace(-50, 200, 20001)
+    features = {"mean_ExG": exg, "mean_GLI": np.full_like(exg, 0.2), "mean_G": np.full_like(exg, 110.0)}
+    batch = score_batch(features)
+    expected = [compute_visual_score({"mean_ExG": float(v), "mean_GLI": 0.2, "mean_G": 110.0})["score"] for v in exg]
+    assert batch["score"].tolist() == expected
+
+
+@pytest.mark.parametrize("wrap", [float, np.float64, np.array])
+def test_score_batch_scalar_features(wrap):
+    features = {"mean_ExG": wrap(120.0), "mean_GLI": wrap(0.3), "mean_G": wrap(100.0)}
+    batch = score_batch(features)
+    row = compute_visual_score({k: float(v) for k, v in features.items()})
+    assert batch["score"].shape == (1,)
+    assert batch["score"][0] == row["score"] and batch["label"][0] == row["label"]
+
+
+def test_score_batch_missing_values():
+    batch = score_batch({"mean_ExG": [100.0, None], "mean_GLI": [0.2, 0.2], "mean_G": [90.0, np.nan]})
+    assert not np.isnan(batch["score"][0]) and batch["label"][0] is not None
+    assert np.isnan(batch["score"][1]) and batch["label"][1] is None
+
+
+def test_score_batch_rejects_bad_columns():
+    with pytest.raises(ValueError):
+        score_batch({"mean_ExG": np.zeros((2, 2)), "mean_GLI": np.zeros((2, 2)), "mean_G": np.zeros((2, 2))})
+    with pytest.raises(ValueError):
+        score_batch({"mean_ExG": [1.0, 2.0], "mean_GLI": [0.1], "mean_G": [90.0, 91.0]})
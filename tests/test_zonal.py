@@ -0,0 +1,152 @@
+import cv2
+import numpy as np
+import pytest
+
+from image_pipeline.zonal import (
+    ZoneLabels,
+    create_concentric_zones,
+    create_geometric_zones,
+    create_zone_labels
+)
+
+
+def reference_geometric_zones(mask_leaf, center_thresh=0.35, ring_thresh=0.65):
+    # implementasi lama (loop per pixel), acuan parity
+    leaf_pixels = mask_leaf > 0
+    coords = np.column_stack(np.where(leaf_pixels))
+    if coords.shape[0] == 0:
+        raise ValueError("Mask daun kosong, tidak bisa membuat zona.")
+
+    centroid_y, centroid_x = coords.mean(axis=0)
+    distances = np.sqrt(
+        (coords[:, 0] - centroid_y) ** 2 +
+        (coords[:, 1] - centroid_x) ** 2
+    )
+    norm_dist = distances / (distances.max() + 1e-6)
+
+    mask_center = np.zeros_like(mask_leaf, dtype=np.uint8)
+    mask_ring = np.zeros_like(mask_leaf, dtype=np.uint8)
+    mask_edge = np.zeros_like(mask_leaf, dtype=np.uint8)
+    for (y, x), d in zip(coords, norm_dist):
+        if d <= center_thresh:
+            mask_center[y, x] = 255
+        elif d <= ring_thresh:
+            mask_ring[y, x] = 255
+        else:
+            mask_edge[y, x] = 255
+    return mask_center, mask_ring, mask_edge
+
+
+def disc():
+    mask = np.zeros((120, 160), np.uint8)
+    cv2.circle(mask, (80, 60), 45, 255, -1)
+    return mask
+
+
+def non_convex():
+    # bentuk L dengan lubang
+    mask = np.zeros((100, 100), np.uint8)
+    mask[10:90, 10:35] = 255
+    mask[65:90, 10:90] = 255
+    mask[20:30, 18:26] = 0
+    return mask
+
+
+def one_pixel():
+    mask = np.zeros((20, 30), np.uint8)
+    mask[7, 11] = 255
+    return mask
+
+
+def touching_border():
+    mask = np.zeros((80, 90), np.uint8)
+    cv2.ellipse(mask, (0, 79), (60, 35), 20, 0, 360, 255, -1)
+    mask[:, -3:] = 255
+    return mask
+
+
+MASKS = {
+    "disc": disc,
+    "non_convex": non_convex,
+    "one_pixel": one_pixel,
+    "touching_border": touching_border,
+}
+
+
+@pytest.mark.parametrize("name", MASKS)
+@pytest.mark.parametrize("thresholds", [(0.35, 0.65), (0.2, 0.5), (0.5, 0.5)])
+def test_geometric_zones_match_reference(name, thresholds):
+    mask = MASKS[name]()
+    got = create_geometric_zones(mask, *thresholds)
+    expected = reference_geometric_zones(mask, *thresholds)
+    for g, e in zip(got, expected):
+        assert g.dtype == e.dtype and g.shape == e.shape
+        assert np.array_equal(g, e)
+
+
+@pytest.mark.parametrize("name", MASKS)
+@pytest.mark.parametrize("thresholds", [(0.5,), (0.35, 0.65), (0.1, 0.3, 0.6, 0.9)])
+def test_concentric_zones_partition_leaf(name, thresholds):
+    mask = MASKS[name]()
+    zones = create_concentric_zones(mask, thresholds)
+    assert len(zones) == len(thresholds) + 1
+
+    count = np.zeros(mask.shape, np.int32)
+    for zone in zones:
+        assert zone.shape == mask.shape
+        count += zone > 0
+    # disjoint dan menutup seluruh daun, tidak ada pixel di luar daun
+    assert np.array_equal(count, (mask > 0).astype(np.int32))
+
+
+def test_empty_mask_raises():
+    with pytest.raises(ValueError):
+        create_geometric_zones(np.zeros((10, 10), np.uint8))
+
+
+@pytest.mark.parametrize("name", MASKS)
+def test_zone_labels_round_trip(name):
+    mask = MASKS[name]()
+    masks = create_geometric_zones(mask)
+    zones = ZoneLabels.from_masks(dict(zip(("center", "ring", "edge"), masks)))
+
+    assert zones.names == ("center", "ring", "edge")
+    assert zones.shape == mask.shape
+    # bbox label = bbox daun
+    x, y, w, h = cv2.boundingRect(mask)
+    assert zones.offset == (y, x) and zones.labels.shape == (h, w)
+
+    for got, expected in zip(zones.to_masks(), masks):
+        assert got.dtype == np.uint8
+        assert np.array_equal(got, expected)
+
+    again = ZoneLabels.from_masks(dict(zip(zones.names, zones.to_masks())))
+    assert again.offset == zones.offset
+    assert np.array_equal(again.labels, zones.labels)
+
+
+def test_zone_labels_full_and_crop():
+    mask = non_convex()
+    zones = create_zone_labels(mask, (0.2, 0.5, 0.8))
+    full = zones.full()
+
+    assert zones.names == ("zone1", "zone2", "zone3", "zone4")
+    assert np.array_equal(full > 0, mask > 0)
+    assert np.array_equal(zones.crop(full), zones.labels)
+    for k, zone in enumerate(zones.to_masks(), start=1):
+        assert np.array_equal(zone > 0, full == k)
+    # mask per zona sama dengan jalur mask penuh
+    for got, expected in zip(zones.to_masks(), create_concentric_zones(mask, (0.2, 0.5, 0.8))):
+        assert np.array_equal(got, expected)
+
+
+def test_zone_labels_from_boolean_masks():
+    center = np.zeros((12, 16), bool)
+    edge = np.zeros((12, 16), bool)
+    center[4:6, 5:8] = True
+    edge[3:8, 9] = True
+    zones = ZoneLabels.from_masks({"center": center, "edge": edge})
+
+    assert zones.offset == (3, 5) and zones.labels.shape == (5, 5)
+    assert np.array_equal(zones.mask("center") == 255, center)
+    assert np.array_equal(zones.mask("edge") == 255, edge)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from image_pipeline.zonal_stats import RunningStats, label_stats
+
+
+def assert_stats_equal(a, b):
+    assert a.count == b.count
+    assert a.min == b.min
+    assert a.max == b.max
+    assert a.mean == pytest.approx(b.mean, rel=1e-12, abs=1e-12)
+    assert a.var == pytest.approx(b.var, rel=1e-10, abs=1e-12)
+    if a.hist is not None:
+        np.testing.assert_array_equal(a.hist, b.hist)
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64, np.int16])
+def test_merge_matches_single_pass(dtype):
+    rng = np.random.default_rng(0)
+    values = (rng.normal(40, 25, 100_000)).astype(dtype)
+
+    single = RunningStats(bins=64, value_range=(-100, 200)).update(values)
+
+    # potongan tidak sama besar (termasuk kosong) lalu digabung bertingkat
+    cuts = [0, 7, 7, 1_000, 40_000, 70_001, values.size]
+    parts = [
+        RunningStats(bins=64, value_range=(-100, 200)).update(values[a:b])
+        for a, b in zip(cuts, cuts[1:])
+    ]
+    merged = RunningStats(bins=64, value_range=(-100, 200))
+    for part in parts[::-1]:
+        merged.merge(part)
+
+    assert_stats_equal(merged, single)
+    assert single.mean == pytest.approx(float(values.astype(np.float64).mean()), rel=1e-12)
+    assert single.std == pytest.approx(float(values.astype(np.float64).std()), rel=1e-10)
+
+
+def test_merge_large_offset_keeps_variance():
+    # mean besar, varians kecil: rumus naif (sum x^2) kehilangan presisi
+    values = 1e6 + np.arange(10_000, dtype=np.float64) * 1e-3
+    halves = [RunningStats().update(v) for v in np.array_split(values, 2)]
+    merged = halves[0].merge(halves[1])
+    assert merged.var == pytest.approx(float(values.var()), rel=1e-9)
+
+
+def test_merge_ignores_nan_and_empty():
+    values = np.array([1.0, np.nan, 3.0, 5.0], dtype=np.float32)
+    stats = RunningStats().update(values).merge(RunningStats())
+    assert stats.count == 3
+    assert stats.mean == pytest.approx(3.0)
+    assert (stats.min, stats.max) == (1.0, 5.0)
+
+
+@pytest.mark.parametrize("other", [
+    RunningStats(),
+    RunningStats(bins=32, value_range=(0, 10)),
+    RunningStats(bins=16, value_range=(0, 20)),
+])
+def test_merge_mismatched_histogram_raises(other):
+    stats = RunningStats(bins=16, value_range=(0, 10))
+    with pytest.raises(ValueError, match="Histogram tidak cocok"):
+        stats.merge(other)
+
+
+def test_label_stats_matches_per_label():
+    rng = np.random.default_rng(1)
+    values = rng.normal(0, 1, (120, 90)).astype(np.float32)
+    values[5, 5] = np.nan
+    labels = rng.integers(0, 4, values.shape).astype(np.uint8)
+
+    stats = label_stats(values, labels, 3, bins=20, value_range=(-4, 4))
+
+    assert sorted(stats) == [1, 2, 3]
+    for k, s in stats.items():
+        expected = RunningStats(bins=20, value_range=(-4, 4)).update(values[labels == k])
+        assert_stats_equal(s, expected)